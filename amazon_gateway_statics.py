@@ -1,193 +1,132 @@
-def add_gateway_responses_and_validators():
+import json
+
+import yaml_io as yaml_io
+
+REQUEST_VALIDATOR_NAME = "Validate body, query string parameters, and headers"
+
+ERROR_RESPONSE_TEMPLATE = (
+    '{{\n  "status":  $context.status,\n  "title": $context.error.messageString,\n'
+    '  "code": "{code}",\n  "detail": $context.error.messageString\n}}'
+)
+
+# Same as ERROR_RESPONSE_TEMPLATE, with a single space after "status" as some responses were first written
+COMPACT_ERROR_RESPONSE_TEMPLATE = (
+    '{{\n  "status": $context.status,\n  "title": $context.error.messageString,\n'
+    '  "code": "{code}",\n  "detail": $context.error.messageString\n}}'
+)
+
+# Gateway response type, error code, status code (None to keep the API Gateway one), response template
+GATEWAY_RESPONSE_CODES = (
+    ("AUTHORIZER_CONFIGURATION_ERROR", "E201003", None, ERROR_RESPONSE_TEMPLATE),
+    ("EXPIRED_TOKEN", "E201009", None, ERROR_RESPONSE_TEMPLATE),
+    ("MISSING_AUTHENTICATION_TOKEN", "E201014", None, ERROR_RESPONSE_TEMPLATE),
+    ("BAD_REQUEST_PARAMETERS", "E201006", 400, COMPACT_ERROR_RESPONSE_TEMPLATE),
+    ("DEFAULT_4XX", "E201007", None, COMPACT_ERROR_RESPONSE_TEMPLATE),
+    ("WAF_FILTERED", "E201021", None, ERROR_RESPONSE_TEMPLATE),
+    ("AUTHORIZER_FAILURE", "E201004", None, ERROR_RESPONSE_TEMPLATE),
+    ("RESOURCE_NOT_FOUND", "E201017", None, ERROR_RESPONSE_TEMPLATE),
+    ("THROTTLED", "E201018", None, ERROR_RESPONSE_TEMPLATE),
+    ("UNAUTHORIZED", "E201019", None, ERROR_RESPONSE_TEMPLATE),
+    ("REQUEST_TOO_LARGE", "E201016", None, ERROR_RESPONSE_TEMPLATE),
+    ("INVALID_SIGNATURE", "E201013", None, ERROR_RESPONSE_TEMPLATE),
+    ("API_CONFIGURATION_ERROR", "E201002", None, ERROR_RESPONSE_TEMPLATE),
+    ("UNSUPPORTED_MEDIA_TYPE", "E201020", None, ERROR_RESPONSE_TEMPLATE),
+    ("INTEGRATION_FAILURE", "E201010", None, ERROR_RESPONSE_TEMPLATE),
+    ("QUOTA_EXCEEDED", "E201015", None, ERROR_RESPONSE_TEMPLATE),
+    ("ACCESS_DENIED", "E201001", None, ERROR_RESPONSE_TEMPLATE),
+    ("INVALID_API_KEY", "E201012", None, ERROR_RESPONSE_TEMPLATE),
+    ("BAD_REQUEST_BODY", "E201005", None, ERROR_RESPONSE_TEMPLATE),
+    ("DEFAULT_5XX", "E201008", None, ERROR_RESPONSE_TEMPLATE),
+    ("INTEGRATION_TIMEOUT", "E201011", None, ERROR_RESPONSE_TEMPLATE),
+)
+
+GATEWAY_RESPONSES_SECTION = "x-amazon-apigateway-gateway-responses"
+REQUEST_VALIDATORS_SECTION = "x-amazon-apigateway-request-validators"
+STATIC_SECTIONS = (GATEWAY_RESPONSES_SECTION, REQUEST_VALIDATORS_SECTION)
+
+
+def gateway_response_table(overrides=None):
     """
-    Returns a dictionary containing the `x-amazon-apigateway-gateway-responses`
-    and `x-amazon-apigateway-request-validators` configurations.
+    Returns the rows of `GATEWAY_RESPONSE_CODES` with the per-project `overrides` applied.
+    `overrides` maps a gateway response type to the fields to change: `code`, `status_code` and `template` (a
+    `str.format` template receiving the code). Unknown response types are added after the standard ones.
     """
-    gateway_responses = {
-        "WAF_FILTERED": {
-            "responseTemplates": {
-                "application/json": (
-                    '{\n  "status":  $context.status,\n  "title": $context.error.messageString,\n'
-                    '  "code": "E201021",\n  "detail": $context.error.messageString\n}'
-                )
-            }
-        },
-        "ACCESS_DENIED": {
-            "responseTemplates": {
-                "application/json": (
-                    '{\n  "status":  $context.status,\n  "title": $context.error.messageString,\n'
-                    '  "code": "E201001",\n  "detail": $context.error.messageString\n}'
-                )
-            }
-        },
-        "INVALID_API_KEY": {
-            "responseTemplates": {
-                "application/json": (
-                    '{\n  "status":  $context.status,\n  "title": $context.error.messageString,\n'
-                    '  "code": "E201012",\n  "detail": $context.error.messageString\n}'
-                )
-            }
-        },
-        "QUOTA_EXCEEDED": {
-            "responseTemplates": {
-                "application/json": (
-                    '{\n  "status":  $context.status,\n  "title": $context.error.messageString,\n'
-                    '  "code": "E201015",\n  "detail": $context.error.messageString\n}'
-                )
-            }
-        },
-        "DEFAULT_4XX": {
-            "responseTemplates": {
-                "application/json": (
-                    '{\n  "status": $context.status,\n  "title": $context.error.messageString,\n'
-                    '  "code": "E201007",\n  "detail": $context.error.messageString\n}'
-                )
-            }
-        },
-        "API_CONFIGURATION_ERROR": {
-            "responseTemplates": {
-                "application/json": (
-                    '{\n  "status":  $context.status,\n  "title": $context.error.messageString,\n'
-                    '  "code": "E201002",\n  "detail": $context.error.messageString\n}'
-                )
-            }
-        },
-        "INTEGRATION_FAILURE": {
-            "responseTemplates": {
-                "application/json": (
-                    '{\n  "status":  $context.status,\n  "title": $context.error.messageString,\n'
-                    '  "code": "E201010",\n  "detail": $context.error.messageString\n}'
-                )
-            }
-        },
-        "BAD_REQUEST_PARAMETERS": {
-            "statusCode": 400,
-            "responseTemplates": {
-                "application/json": (
-                    '{\n  "status": $context.status,\n  "title": $context.error.messageString,\n'
-                    '  "code": "E201006",\n  "detail": $context.error.messageString\n}'
-                )
-            }
-        },
-        "THROTTLED": {
-            "responseTemplates": {
-                "application/json": (
-                    '{\n  "status":  $context.status,\n  "title": $context.error.messageString,\n'
-                    '  "code": "E201018",\n  "detail": $context.error.messageString\n}'
-                )
-            }
-        },
-        "AUTHORIZER_CONFIGURATION_ERROR": {
-            "responseTemplates": {
-                "application/json": (
-                    '{\n  "status":  $context.status,\n  "title": $context.error.messageString,\n'
-                    '  "code": "E201003",\n  "detail": $context.error.messageString\n}'
-                )
-            }
-        },
-        "AUTHORIZER_FAILURE": {
-            "responseTemplates": {
-                "application/json": (
-                    '{\n  "status":  $context.status,\n  "title": $context.error.messageString,\n'
-                    '  "code": "E201004",\n  "detail": $context.error.messageString\n}'
-                )
-            }
-        },
-        "MISSING_AUTHENTICATION_TOKEN": {
-            "responseTemplates": {
-                "application/json": (
-                    '{\n  "status":  $context.status,\n  "title": $context.error.messageString,\n'
-                    '  "code": "E201014",\n  "detail": $context.error.messageString\n}'
-                )
-            }
-        },
-        "RESOURCE_NOT_FOUND": {
-            "responseTemplates": {
-                "application/json": (
-                    '{\n  "status":  $context.status,\n  "title": $context.error.messageString,\n'
-                    '  "code": "E201017",\n  "detail": $context.error.messageString\n}'
-                )
-            }
-        },
-        "UNSUPPORTED_MEDIA_TYPE": {
-            "responseTemplates": {
-                "application/json": (
-                    '{\n  "status":  $context.status,\n  "title": $context.error.messageString,\n'
-                    '  "code": "E201020",\n  "detail": $context.error.messageString\n}'
-                )
-            }
-        },
-        "INVALID_SIGNATURE": {
-            "responseTemplates": {
-                "application/json": (
-                    '{\n  "status":  $context.status,\n  "title": $context.error.messageString,\n'
-                    '  "code": "E201013",\n  "detail": $context.error.messageString\n}'
-                )
-            }
-        },
-        "DEFAULT_5XX": {
-            "responseTemplates": {
-                "application/json": (
-                    '{\n  "status":  $context.status,\n  "title": $context.error.messageString,\n'
-                    '  "code": "E201008",\n  "detail": $context.error.messageString\n}'
-                )
-            }
-        },
-        "REQUEST_TOO_LARGE": {
-            "responseTemplates": {
-                "application/json": (
-                    '{\n  "status":  $context.status,\n  "title": $context.error.messageString,\n'
-                    '  "code": "E201016",\n  "detail": $context.error.messageString\n}'
-                )
-            }
-        },
-        "BAD_REQUEST_BODY": {
-            "responseTemplates": {
-                "application/json": (
-                    '{\n  "status":  $context.status,\n  "title": $context.error.messageString,\n'
-                    '  "code": "E201005",\n  "detail": $context.error.messageString\n}'
-                )
-            }
-        },
-        "EXPIRED_TOKEN": {
-            "responseTemplates": {
-                "application/json": (
-                    '{\n  "status":  $context.status,\n  "title": $context.error.messageString,\n'
-                    '  "code": "E201009",\n  "detail": $context.error.messageString\n}'
-                )
-            }
-        },
-        "INTEGRATION_TIMEOUT": {
-            "responseTemplates": {
-                "application/json": (
-                    '{\n  "status":  $context.status,\n  "title": $context.error.messageString,\n'
-                    '  "code": "E201011",\n  "detail": $context.error.messageString\n}'
-                )
-            }
-        },
-        "UNAUTHORIZED": {
-            "responseTemplates": {
-                "application/json": (
-                    '{\n  "status":  $context.status,\n  "title": $context.error.messageString,\n'
-                    '  "code": "E201019",\n  "detail": $context.error.messageString\n}'
-                )
-            }
-        },
-    }
+    overrides = overrides or {}
+    unknown_fields = {field for fields in overrides.values() for field in fields} - {"code", "status_code", "template"}
+    if unknown_fields:
+        raise ValueError(f"Unknown gateway response override field(s): {', '.join(sorted(unknown_fields))}")
+    table = []
+    response_types = [response_type for response_type, _, _, _ in GATEWAY_RESPONSE_CODES]
+    rows = {response_type: (code, status_code, template)
+            for response_type, code, status_code, template in GATEWAY_RESPONSE_CODES}
+    for response_type in response_types + [response_type for response_type in overrides if response_type not in rows]:
+        code, status_code, template = rows.get(response_type, (None, None, ERROR_RESPONSE_TEMPLATE))
+        fields = overrides.get(response_type, {})
+        code = fields.get("code", code)
+        if code is None:
+            raise ValueError(f"No error code given for the gateway response {response_type}")
+        table.append((response_type, code, fields.get("status_code", status_code), fields.get("template", template)))
+    return table
+
+
+def gateway_responses(overrides=None):
+    """The `x-amazon-apigateway-gateway-responses` section, built from `gateway_response_table`."""
+    responses = {}
+    for response_type, code, status_code, template in gateway_response_table(overrides):
+        response = {}
+        if status_code is not None:
+            response["statusCode"] = status_code
+        response["responseTemplates"] = {"application/json": template.format(code=code)}
+        responses[response_type] = response
+    return responses
 
-    request_validators = {
-        "Validate body, query string parameters, and headers": {
+
+def request_validators():
+    return {
+        REQUEST_VALIDATOR_NAME: {
             "validateRequestParameters": True,
             "validateRequestBody": True,
         }
     }
 
+
+def add_gateway_responses_and_validators(overrides=None):
+    """
+    Returns a dictionary containing the `x-amazon-apigateway-gateway-responses`
+    and `x-amazon-apigateway-request-validators` configurations.
+    """
     return {
-        "x-amazon-apigateway-gateway-responses": gateway_responses,
-        "x-amazon-apigateway-request-validators": request_validators,
+        GATEWAY_RESPONSES_SECTION: gateway_responses(overrides),
+        REQUEST_VALIDATORS_SECTION: request_validators(),
     }
 
 
+# How each dumper style writes a top level section
+_SECTION_DUMPERS = {
+    "gateway": yaml_io.dump_gateway,
+    "plain": lambda section: yaml_io.dump(section, sort_keys=False),
+}
+
+
+# Serialized static sections by section, overrides and style (see `serialized_static_section`)
+_serialized_static_sections = {}
+
+
+def serialized_static_section(section, overrides=None, style="gateway"):
+    """
+    Returns the YAML text of one of the `STATIC_SECTIONS` as dumped by the `style` dumper ("gateway" for
+    `yaml_io.dump_gateway`, "plain" for `yaml_io.dump`). The text is serialized once per
+    section, style and overrides, and can be written as is in place of the dump of the section.
+    """
+    # The overrides are only serialized to be hashed, in their order: it's the order of the added gateway responses
+    key = (section, json.dumps(overrides, default=str) if overrides else None, style)
+    text = _serialized_static_sections.get(key)
+    if text is None:
+        sections = add_gateway_responses_and_validators(overrides)
+        text = _serialized_static_sections[key] = _SECTION_DUMPERS[style]({section: sections[section]})
+    return text
+
+
 def get_security_schemas():
     """
     Fetches default security schemas to be in this format.
@@ -0,0 +1,75 @@
+"""
+Compares the dump of gateway documents through a quoted copy (`utils.convert_str_values_to_quoted_strings`) and
+the dumper used before (kept below as `BaselineGatewayDumper`), with the quoting applied by `yaml_io.GatewayDumper`
+while dumping: time, and memory allocated by the copy and peak memory of the whole dump.
+
+Run from the repository root:
+    python -m benchmarks.bench_gateway_dump
+"""
+import gc
+import time
+import tracemalloc
+
+import yaml
+
+import utils as utils
+import yaml_io as yaml_io
+
+SAMPLE_FILES = ["gateway.yaml"]
+
+
+class BaselineGatewayDumper(utils.ListIndentDumper):
+    """`yaml_io.GatewayDumper` before the quoting moved into it, dumping the quoted copy of the data."""
+
+
+BaselineGatewayDumper.add_representer(utils.QuotedString, utils.QuotedString.quoted_string_representer)
+BaselineGatewayDumper.add_representer(utils.FlowStyleList, utils.FlowStyleList.flow_style_representer)
+
+
+def baseline_dump_gateway(data) -> str:
+    return yaml.dump(utils.convert_str_values_to_quoted_strings(data), sort_keys=False, Dumper=BaselineGatewayDumper)
+
+
+def measure(func, repeat=5):
+    """Returns the result of `func`, its best wall time and its peak of allocated memory."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, min(timings), peak_memory
+
+
+def copied_bytes(data) -> int:
+    """Memory still allocated by the quoted copy of `data` once it's made."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        quoted_data = utils.convert_str_values_to_quoted_strings(data)
+        copy_bytes = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del quoted_data
+    return copy_bytes
+
+
+def main():
+    for file_path in SAMPLE_FILES:
+        data = yaml_io.load_file(file_path)
+        copied, copied_seconds, copied_peak = measure(lambda: baseline_dump_gateway(data))
+        dumped, dumped_seconds, dumped_peak = measure(lambda: yaml_io.dump_gateway(data))
+        assert copied == dumped
+        print(f"{file_path}: quoted copy of {copied_bytes(data) / 1024:.0f} KB avoided")
+        print(f"  quoted copy + dump  {copied_seconds * 1000:8.1f} ms   peak {copied_peak / 1024:8.0f} KB")
+        print(f"  dump                {dumped_seconds * 1000:8.1f} ms   peak {dumped_peak / 1024:8.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Compares loading JSON specs with the YAML loader and with `yaml_io.load_file` (JSON decoder), on the bundled
+`api-docs.json` and on a synthetic spec of about 20 MB.
+
+Run from the repository root:
+    python -m benchmarks.bench_json_input
+"""
+import argparse
+import os
+import tempfile
+
+import yaml_io as yaml_io
+from benchmarks import synthetic_spec
+from benchmarks.bench_yaml_io import best_of
+
+SAMPLE_FILE = "api-docs.json"
+
+# Synthetic spec size giving a file of about 20 MB
+SYNTHETIC_PATHS = 8600
+
+
+def run_benchmark(file_path: str, repeat: int):
+    with open(file_path, 'r') as file:
+        text = file.read()
+    assert yaml_io.load_file(file_path) == yaml_io.safe_load(text)
+    return (best_of(lambda: yaml_io.safe_load(text), repeat),
+            best_of(lambda: yaml_io.load_file(file_path), repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the JSON input fast path")
+    synthetic_spec.add_spec_arguments(parser)
+    parser.set_defaults(paths=SYNTHETIC_PATHS)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per loader, the best time is kept")
+    args = parser.parse_args()
+
+    print(f"libyaml available: {yaml_io.HAS_LIBYAML}")
+    with tempfile.TemporaryDirectory() as spec_dir:
+        synthetic_path = os.path.join(spec_dir, "synthetic-api-docs.json")
+        synthetic_spec.write_spec(synthetic_path, **synthetic_spec.spec_arguments(args))
+        for label, file_path in ((SAMPLE_FILE, SAMPLE_FILE), ("synthetic spec", synthetic_path)):
+            yaml_time, json_time = run_benchmark(file_path, args.repeat)
+            print(f"{label:<16} {os.path.getsize(file_path) / 1024:10.0f} KB   yaml {yaml_time * 1000:9.1f} ms   "
+                  f"json {json_time * 1000:8.1f} ms   x{yaml_time / json_time:.1f}")
+
+
+if __name__ == "__main__":
+    main()
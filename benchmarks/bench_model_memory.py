@@ -0,0 +1,196 @@
+"""
+Compares the memory per operation of the gateway generation before the compact operations model (see
+`gateway_model`), with the configurations built straight from the input dicts as `process_path` did before (kept
+below as `baseline_process_path`), and after it, with `source_generator.generate_paths`, on a synthetic spec.
+The peak of traced memory is measured with the generated paths all kept (as `process_paths` does) and with each
+path dropped once generated (as the streamed writer does).
+
+Run from the repository root:
+    python -m benchmarks.bench_model_memory --paths 10000 --methods 2
+"""
+import argparse
+import contextlib
+import gc
+import io
+import tracemalloc
+
+import amazon_gateway_statics as amazon_gateway_statics
+import gateway_fragments as gateway_fragments
+import source_generator
+import utils as utils
+import yaml_io as yaml_io
+from benchmarks import synthetic_spec
+from benchmarks.run_benchmarks import GATEWAY_FIELDS
+
+
+def baseline_process_path(path: str, methods: dict, swagger_data: dict, frontend_url: str, vpc_connection_id: str,
+                          to_be_deleted_schemas: set[str], query_ref_cache=None) -> dict:
+    """`source_generator.process_path` before the operations model, building the configuration from the dicts."""
+    path_config = {}
+    path_parameters = {}
+    for method, operation in methods.items():
+        if method.lower() != 'options':
+            path_config[method] = _baseline_method_config(path, operation, method, frontend_url, vpc_connection_id,
+                                                          swagger_data, to_be_deleted_schemas, query_ref_cache)
+            for param in operation.get('parameters', []):
+                if param['in'] == 'path':
+                    path_parameters[param['name']] = {
+                        'name': param['name'],
+                        'in': 'path',
+                        'required': True,
+                        'schema': {'type': param['schema']['type']}
+                    }
+
+    path_methods = [key.upper() for key in methods.keys() if key.lower() != "options"]
+    options_config = _baseline_options_method(path_methods, frontend_url)
+    if len(path_parameters) != 0:
+        options_config = {"parameters": list(path_parameters.values()),
+                          **{k: v for k, v in options_config.items() if k != 'parameters'}}
+    path_config['options'] = options_config
+    return path_config
+
+
+def _baseline_method_config(path, operation, method, frontend_url, vpc_connection_id, swagger_data,
+                            to_be_deleted_schemas: set[str], query_ref_cache=None):
+    is_empty_success_response = source_generator.is_empty_response(operation)
+    success_response = {'description': '200 response', 'headers': gateway_fragments.RESPONSE_HEADERS}
+    response_200 = operation.get('responses', {}).get('200', {})
+    if 'content' in response_200 and not is_empty_success_response:
+        success_response['content'] = response_200['content']
+    method_config = {
+        'operationId': operation.get('operationId', ''),
+        'parameters': [],
+        'requestBody': operation.get('requestBody', {}),
+        'responses': {
+            utils.QuotedString("404"): gateway_fragments.error_response("404"),
+            utils.QuotedString("200"): success_response,
+            utils.QuotedString("400"): gateway_fragments.error_response("400"),
+            utils.QuotedString("401"): gateway_fragments.error_response("401"),
+            utils.QuotedString("500"): gateway_fragments.error_response("500"),
+            utils.QuotedString("403"): gateway_fragments.error_response("403")
+        },
+        'security': [{'api_key': []}],
+        'x-amazon-apigateway-request-validator': amazon_gateway_statics.REQUEST_VALIDATOR_NAME
+    }
+    method_config['parameters'].extend(gateway_fragments.STANDARD_HEADERS)
+
+    path_parameters = []
+    query_parameters = []
+    for param in operation.get('parameters', []):
+        if param['in'] == 'query':
+            if 'schema' in param and '$ref' in param['schema']:
+                resolved_params = source_generator.resolve_ref(param['schema']['$ref'], swagger_data,
+                                                               to_be_deleted_schemas, query_ref_cache)
+                method_config['parameters'].extend(resolved_params)
+                query_parameters.extend(resolved_params)
+            else:
+                query_parameters.append(param)
+        if param['in'] == 'path':
+            path_parameters.append(param)
+    if 'requestBody' not in operation:
+        method_config.pop('requestBody', None)
+
+    integration = {
+        'connectionId': vpc_connection_id,
+        'httpMethod': method.upper(),
+        'uri': 'https://${stageVariables.url}' + path[:3] + "/api" + path[3:],
+        'responses': {
+            '^200$': {
+                'statusCode': '200',
+                'responseParameters': gateway_fragments.cors_response_parameters(frontend_url),
+                'responseTemplates': {'application/json': "#set($inputRoot = $input.path('$'))"}
+            }
+        },
+        'requestParameters': dict(gateway_fragments.INTEGRATION_REQUEST_PARAMETERS),
+        'connectionType': 'VPC_LINK',
+        'passthroughBehavior': 'when_no_templates',
+        'type': 'http'
+    }
+    if not is_empty_success_response:
+        integration['responses']['^200$'].pop("responseTemplates", None)
+    integration['responses'].update(gateway_fragments.error_integration_responses(frontend_url))
+    for param in path_parameters:
+        integration['requestParameters'][f"integration.request.path.{param['name']}"] = \
+            f"method.request.path.{param['name']}"
+    for param in query_parameters:
+        integration['requestParameters'][f"integration.request.querystring.{param['name']}"] = \
+            f"method.request.querystring.{param['name']}"
+    method_config['x-amazon-apigateway-integration'] = integration
+    return method_config
+
+
+def _baseline_options_method(allowed_methods: list[str], frontend_url: str):
+    return {
+        'responses': gateway_fragments.OPTIONS_METHOD_RESPONSES,
+        'x-amazon-apigateway-integration': {
+            'responses': {
+                'default': {
+                    'statusCode': '200',
+                    'responseParameters': {
+                        'method.response.header.Access-Control-Allow-Credentials': '\'true\'',
+                        'method.response.header.Access-Control-Allow-Methods':
+                            f"\'{",".join(allowed_methods)},OPTIONS\'",
+                        'method.response.header.Access-Control-Allow-Headers':
+                            "\'x-trace-id,x-api-key,Authorization,Cache-Control,Content-Type\'",
+                        'method.response.header.Access-Control-Allow-Origin': f"{frontend_url}"
+                    }
+                }
+            },
+            'requestTemplates': gateway_fragments.OPTIONS_REQUEST_TEMPLATES,
+            'passthroughBehavior': 'when_no_match',
+            'type': 'mock'
+        }
+    }
+
+
+def peak_bytes(generate) -> int:
+    """The peak of memory allocated while `generate` runs."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        start_memory = tracemalloc.get_traced_memory()[0]
+        generate()
+        return tracemalloc.get_traced_memory()[1] - start_memory
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the memory per operation before and after the model")
+    synthetic_spec.add_spec_arguments(parser)
+    parser.set_defaults(paths=10000)
+    args = parser.parse_args()
+
+    spec = synthetic_spec.generate_spec(**synthetic_spec.spec_arguments(args))
+    swagger_data = source_generator.process_components(spec)
+    paths = swagger_data['paths']
+    operations = sum(1 for methods in paths.values() for method in methods if method != 'options')
+    frontend_url, vpc_connection_id = GATEWAY_FIELDS["frontend_url"], GATEWAY_FIELDS["vpc_connection_id"]
+
+    def before():
+        # Flattens the query parameter objects once, as `generate_paths` does
+        query_ref_cache = source_generator.QueryRefCache(swagger_data)
+        for path, methods in paths.items():
+            yield path, baseline_process_path(path, methods, swagger_data, frontend_url, vpc_connection_id, set(),
+                                              query_ref_cache), set()
+
+    def after():
+        return source_generator.generate_paths(swagger_data, list(paths), frontend_url, vpc_connection_id)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        path = next(iter(paths))
+        assert yaml_io.dump_gateway_path(path, next(before())[1]) == yaml_io.dump_gateway_path(path, next(after())[1])
+        results = {
+            name: (peak_bytes(lambda: {path: path_config for path, path_config, _ in generate()}),
+                   peak_bytes(lambda: all(path_config is not None for _, path_config, _ in generate())))
+            for name, generate in (("before (dicts)", before), ("after (model)", after))
+        }
+
+    print(f"{operations} operations in {len(paths)} paths, peak traced memory per operation")
+    print(f"{'':16}{'paths kept':>14}{'paths dropped':>16}")
+    for name, (kept_bytes, dropped_bytes) in results.items():
+        print(f"{name:16}{kept_bytes / operations:12.0f} B{dropped_bytes / operations:14.0f} B")
+
+
+if __name__ == "__main__":
+    main()
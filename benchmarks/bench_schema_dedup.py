@@ -0,0 +1,87 @@
+"""
+Compares the gateway generation of an aggregated spec with and without the structural deduplication of its schemas
+(see `schema_dedup`): output size and time. The spec aggregates several copies of a synthetic service, each one
+with its own schema names, like the specs of services sharing the same DTOs merged into one gateway.
+
+Run from the repository root:
+    python -m benchmarks.bench_schema_dedup --services 8 --paths 500
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+
+import gateway_fragments as gateway_fragments
+import instrumentation as instrumentation
+import source_generator
+from benchmarks import synthetic_spec
+from benchmarks.run_benchmarks import GATEWAY_FIELDS
+
+SCHEMA_REF_PREFIX = '#/components/schemas/'
+ERROR_RESPONSE_SCHEMA = gateway_fragments.ERROR_RESPONSE_SCHEMA
+
+# Stages of the generation whose work grows with the number of schemas
+SCHEMAS_STAGES = ('dedupe_schemas', 'process_components', 'delete_unused_schemas', 'write_components')
+
+
+def aggregated_spec(services: int, **kwargs) -> dict:
+    """
+    `services` copies of a synthetic spec (see `synthetic_spec.generate_spec`), with prefixed paths and schemas. The
+    error responses schema the gateway refers to is common to all of them.
+    """
+    spec = synthetic_spec.generate_spec(**kwargs)
+    spec_text = json.dumps(spec)
+    paths = {}
+    schemas = {}
+    for service in range(services):
+        prefix = f"Service{service}"
+        error_response_ref = f'"{SCHEMA_REF_PREFIX}{ERROR_RESPONSE_SCHEMA}"'
+        service_spec = json.loads(
+            spec_text.replace(f'"{SCHEMA_REF_PREFIX}', f'"{SCHEMA_REF_PREFIX}{prefix}')
+            .replace(f'"{SCHEMA_REF_PREFIX}{prefix}{ERROR_RESPONSE_SCHEMA}"', error_response_ref))
+        paths.update({f"/service-{service}{path}": path_item for path, path_item in service_spec["paths"].items()})
+        schemas.update({name if name == ERROR_RESPONSE_SCHEMA else f"{prefix}{name}": schema
+                        for name, schema in service_spec["components"]["schemas"].items()})
+    return {**spec, "paths": paths, "components": {"schemas": schemas}}
+
+
+def generate(spec_path: str, output_path: str, dedupe_schemas: bool) -> str:
+    """Generates the gateway of the spec and returns the line of its results."""
+    recorder = instrumentation.Instrumentation()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        source_generator.format_swagger_to_template(spec_path, output_path, **GATEWAY_FIELDS, use_spec_cache=False,
+                                                    instrumentation=recorder, dedupe_schemas=dedupe_schemas)
+    seconds = time.perf_counter() - start
+    stages = {measures['stage']: measures['wall_seconds'] for measures in recorder.report()['stages']}
+    # The paths don't get smaller, the schemas stages are reported apart
+    schemas_seconds = sum(stages.get(stage, 0) for stage in SCHEMAS_STAGES)
+    return (f"{seconds:8.2f} s   schemas stages {schemas_seconds:6.2f} s   "
+            f"{os.path.getsize(output_path) / 1024:10.0f} KB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the structural deduplication of the schemas")
+    synthetic_spec.add_spec_arguments(parser)
+    parser.add_argument("--services", type=int, default=8, help="Number of services aggregated in the spec")
+    parser.set_defaults(paths=500)
+    args = parser.parse_args()
+
+    spec = aggregated_spec(args.services, **synthetic_spec.spec_arguments(args))
+    with tempfile.TemporaryDirectory() as out_dir:
+        spec_path = os.path.join(out_dir, "aggregated-api-docs.json")
+        with open(spec_path, 'w') as file:
+            json.dump(spec, file)
+        print(f"{len(spec['paths'])} paths, {len(spec['components']['schemas'])} schemas in {args.services} services")
+        print(f"without deduplication {generate(spec_path, os.path.join(out_dir, 'gateway.yaml'), False)}")
+        dedup_results = generate(spec_path, os.path.join(out_dir, "gateway-dedup.yaml"), True)
+        with open(os.path.join(out_dir, "gateway-dedup.schema-dedup.json")) as file:
+            removed = json.load(file)["removed"]
+        print(f"with deduplication    {dedup_results}   {removed} schema(s) removed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Compares the pure-Python PyYAML load/dump with the `yaml_io` layer on the bundled specs.
+
+Run from the repository root:
+    python -m benchmarks.bench_yaml_io
+"""
+import time
+
+import yaml
+
+import utils as utils
+import yaml_io as yaml_io
+
+SAMPLE_FILES = ["api-docs.json", "gateway.yaml"]
+
+
+def best_of(func, repeat=5):
+    """Returns the best wall time in seconds of `repeat` calls of `func`."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run_benchmark(file_path, repeat=5):
+    with open(file_path, 'r') as file:
+        text = file.read()
+    data = yaml.safe_load(text)
+    quoted_data = utils.convert_str_values_to_quoted_strings(data)
+
+    yaml.add_representer(utils.QuotedString, utils.QuotedString.quoted_string_representer)
+    assert yaml_io.safe_load(text) == data
+    assert yaml_io.dump(data, sort_keys=False) == yaml.dump(data, sort_keys=False)
+    assert yaml_io.dump_gateway(data) == yaml.dump(quoted_data, sort_keys=False, Dumper=utils.ListIndentDumper)
+
+    return {
+        "load": (best_of(lambda: yaml.safe_load(text), repeat), best_of(lambda: yaml_io.safe_load(text), repeat)),
+        "dump": (best_of(lambda: yaml.dump(data, sort_keys=False), repeat),
+                 best_of(lambda: yaml_io.dump(data, sort_keys=False), repeat)),
+    }
+
+
+def main():
+    print(f"libyaml available: {yaml_io.HAS_LIBYAML}")
+    for file_path in SAMPLE_FILES:
+        for stage, (python_time, io_time) in run_benchmark(file_path).items():
+            print(f"{file_path:<16} {stage:<5} pure-python {python_time * 1000:8.1f} ms   "
+                  f"yaml_io {io_time * 1000:8.1f} ms   x{python_time / io_time:.1f}")
+
+
+if __name__ == "__main__":
+    main()
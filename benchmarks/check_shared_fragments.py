@@ -0,0 +1,61 @@
+"""
+Checks that the blocks shared by the generated operations (see `gateway_fragments`) can't be modified through one
+operation: modifying them raises a TypeError and the other operations, and the next conversions, are unchanged.
+
+Run from the repository root:
+    python -m benchmarks.check_shared_fragments
+"""
+import contextlib
+import io
+import operator
+
+import source_generator
+import yaml_io as yaml_io
+from benchmarks.check_unused_schemas import SPEC
+from benchmarks.run_benchmarks import GATEWAY_FIELDS
+
+PATHS = ["/v1/items", "/v1/items/{id}"]
+
+# Changes of the shared blocks of a generated operation, each one must be refused
+MUTATIONS = {
+    "standard header": lambda operation: operator.setitem(operation['parameters'][0], 'required', False),
+    "header schema": lambda operation: operator.setitem(operation['parameters'][0]['schema'], 'type', 'integer'),
+    "error response": lambda operation: operator.setitem(operation['responses']['404'], 'description', 'Not found'),
+    "response headers": lambda operation: operator.delitem(operation['responses']['404']['headers'], 'x-trace-id'),
+    "error integration": lambda operation: operator.delitem(
+        operation['x-amazon-apigateway-integration']['responses']['^500$']['responseParameters'],
+        'method.response.header.Access-Control-Allow-Origin'),
+}
+
+
+def generate(workers=None) -> dict:
+    """The generated configuration of each of `PATHS`."""
+    spec = {**SPEC, "paths": {**SPEC["paths"], PATHS[1]: {"delete": {
+        "operationId": "deleteItem",
+        "parameters": [{"name": "id", "in": "path", "schema": {"type": "string"}}],
+        "responses": {"200": {"description": "OK"}}
+    }}}}
+    with contextlib.redirect_stdout(io.StringIO()):
+        return {path: path_config for path, path_config, _ in source_generator.generate_paths(
+            spec, PATHS, GATEWAY_FIELDS["frontend_url"], GATEWAY_FIELDS["vpc_connection_id"], workers=workers)}
+
+
+def main():
+    for workers in (None, 2):
+        paths = generate(workers)
+        expected = yaml_io.dump_gateway_path(PATHS[1], paths[PATHS[1]])
+        for name, mutation in MUTATIONS.items():
+            try:
+                mutation(paths[PATHS[0]]['get'])
+            except TypeError:
+                pass
+            else:
+                raise AssertionError(f"workers={workers}: the shared {name} of an operation could be modified")
+        assert yaml_io.dump_gateway_path(PATHS[1], paths[PATHS[1]]) == expected, f"workers={workers}: changed"
+        assert yaml_io.dump_gateway_path(PATHS[1], generate(workers)[PATHS[1]]) == expected, \
+            f"workers={workers}: the next conversion changed"
+        print(f"workers={workers}: ok")
+
+
+if __name__ == "__main__":
+    main()
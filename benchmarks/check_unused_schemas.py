@@ -0,0 +1,88 @@
+"""
+Checks that the schemas marked as unused (the flattened query objects) are kept when a schema of the output still
+references them, in every generation mode: the gateway mustn't contain a `$ref` to a deleted schema.
+
+Run from the repository root:
+    python -m benchmarks.check_unused_schemas
+"""
+import contextlib
+import io
+import json
+import os
+import tempfile
+
+import gateway_fragments as gateway_fragments
+import ref_graph as ref_graph
+import source_generator
+import yaml_io as yaml_io
+from benchmarks.run_benchmarks import GATEWAY_FIELDS
+
+# `PageQuery` is flattened into the query parameters of the operation, `Wrapper` isn't referenced by any path but
+# is kept, so `PageQuery` must be kept too. `SortQuery` is only referenced by the operation, it's deleted. The error
+# responses of the gateway refer to `gateway_fragments.ERROR_RESPONSE_SCHEMA`
+SPEC = {
+    "openapi": "3.0.1",
+    "info": {"title": "unused-schemas", "version": "1.0"},
+    "paths": {
+        "/v1/items": {
+            "get": {
+                "operationId": "listItems",
+                "parameters": [
+                    {"name": "page", "in": "query", "schema": {"$ref": "#/components/schemas/PageQuery"}},
+                    {"name": "sort", "in": "query", "schema": {"$ref": "#/components/schemas/SortQuery"}}
+                ],
+                "responses": {"200": {"description": "OK"}}
+            }
+        }
+    },
+    "components": {
+        "schemas": {
+            "PageQuery": {
+                "type": "object",
+                "properties": {"page": {"type": "integer"}, "size": {"type": "integer"}}
+            },
+            "SortQuery": {
+                "type": "object",
+                "properties": {"sort": {"type": "string"}}
+            },
+            "Wrapper": {
+                "type": "object",
+                "properties": {"query": {"$ref": "#/components/schemas/PageQuery"}}
+            },
+            gateway_fragments.ERROR_RESPONSE_SCHEMA: {
+                "type": "object",
+                "properties": {"code": {"type": "string"}, "message": {"type": "string"}}
+            }
+        }
+    }
+}
+
+MODES = {
+    "default": {},
+    "workers": {"workers": 2},
+    "incremental": {"incremental": True},
+    "stream_paths": {"stream_paths": True}
+}
+
+
+def main():
+    with tempfile.TemporaryDirectory() as out_dir:
+        spec_path = os.path.join(out_dir, "api-docs.json")
+        with open(spec_path, 'w') as file:
+            json.dump(SPEC, file)
+        for mode, options in MODES.items():
+            output_path = os.path.join(out_dir, f"gateway-{mode}.yaml")
+            with contextlib.redirect_stdout(io.StringIO()):
+                source_generator.format_swagger_to_template(spec_path, output_path, **GATEWAY_FIELDS,
+                                                            use_spec_cache=False, **options)
+            output_data = yaml_io.load_file(output_path)
+            schemas = output_data["components"]["schemas"]
+            dangling_refs = set(ref_graph.RefGraph.build(output_data).referrers) - set(schemas)
+            assert not dangling_refs, f"{mode}: $ref to the deleted schema(s) {sorted(dangling_refs)}"
+            assert "PageQuery" in schemas and "Wrapper" in schemas, f"{mode}: {sorted(schemas)}"
+            assert "SortQuery" not in schemas, f"{mode}: {sorted(schemas)}"
+            print(f"{mode}: ok")
+
+
+if __name__ == "__main__":
+    main()
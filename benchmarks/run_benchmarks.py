@@ -0,0 +1,184 @@
+"""
+Times each stage of the gateway, OpenAPI and merge flows on a synthetic spec (or a given one) and compares the
+results to a stored baseline.
+
+Run from the repository root:
+    python -m benchmarks.run_benchmarks --paths 5000 --methods 2 --output results.json
+    python -m benchmarks.run_benchmarks --paths 5000 --methods 2 --baseline results.json
+The exit code is 1 when a stage is slower than its baseline by more than the threshold.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import merging_apis
+import open_api_generator
+import source_generator
+import yaml_io as yaml_io
+from benchmarks import synthetic_spec
+
+GATEWAY_FIELDS = {
+    "frontend_url": "'http://localhost:5173'",
+    "vpc_connection_id": "abc123",
+    "info_title": "synthetic-api",
+    "info_description": "",
+    "info_version": "1.0",
+    "servers_url": "https://api.example.com/{basePath}",
+    "base_path_default": "synthetic-dev"
+}
+
+# Stages faster than this (in seconds) are too noisy to be flagged as regressions
+MIN_REGRESSION_SECONDS = 0.005
+
+
+class StageTimer:
+    """Keeps the best wall time of each stage over several runs."""
+
+    def __init__(self):
+        self.timings = {}
+
+    def run(self, stage: str, func):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        self.timings[stage] = min(elapsed, self.timings.get(stage, elapsed))
+        return result
+
+
+def bench_gateway(timer: StageTimer, spec_path: str, out_dir: str):
+    output_path = os.path.join(out_dir, "gateway.yaml")
+    swagger_data = timer.run("gateway.load", lambda: yaml_io.load_file(spec_path))
+    swagger_data = timer.run("gateway.process_components", lambda: source_generator.process_components(swagger_data))
+    output_data = source_generator.generate_output_data_template(
+        swagger_data, GATEWAY_FIELDS["info_title"], GATEWAY_FIELDS["info_description"],
+        GATEWAY_FIELDS["info_version"], GATEWAY_FIELDS["servers_url"], GATEWAY_FIELDS["base_path_default"]
+    )
+    to_be_deleted_schemas = set()
+
+    def process_paths():
+        for path, path_config, path_marks in source_generator.generate_paths(
+                swagger_data, list(swagger_data["paths"]), GATEWAY_FIELDS["frontend_url"],
+                GATEWAY_FIELDS["vpc_connection_id"]):
+            output_data["paths"][path] = path_config
+            to_be_deleted_schemas.update(path_marks)
+
+    timer.run("gateway.process_paths", process_paths)
+    timer.run("gateway.delete_unused_schemas",
+              lambda: source_generator.delete_unused_schemas(to_be_deleted_schemas, output_data))
+    def dump():
+        with open(output_path, 'w') as file:
+            yaml_io.dump_gateway(output_data, file)
+
+    timer.run("gateway.dump", dump)
+    timer.run("gateway.end_to_end",
+              lambda: source_generator.format_swagger_to_template(spec_path, output_path, **GATEWAY_FIELDS,
+                                                                  use_spec_cache=False))
+    return output_path
+
+
+def bench_open_api(timer: StageTimer, spec_path: str, out_dir: str):
+    output_path = os.path.join(out_dir, "openapi.yaml")
+    swagger_data = timer.run("openapi.load", lambda: yaml_io.load_file(spec_path))
+    timer.run("openapi.transform", lambda: open_api_generator.transform_swagger(swagger_data))
+
+    def dump():
+        with open(output_path, 'w') as file:
+            yaml_io.dump(swagger_data, file, sort_keys=False, anchors=False)
+
+    timer.run("openapi.dump", dump)
+    timer.run("openapi.end_to_end",
+              lambda: open_api_generator.process_swagger_file(spec_path, output_path, use_spec_cache=False))
+    return output_path
+
+
+def bench_merge(timer: StageTimer, remote_path: str, new_path: str, out_dir: str):
+    remote_api, new_api = timer.run(
+        "merge.load", lambda: (merging_apis.load_yaml(remote_path, False), merging_apis.load_yaml(new_path, False))
+    )
+    merged = timer.run("merge.merge", lambda: merging_apis.merge_yaml(remote_api, new_api))
+    timer.run("merge.save", lambda: merging_apis.save_yaml(merged, os.path.join(out_dir, "merged.yaml")))
+
+
+def run_benchmarks(spec_path: str, repeat: int = 3) -> dict:
+    """Runs all the flows `repeat` times on the spec and returns the best time of each stage in seconds."""
+    timer = StageTimer()
+    with tempfile.TemporaryDirectory() as out_dir, open(os.devnull, 'w') as devnull, \
+            contextlib.redirect_stdout(devnull):
+        for _ in range(repeat):
+            gateway_path = bench_gateway(timer, spec_path, out_dir)
+            open_api_path = bench_open_api(timer, spec_path, out_dir)
+            bench_merge(timer, gateway_path, open_api_path, out_dir)
+    return timer.timings
+
+
+def compare_to_baseline(stages: dict, baseline_stages: dict, threshold: float) -> list[str]:
+    """Prints the comparison of each stage to the baseline and returns the stages that regressed."""
+    regressions = []
+    for stage, seconds in stages.items():
+        baseline_seconds = baseline_stages.get(stage)
+        if baseline_seconds is None:
+            print(f"{stage:<36} {seconds * 1000:10.1f} ms   (no baseline)")
+            continue
+        change = (seconds - baseline_seconds) / baseline_seconds if baseline_seconds else 0.0
+        regressed = change > threshold and seconds - baseline_seconds > MIN_REGRESSION_SECONDS
+        if regressed:
+            regressions.append(stage)
+        print(f"{stage:<36} {seconds * 1000:10.1f} ms   baseline {baseline_seconds * 1000:10.1f} ms   "
+              f"{change:+7.1%}{'   REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the generation stages")
+    synthetic_spec.add_spec_arguments(parser)
+    parser.add_argument("--spec", help="Benchmark this spec instead of a synthetic one")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage, the best time is kept")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare the results to this JSON results file")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Relative slowdown flagged as a regression (default: 0.2)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as spec_dir:
+        if args.spec:
+            spec_path, spec_info = args.spec, {"file": args.spec}
+        else:
+            spec_path = os.path.join(spec_dir, "synthetic-api-docs.json")
+            spec_info = synthetic_spec.spec_arguments(args)
+            synthetic_spec.write_spec(spec_path, **spec_info)
+        spec_info["bytes"] = os.path.getsize(spec_path)
+        stages = run_benchmarks(spec_path, args.repeat)
+
+    results = {
+        "spec": spec_info,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "libyaml": yaml_io.HAS_LIBYAML
+        },
+        "stages": stages
+    }
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+    baseline_stages = {}
+    if args.baseline:
+        with open(args.baseline, 'r') as file:
+            baseline = json.load(file)
+        if baseline.get("spec") != spec_info:
+            print(f"Warning: the baseline was measured on another spec: {baseline.get('spec')}")
+        baseline_stages = baseline.get("stages", {})
+    regressions = compare_to_baseline(stages, baseline_stages, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} stage(s) regressed: {', '.join(regressions)}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
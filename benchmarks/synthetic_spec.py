@@ -0,0 +1,196 @@
+"""
+Generator of synthetic Spring (springdoc) style OpenAPI specs of any size, to benchmark the generators on specs
+much bigger than the bundled `api-docs.json`.
+
+Run from the repository root to write a spec:
+    python -m benchmarks.synthetic_spec --paths 5000 --methods 2 output/synthetic-api-docs.json
+"""
+import argparse
+import json
+
+HTTP_METHODS = ("get", "post", "put", "patch", "delete")
+
+
+def _response_header_schema():
+    return {
+        "type": "object",
+        "properties": {
+            "status": {"type": "integer", "format": "int32"},
+            "code": {"type": "string", "example": "E000000"},
+            "title": {"type": "string"},
+            "detail": {"type": "string"},
+            "errors": {"type": "array", "items": {"$ref": "#/components/schemas/SubError"}}
+        }
+    }
+
+
+def _resource_schema(index: int, field_count: int):
+    properties = {
+        "id": {"type": "integer", "format": "int64"},
+        "status": {"type": "string", "x-allowedStrings": ["ACTIVE", "INACTIVE", "PENDING"],
+                   "x-message": "Invalid status"},
+    }
+    for field in range(field_count):
+        properties[f"field{field}"] = {
+            "type": "string",
+            "x-minLength": 1,
+            "x-maxLength": 50 + field,
+            "example": f"value {index}-{field}"
+        }
+    return {"required": ["id", "status"], "type": "object", "properties": properties}
+
+
+def _query_schemas(index: int, nested_depth: int) -> dict:
+    """A paginated query DTO of `nested_depth` levels of nested filter objects."""
+    name = f"Resource{index}Query"
+    schemas = {
+        name: {
+            "required": ["page"],
+            "type": "object",
+            "properties": {
+                "page": {"type": "integer", "format": "int32", "x-minimum": 0},
+                "size": {"type": "integer", "format": "int32", "x-maximum": 100},
+                "sort": {"type": "string"},
+            }
+        }
+    }
+    parent = schemas[name]
+    for depth in range(nested_depth):
+        nested_name = f"{name}Filter{depth}"
+        parent["properties"]["filter"] = {"$ref": f"#/components/schemas/{nested_name}"}
+        schemas[nested_name] = {
+            "type": "object",
+            "properties": {
+                "name": {"type": "string"},
+                "from": {"type": "string", "format": "date"},
+                "to": {"type": "string", "format": "date"},
+            }
+        }
+        parent = schemas[nested_name]
+    return schemas
+
+
+def _json_content(schema_name: str):
+    return {"application/json": {"schema": {"$ref": f"#/components/schemas/{schema_name}"}}}
+
+
+def _operation(method: str, resource_index: int, query_dtos: int, has_path_param: bool):
+    operation = {
+        "tags": [f"Resource {resource_index}"],
+        "operationId": f"{method}Resource{resource_index}{'ById' if has_path_param else ''}",
+        "parameters": [],
+        "responses": {
+            "200": {"description": "OK", "content": _json_content(f"ResponseMessageResource{resource_index}")}
+        }
+    }
+    if has_path_param:
+        operation["parameters"].append(
+            {"name": "resourceId", "in": "path", "required": True, "schema": {"type": "integer", "format": "int64"}}
+        )
+    if method == "get" and not has_path_param and query_dtos:
+        operation["parameters"].append({
+            "name": "query", "in": "query", "required": True,
+            "schema": {"$ref": f"#/components/schemas/Resource{resource_index % query_dtos}Query"}
+        })
+    if method in ("post", "put", "patch"):
+        operation["requestBody"] = {"content": _json_content(f"Resource{resource_index}"), "required": True}
+    if method == "delete":
+        operation["responses"]["200"]["content"] = _json_content("EmptyResponse")
+    if not operation["parameters"]:
+        del operation["parameters"]
+    return operation
+
+
+def generate_spec(paths: int = 100, methods: int = 2, query_dtos: int = 10, nested_depth: int = 2,
+                  extra_schemas: int = 0, fields: int = 5) -> dict:
+    """
+    Generates a Spring style spec.
+    Args:
+        paths (int): Number of paths, half of them with a path parameter.
+        methods (int): Number of HTTP methods (1 to 5) of each path, the spec has `paths * methods` operations.
+        query_dtos (int): Number of query DTO schemas, shared by the list (get) operations.
+        nested_depth (int): Levels of nested filter objects of each query DTO.
+        extra_schemas (int): Number of additional schemas not referenced by any path.
+        fields (int): Number of string fields of each resource schema.
+    """
+    if not 1 <= methods <= len(HTTP_METHODS):
+        raise ValueError(f"methods must be between 1 and {len(HTTP_METHODS)}")
+
+    schemas = {
+        "ResponseHeader": _response_header_schema(),
+        "SubError": {"type": "object", "properties": {"field": {"type": "string"}, "message": {"type": "string"}}},
+        "EmptyResponse": {"type": "object", "properties": {"header": {"$ref": "#/components/schemas/ResponseHeader"}}}
+    }
+    for index in range(query_dtos):
+        schemas.update(_query_schemas(index, nested_depth))
+
+    spec_paths = {}
+    resources = (paths + 1) // 2
+    for index in range(resources):
+        schemas[f"Resource{index}"] = _resource_schema(index, fields)
+        schemas[f"ResponseMessageResource{index}"] = {
+            "type": "object",
+            "properties": {
+                "header": {"$ref": "#/components/schemas/ResponseHeader"},
+                "data": {"$ref": f"#/components/schemas/Resource{index}"}
+            }
+        }
+        for has_path_param in (False, True):
+            if len(spec_paths) == paths:
+                break
+            path = f"/v1/resources-{index}/{{resourceId}}" if has_path_param else f"/v1/resources-{index}"
+            spec_paths[path] = {
+                method: _operation(method, index, query_dtos, has_path_param) for method in HTTP_METHODS[:methods]
+            }
+    for index in range(extra_schemas):
+        schemas[f"Unused{index}"] = _resource_schema(index, fields)
+
+    return {
+        "openapi": "3.0.1",
+        "info": {"title": "Synthetic Service Documentation.", "description": "Synthetic spec", "version": "1.0"},
+        "servers": [{"url": "http://localhost:8080/synthetic", "description": "Generated server url"}],
+        "paths": spec_paths,
+        "components": {"schemas": schemas}
+    }
+
+
+def write_spec(file_path: str, **kwargs) -> dict:
+    """Generates a spec (see `generate_spec` for the arguments) and writes it as JSON like springdoc does."""
+    spec = generate_spec(**kwargs)
+    with open(file_path, 'w') as file:
+        json.dump(spec, file, indent=2)
+    return spec
+
+
+def add_spec_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--paths", type=int, default=100, help="Number of paths")
+    parser.add_argument("--methods", type=int, default=2, help="HTTP methods per path (1 to 5)")
+    parser.add_argument("--query-dtos", type=int, default=10, help="Number of query DTO schemas")
+    parser.add_argument("--nested-depth", type=int, default=2, help="Nested $ref depth of the query DTOs")
+    parser.add_argument("--extra-schemas", type=int, default=0, help="Schemas not referenced by any path")
+    parser.add_argument("--fields", type=int, default=5, help="String fields per resource schema")
+
+
+def spec_arguments(args) -> dict:
+    return {
+        "paths": args.paths,
+        "methods": args.methods,
+        "query_dtos": args.query_dtos,
+        "nested_depth": args.nested_depth,
+        "extra_schemas": args.extra_schemas,
+        "fields": args.fields
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic Spring style OpenAPI spec")
+    add_spec_arguments(parser)
+    parser.add_argument("output", help="Path of the JSON spec to write")
+    args = parser.parse_args()
+    spec = write_spec(args.output, **spec_arguments(args))
+    operations = sum(len(methods) for methods in spec["paths"].values())
+    print(f"Wrote {args.output}: {operations} operations, {len(spec['components']['schemas'])} schemas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,424 @@
+"""
+Headless command line driver of the generators.
+
+Usage:
+    python cli.py batch manifest.json [--jobs N] [--incremental] [--shared-fragments {anchors,components}]
+                                      [--report report.json [--report-memory]]
+                                      [--shard-by {prefix,tag,size} [--shard-max-bytes N] [--shard-prefix-segments N]]
+                                      [--stream-paths] [--dedupe-schemas]
+    python cli.py watch manifest.json [--debounce SECONDS] [--poll-interval SECONDS]
+                                      [--shared-fragments components]
+    python cli.py merge output.yml gateway-1.yml gateway-2.yml ... [--jobs N] [--fail-on-conflict]
+    python cli.py fill template.yaml endpoints.csv output.yml
+    python cli.py diff deployed-gateway.yml gateway.yml [--patch patch.json] [--fail-on-changes]
+
+The manifest is a JSON file listing the specs to convert, relative paths are resolved from the manifest folder:
+    {
+        "profile": "profiles/dev.json",
+        "specs": [
+            {
+                "input": "input/product-api-docs.json",
+                "gateway_output": "output/product-gateway.yml",
+                "openapi_output": "output/product-openapi.yml",
+                "profile": "profiles/product-dev.json"
+            }
+        ]
+    }
+Each spec needs at least one of `gateway_output` and `openapi_output`. The gateway generation uses the spec
+`profile`, or the top level one, which are gateway fields files saved by the GUI "Save Gateway Fields" button,
+optionally with overrides of the gateway responses (see `gateway_profiles.load_gateway_response_overrides`).
+
+`--shard-by` splits each gateway in several self-contained files next to its `gateway_output`, by path prefix, by
+tag or by size, listed with their sizes and hashes in a `.shards.json` manifest (see `gateway_shards`).
+
+`--stream-paths` reads the paths of the specs one at a time instead of loading the specs whole, for specs too big
+for the memory available (see `spec_stream`). It can't be combined with `--incremental`, `--shard-by` or the anchors.
+
+`--dedupe-schemas` collapses the structurally identical schemas of each spec into one before generating its gateway,
+the canonical schema of each removed one is listed in a `.schema-dedup.json` report next to the gateway (see
+`schema_dedup`).
+
+`--report` writes the results of the specs to a JSON file, with the time (and with `--report-memory` the peak
+memory) of each stage of the conversions and their counters (see `instrumentation`).
+
+`watch` converts the specs of the manifest, then watches the specs, the profiles and the manifest itself, and
+converts again the specs whose input or profile changed (only the gateway when only the profile changed). The
+conversions run in the watching process, incrementally, and the parsed specs are kept in memory between them
+(see `spec_cache.WarmSpecCache`), with the digests and the generated YAML of the paths of each gateway (see
+`path_cache.WarmPathCache`): after a change, only the changed path items and schemas are hashed again.
+
+`merge` merges any number of gateway (or OpenAPI) YAML files into the first one in a single pass and reports the
+paths and components defined differently in several of them (see `merging_apis.merge_many`).
+
+With `--spec-cache` (or `SWAGGER_CONVERTER_SPEC_CACHE=1`) the input specs are loaded through an on-disk cache of the
+parsed specs (see `spec_cache`), `--no-spec-cache` bypasses it and `--clear-spec-cache` empties it.
+
+`fill` fills the endpoint template once per endpoint of a CSV or JSON list into one document (see
+`gateway_one_api_generator.fill_endpoints` for the columns).
+
+`diff` compares a generated gateway to the deployed definition (exported as YAML or JSON) and prints the added,
+removed and modified operations, components and sections, `--patch` writes them as a JSON Patch of the deployed
+definition (see `gateway_diff`).
+
+Each command only imports the modules it uses, when it runs, to keep the start of the command line short.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import gateway_profiles
+import instrumentation as instrumentation_module
+
+
+def load_manifest(manifest_path: str) -> list[dict]:
+    """Loads a batch manifest and returns its jobs with absolute paths and the profile fields loaded."""
+    with open(manifest_path, 'r') as f:
+        manifest = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+
+    def resolve(path):
+        return os.path.join(base_dir, path) if path else None
+
+    profiles = {}
+    jobs = []
+    for spec in manifest.get("specs", []):
+        job = {
+            "input": resolve(spec["input"]),
+            "gateway_output": resolve(spec.get("gateway_output")),
+            "openapi_output": resolve(spec.get("openapi_output")),
+            "profile": None,
+            "gateway_fields": None,
+            "gateway_response_overrides": None
+        }
+        if not job["gateway_output"] and not job["openapi_output"]:
+            raise ValueError(f"No gateway_output nor openapi_output given for {spec['input']}")
+        if job["gateway_output"]:
+            profile_path = resolve(spec.get("profile", manifest.get("profile")))
+            if not profile_path:
+                raise ValueError(f"A gateway fields profile is needed to generate the gateway of {spec['input']}")
+            if profile_path not in profiles:
+                profiles[profile_path] = (gateway_profiles.load_gateway_fields(profile_path),
+                                          gateway_profiles.load_gateway_response_overrides(profile_path))
+            gateway_fields, gateway_response_overrides = profiles[profile_path]
+            missing_fields = gateway_profiles.missing_mandatory_fields(gateway_fields)
+            if missing_fields:
+                raise ValueError(f"Missing mandatory gateway fields in {profile_path}: {', '.join(missing_fields)}")
+            job["profile"] = profile_path
+            job["gateway_fields"] = gateway_fields
+            job["gateway_response_overrides"] = gateway_response_overrides
+        jobs.append(job)
+    return jobs
+
+
+def run_job(job: dict, gateway_options: dict = None, instrumentation_options: dict = None,
+            use_spec_cache: bool = None) -> dict:
+    """
+    Runs the conversions of one manifest entry, errors are reported in the result instead of raised.
+    `gateway_options` are extra keyword arguments of `source_generator.format_swagger_to_template`, their
+    `stream_paths` also applies to the OpenAPI conversion. The `path_cache` of the job (see `watch_command`), if
+    any, is its `incremental` option.
+    With `instrumentation_options` (keyword arguments of `instrumentation.Instrumentation`), the result has the
+    instrumentation report of each conversion in `report`.
+    `use_spec_cache` tells whether the input is loaded through the parsed specs cache (see `spec_cache`).
+    """
+    import open_api_generator
+    import source_generator
+
+    start = time.perf_counter()
+    result = {"input": job["input"], "status": "ok", "error": None}
+    instrumentations = {}
+    if instrumentation_options is not None:
+        instrumentations = {
+            conversion: instrumentation_module.Instrumentation(**instrumentation_options)
+            for conversion in ("openapi", "gateway") if job[f"{conversion}_output"]
+        }
+    try:
+        for output_path in (job["openapi_output"], job["gateway_output"]):
+            if output_path:
+                os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        if job["openapi_output"]:
+            open_api_generator.process_swagger_file(job["input"], job["openapi_output"],
+                                                    instrumentations.get("openapi"), use_spec_cache,
+                                                    (gateway_options or {}).get('stream_paths', False))
+        if job["gateway_output"]:
+            if job.get("path_cache") is not None:
+                gateway_options = {**(gateway_options or {}), 'incremental': job["path_cache"]}
+            source_generator.format_swagger_to_template(job["input"], job["gateway_output"], **job["gateway_fields"],
+                                                        **(gateway_options or {}),
+                                                        instrumentation=instrumentations.get("gateway"),
+                                                        gateway_response_overrides=job["gateway_response_overrides"],
+                                                        use_spec_cache=use_spec_cache)
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        for instrumentation in instrumentations.values():
+            instrumentation.close()
+    result["seconds"] = time.perf_counter() - start
+    if instrumentations:
+        result["report"] = {conversion: instrumentation.report()
+                            for conversion, instrumentation in instrumentations.items()}
+    return result
+
+
+def run_batch(jobs: list[dict], concurrency: int = None, gateway_options: dict = None,
+              instrumentation_options: dict = None, use_spec_cache: bool = None) -> list[dict]:
+    """Runs `jobs` on a pool of `concurrency` processes (CPU count by default), results are in the jobs order."""
+    if concurrency == 1 or len(jobs) <= 1:
+        return [run_job(job, gateway_options, instrumentation_options, use_spec_cache) for job in jobs]
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(run_job, jobs, [gateway_options] * len(jobs),
+                                 [instrumentation_options] * len(jobs), [use_spec_cache] * len(jobs)))
+
+
+def print_summary(results: list[dict], total_seconds: float):
+    print()
+    for result in results:
+        print(f"{result['status']:<7} {result['seconds']:8.2f}s  {result['input']}")
+        if result["error"]:
+            print(f"        {result['error']}")
+    failed = sum(result["status"] != "ok" for result in results)
+    print(f"{len(results) - failed} succeeded, {failed} failed in {total_seconds:.2f}s")
+
+
+def spec_cache_option(args):
+    """Applies the parsed specs cache arguments, returns the `use_spec_cache` option of the conversions."""
+    if args.clear_spec_cache:
+        import spec_cache
+        print(f"Removed {spec_cache.SpecCache().clear()} parsed spec(s) from the cache")
+    if args.no_spec_cache:
+        return False
+    return True if args.spec_cache else None
+
+
+def batch_command(args) -> int:
+    start = time.perf_counter()
+    gateway_options = {'incremental': args.incremental, 'shared_fragments': args.shared_fragments}
+    if args.shard_by:
+        import gateway_shards
+        gateway_options['shard_plan'] = gateway_shards.ShardPlan(args.shard_by, args.shard_prefix_segments,
+                                                                 args.shard_max_bytes)
+    if args.stream_paths:
+        gateway_options['stream_paths'] = True
+    if args.dedupe_schemas:
+        gateway_options['dedupe_schemas'] = True
+    instrumentation_options = {'trace_memory': args.report_memory} if args.report else None
+    results = run_batch(load_manifest(args.manifest), args.jobs, gateway_options, instrumentation_options,
+                        spec_cache_option(args))
+    total_seconds = time.perf_counter() - start
+    print_summary(results, total_seconds)
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump({"specs": results, "seconds": total_seconds}, f, indent=2)
+        print(f"Report saved to: {args.report}")
+    return 1 if any(result["status"] != "ok" for result in results) else 0
+
+
+def watched_files(manifest_path: str, jobs: list[dict]) -> list[str]:
+    """The files whose changes are watched by `watch`: the manifest, and the inputs and profiles of its `jobs`."""
+    file_paths = [manifest_path]
+    for job in jobs:
+        file_paths.extend(file_path for file_path in (job["input"], job["profile"])
+                          if file_path and file_path not in file_paths)
+    return file_paths
+
+
+def affected_jobs(jobs: list[dict], changed_files: set[str]) -> list[dict]:
+    """
+    The conversions of `jobs` to run again after `changed_files` changed. A job whose profile changed but not its
+    input is returned without its OpenAPI output, which doesn't depend on the profile.
+    """
+    affected = []
+    for job in jobs:
+        if job["input"] in changed_files:
+            affected.append(job)
+        elif job["profile"] in changed_files:
+            affected.append({**job, "openapi_output": None})
+    return affected
+
+
+def with_path_caches(jobs: list[dict], path_caches: dict) -> list[dict]:
+    """
+    Gives each job the `path_cache.WarmPathCache` of its gateway output from `path_caches`, created the first time,
+    so the digests and the fragments of each gateway stay in memory between its conversions. The caches of the
+    outputs no job writes anymore are dropped.
+    """
+    import path_cache
+
+    for job in jobs:
+        if job["gateway_output"]:
+            job["path_cache"] = path_caches.setdefault(job["gateway_output"], path_cache.WarmPathCache())
+    for output_path in set(path_caches) - {job["gateway_output"] for job in jobs}:
+        del path_caches[output_path]
+    return jobs
+
+
+def watch_command(args) -> int:
+    import spec_cache
+    import watcher
+
+    manifest_path = os.path.abspath(args.manifest)
+    # The path fragments cache can't be used with the anchors (see `format_swagger_to_template`)
+    gateway_options = {'incremental': True, 'shared_fragments': args.shared_fragments}
+    use_spec_cache = spec_cache_option(args)
+    # The parsed specs are kept in memory between the conversions, and also saved on disk when the cache is enabled
+    warm_spec_cache = spec_cache.WarmSpecCache(
+        persist=spec_cache.cache_enabled_by_default() if use_spec_cache is None else use_spec_cache)
+    path_caches = {}
+    jobs = with_path_caches(load_manifest(manifest_path), path_caches)
+    start = time.perf_counter()
+    print_summary(run_batch(jobs, 1, gateway_options, use_spec_cache=warm_spec_cache), time.perf_counter() - start)
+
+    file_watcher = watcher.FileWatcher(watched_files(manifest_path, jobs), args.poll_interval, args.debounce)
+    print(f"Watching {len(file_watcher.file_paths)} file(s), press Ctrl+C to stop")
+    try:
+        while True:
+            changed_files = file_watcher.wait_for_changes()
+            start = time.perf_counter()
+            if manifest_path in changed_files or any(job["profile"] in changed_files for job in jobs):
+                try:
+                    new_jobs = with_path_caches(load_manifest(manifest_path), path_caches)
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"Could not reload {manifest_path}, keeping the previous specs: {type(e).__name__}: {e}")
+                else:
+                    if manifest_path in changed_files:
+                        # Any spec could have been added or changed, all of them are converted again
+                        changed_files.update(job["input"] for job in new_jobs)
+                    jobs = new_jobs
+                    file_watcher.watch(watched_files(manifest_path, jobs))
+            results = run_batch(affected_jobs(jobs, changed_files), 1, gateway_options,
+                                use_spec_cache=warm_spec_cache)
+            if results:
+                print_summary(results, time.perf_counter() - start)
+    except KeyboardInterrupt:
+        print("Stopped watching")
+    return 0
+
+
+def merge_command(args) -> int:
+    import merging_apis
+
+    start = time.perf_counter()
+    conflicts = merging_apis.merge_files(args.inputs, args.output, args.jobs, spec_cache_option(args))
+    for line in merging_apis.format_conflicts(conflicts):
+        print(line)
+    print(f"Merged {len(args.inputs)} files into {args.output} with {len(conflicts)} conflict(s) in "
+          f"{time.perf_counter() - start:.2f}s")
+    return 1 if conflicts and args.fail_on_conflict else 0
+
+
+def fill_command(args) -> int:
+    import gateway_one_api_generator
+
+    gateway_one_api_generator.generate_yaml_from_endpoints(args.template, args.endpoints, args.output)
+    return 0
+
+
+def diff_command(args) -> int:
+    import gateway_diff
+
+    start = time.perf_counter()
+    patch, changes = gateway_diff.diff_files(args.deployed, args.generated, spec_cache_option(args))
+    for line in gateway_diff.format_changes(changes):
+        print(line)
+    if args.patch:
+        with open(args.patch, 'w') as f:
+            json.dump(patch, f, indent=2)
+        print(f"JSON Patch of {len(patch)} operation(s) saved to: {args.patch}")
+    print(f"{len(changes)} change(s) found in {time.perf_counter() - start:.2f}s")
+    return 1 if changes and args.fail_on_changes else 0
+
+
+def add_spec_cache_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--spec-cache", action="store_true",
+                        help="Load the input specs from the parsed specs cache, the cache folder must only be "
+                             "writable by you")
+    parser.add_argument("--no-spec-cache", action="store_true",
+                        help="Parse the input specs again instead of loading them from the parsed specs cache, "
+                             "even if SWAGGER_CONVERTER_SPEC_CACHE enables it")
+    parser.add_argument("--clear-spec-cache", action="store_true",
+                        help="Empty the parsed specs cache before running")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Swagger Converter command line interface")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    batch_parser = subparsers.add_parser("batch", help="Convert all the specs listed in a manifest")
+    batch_parser.add_argument("manifest", help="Path to the JSON manifest listing the specs to convert")
+    batch_parser.add_argument("-j", "--jobs", type=int, default=None,
+                              help="Number of specs converted in parallel (default: CPU count)")
+    batch_parser.add_argument("--incremental", action="store_true",
+                              help="Only regenerate the gateway paths that changed since the previous run")
+    batch_parser.add_argument("--shared-fragments", choices=["anchors", "components"], default=None,
+                              help="Write the blocks repeated in every operation once, as YAML anchors or as "
+                                   "components references")
+    batch_parser.add_argument("--shard-by", choices=["prefix", "tag", "size"], default=None,
+                              help="Split each gateway in self-contained files by path prefix, tag or size")
+    batch_parser.add_argument("--shard-max-bytes", type=int, default=None,
+                              help="Split the shards bigger than this size (default: 5 MB with --shard-by size)")
+    batch_parser.add_argument("--shard-prefix-segments", type=int, default=2,
+                              help="Number of leading path segments grouped with --shard-by prefix (default: 2)")
+    batch_parser.add_argument("--stream-paths", action="store_true",
+                              help="Read the paths of the specs one at a time instead of loading the specs whole")
+    batch_parser.add_argument("--dedupe-schemas", action="store_true",
+                              help="Collapse the structurally identical schemas of the specs before generating the "
+                                   "gateways")
+    batch_parser.add_argument("--report", default=None,
+                              help="Write the results with the time of each conversion stage to this JSON file")
+    batch_parser.add_argument("--report-memory", action="store_true",
+                              help="Add the peak memory of each stage to the report (slows the conversions down)")
+    add_spec_cache_arguments(batch_parser)
+    batch_parser.set_defaults(func=batch_command)
+
+    watch_parser = subparsers.add_parser("watch", help="Convert the specs of a manifest again each time they change")
+    watch_parser.add_argument("manifest", help="Path to the JSON manifest listing the specs to convert")
+    watch_parser.add_argument("--debounce", type=float, default=0.5,
+                              help="Seconds without any change to wait for before converting (default: 0.5)")
+    watch_parser.add_argument("--poll-interval", type=float, default=0.25,
+                              help="Seconds between two checks of the watched files (default: 0.25)")
+    watch_parser.add_argument("--shared-fragments", choices=["components"], default=None,
+                              help="Write the blocks repeated in every operation once as components references")
+    add_spec_cache_arguments(watch_parser)
+    watch_parser.set_defaults(func=watch_command)
+
+    merge_parser = subparsers.add_parser("merge", help="Merge several YAML files into one")
+    merge_parser.add_argument("output", help="Path of the merged YAML file")
+    merge_parser.add_argument("inputs", nargs="+", help="YAML files to merge, the first one receives the merge")
+    merge_parser.add_argument("-j", "--jobs", type=int, default=None,
+                              help="Number of files loaded in parallel (default: CPU count)")
+    merge_parser.add_argument("--fail-on-conflict", action="store_true",
+                              help="Exit with an error code when an entry is defined differently in several files")
+    add_spec_cache_arguments(merge_parser)
+    merge_parser.set_defaults(func=merge_command)
+
+    fill_parser = subparsers.add_parser("fill", help="Fill the endpoint template for a list of endpoints")
+    fill_parser.add_argument("template", help="Path to the YAML endpoint template")
+    fill_parser.add_argument("endpoints", help="Path to the CSV or JSON file listing the endpoints")
+    fill_parser.add_argument("output", help="Path of the YAML file to write")
+    fill_parser.set_defaults(func=fill_command)
+
+    diff_parser = subparsers.add_parser("diff", help="Compare a generated gateway to the deployed definition")
+    diff_parser.add_argument("deployed", help="Path to the deployed gateway definition, exported as YAML or JSON")
+    diff_parser.add_argument("generated", help="Path to the generated gateway YAML file")
+    diff_parser.add_argument("--patch", default=None,
+                             help="Write the changes as a JSON Patch of the deployed definition to this file")
+    diff_parser.add_argument("--fail-on-changes", action="store_true",
+                             help="Exit with an error code when the definitions differ")
+    add_spec_cache_arguments(diff_parser)
+    diff_parser.set_defaults(func=diff_command)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""
+Minimal change set between a deployed gateway definition and a newly generated one.
+
+The documents are compared through an index of their entries: operations by path and method, components by section
+and name, and the other top level sections as a whole. Only the entries that changed are in the change set, written
+as a JSON Patch (RFC 6902) of the deployed document and as a human summary. Each entry is compared once, the diff
+is linear in the size of the documents.
+
+Usage:
+    patch, changes = diff_files("gateway-deployed.yml", "gateway.yml")
+    print("\n".join(format_changes(changes)))
+"""
+import spec_cache as spec_cache
+
+HTTP_METHODS = ('get', 'put', 'post', 'delete', 'options', 'head', 'patch', 'trace')
+
+# Levels of entries indexed below each top level section, the other sections are compared as a whole
+INDEXED_SECTIONS = {'paths': 2, 'components': 2}
+
+
+def json_pointer(location) -> str:
+    """The JSON Pointer (RFC 6901) of a location given as a sequence of keys."""
+    return "".join("/" + str(key).replace("~", "~0").replace("/", "~1") for key in location)
+
+
+def describe(location: tuple) -> tuple[str, str]:
+    """The kind and name of the entry at `location`, e.g. ('operation', 'GET /users') or ('schemas', 'User')."""
+    if location[0] == 'paths' and len(location) == 3:
+        if location[2] in HTTP_METHODS:
+            return 'operation', f"{location[2].upper()} {location[1]}"
+        return 'path', f"{location[1]} {location[2]}"
+    if location[0] == 'paths' and len(location) == 2:
+        return 'path', location[1]
+    if location[0] == 'components' and len(location) == 3:
+        return location[1], location[2]
+    return 'section', "/".join(str(key) for key in location)
+
+
+def diff_documents(deployed: dict, generated: dict):
+    """
+    Compares the `deployed` gateway definition to the `generated` one.
+
+    Returns:
+        tuple[list[dict], list[dict]]: The JSON Patch turning `deployed` into `generated`, and the changes, each one
+            with the `kind` and `name` of the changed entry (see `describe`), the `change` (added, removed or
+            modified) and the JSON Pointer of the entry. The whole paths or sections added or removed are a single
+            patch operation but a change per entry.
+    """
+    patch = []
+    changes = []
+    # Location, deployed and generated mappings, levels left to index below them
+    stack = [((), deployed, generated, None)]
+    while stack:
+        location, deployed_entries, generated_entries, depth = stack.pop()
+        for key in deployed_entries:
+            if key not in generated_entries:
+                patch.append({'op': 'remove', 'path': json_pointer(location + (key,))})
+                _record_changes(changes, 'removed', location + (key,), deployed_entries[key],
+                                _entry_depth(location, key, depth))
+        for key, generated_value in generated_entries.items():
+            entry_location = location + (key,)
+            entry_depth = _entry_depth(location, key, depth)
+            if key not in deployed_entries:
+                patch.append({'op': 'add', 'path': json_pointer(entry_location), 'value': generated_value})
+                _record_changes(changes, 'added', entry_location, generated_value, entry_depth)
+                continue
+            deployed_value = deployed_entries[key]
+            if entry_depth and isinstance(deployed_value, dict) and isinstance(generated_value, dict):
+                stack.append((entry_location, deployed_value, generated_value, entry_depth))
+            elif deployed_value != generated_value:
+                patch.append({'op': 'replace', 'path': json_pointer(entry_location), 'value': generated_value})
+                _record_changes(changes, 'modified', entry_location, generated_value, 0)
+    return patch, changes
+
+
+def _entry_depth(location: tuple, key, depth) -> int:
+    """Levels of entries indexed below the entry `key` of `location`."""
+    if depth is None:
+        return INDEXED_SECTIONS.get(key, 0)
+    return depth - 1
+
+
+def _record_changes(changes: list, change: str, location: tuple, value, depth: int):
+    """Records a change for each entry of `value` found `depth` levels below it."""
+    if depth and isinstance(value, dict) and value:
+        for key, entry_value in value.items():
+            _record_changes(changes, change, location + (key,), entry_value, depth - 1)
+        return
+    kind, name = describe(location)
+    changes.append({'kind': kind, 'name': name, 'change': change, 'pointer': json_pointer(location)})
+
+
+def apply_patch(document: dict, patch: list[dict]) -> dict:
+    """
+    Applies a patch returned by `diff_documents` to `document`, modified in place. Only the operations it returns
+    are supported: add, remove and replace of object members.
+    """
+    for operation in patch:
+        keys = [key.replace("~1", "/").replace("~0", "~") for key in operation['path'].split("/")[1:]]
+        parent = document
+        for key in keys[:-1]:
+            parent = parent[key]
+        if operation['op'] == 'remove':
+            del parent[keys[-1]]
+        elif operation['op'] in ('add', 'replace'):
+            parent[keys[-1]] = operation['value']
+        else:
+            raise ValueError(f"Unsupported JSON Patch operation {operation['op']}")
+    return document
+
+
+def format_changes(changes: list[dict]) -> list[str]:
+    """Human readable summary of the changes returned by `diff_documents`, grouped by kind."""
+    if not changes:
+        return ["No changes"]
+    symbols = {'added': '+', 'removed': '-', 'modified': '~'}
+    changes_by_kind = {}
+    for change in changes:
+        changes_by_kind.setdefault(change['kind'], []).append(change)
+    lines = []
+    for kind, kind_changes in changes_by_kind.items():
+        counts = {change: sum(entry['change'] == change for entry in kind_changes) for change in symbols}
+        lines.append(f"{kind}: " + ", ".join(f"{count} {change}" for change, count in counts.items()))
+        for change in sorted(kind_changes, key=lambda entry: (list(symbols).index(entry['change']), entry['name'])):
+            lines.append(f"  {symbols[change['change']]} {change['name']}")
+    return lines
+
+
+def diff_files(deployed_path: str, generated_path: str, use_spec_cache=None):
+    """
+    Compares a deployed gateway definition exported as YAML or JSON to a generated one, see `diff_documents`.
+    `use_spec_cache` tells whether the files are loaded through the parsed specs cache (see `spec_cache.load_spec`).
+    """
+    return diff_documents(spec_cache.load_spec(deployed_path, use_spec_cache),
+                          spec_cache.load_spec(generated_path, use_spec_cache))
@@ -0,0 +1,162 @@
+"""
+Blocks repeated in every generated operation, built once and shared by all of them instead of being rebuilt as
+fresh dicts for each operation.
+
+The fragments are shared objects, read-only mappings (`types.MappingProxyType`) so an operation can't change the
+others by modifying them: copy them before changing anything. The gateway dumper writes them as mappings, and writes
+the shared objects again each time (see `yaml_io.GatewayDumper`), so the sharing doesn't show up as YAML anchors in
+the output unless it's asked for.
+"""
+import copyreg
+from functools import lru_cache
+from types import MappingProxyType
+
+import utils as utils
+
+
+def _frozen(mapping) -> MappingProxyType:
+    """A read-only copy of `mapping`, with its nested dicts also made read-only."""
+    return MappingProxyType({key: _frozen(value) if isinstance(value, dict) else value
+                             for key, value in mapping.items()})
+
+
+# The generated paths are pickled by the parallel generation, each fragment is unpickled as a new read-only mapping
+copyreg.pickle(MappingProxyType, lambda mapping: (_frozen, (dict(mapping),)))
+
+STRING_SCHEMA = _frozen({'type': 'string'})
+
+# Header parameters added to every operation, with the name they are given in `components.parameters`
+STANDARD_HEADER_PARAMETERS = (
+    ('TraceIdHeader', _frozen({'name': 'x-trace-id', 'in': 'header', 'required': True, 'schema': STRING_SCHEMA})),
+    ('ContentTypeHeader', _frozen({'name': 'Content-Type', 'in': 'header', 'schema': STRING_SCHEMA})),
+    ('AcceptLanguageHeader', _frozen({'name': 'Accept-Language', 'in': 'header', 'schema': STRING_SCHEMA})),
+    ('UserAgentHeader', _frozen({'name': 'User-Agent', 'in': 'header', 'schema': STRING_SCHEMA})),
+    ('AuthorizationHeader',
+     _frozen({'name': 'Authorization', 'in': 'header', 'required': True, 'schema': STRING_SCHEMA})),
+    ('CookieHeader', _frozen({'name': 'cookie', 'in': 'header', 'schema': STRING_SCHEMA})),
+    ('ForwardForHeader', _frozen({'name': 'x-forward-for', 'in': 'header', 'schema': STRING_SCHEMA}))
+)
+
+STANDARD_HEADERS = tuple(header for _, header in STANDARD_HEADER_PARAMETERS)
+
+# Headers of the responses of every operation
+RESPONSE_HEADERS = _frozen({
+    'x-trace-id': {'schema': STRING_SCHEMA},
+    'Access-Control-Allow-Origin': {'schema': STRING_SCHEMA},
+    'Access-Control-Allow-Credentials': {'schema': STRING_SCHEMA}
+})
+
+# Schema of the error responses, referenced by every operation
+ERROR_RESPONSE_SCHEMA = 'ResponseHeader'
+
+ERROR_RESPONSE_CONTENT = _frozen({
+    'application/json': {
+        'schema': {'$ref': f'#/components/schemas/{ERROR_RESPONSE_SCHEMA}'}
+    }
+})
+
+# Integration request headers mappings, copied for each operation as its path and query parameters are added to it
+INTEGRATION_REQUEST_PARAMETERS = _frozen({
+    'integration.request.header.Content-Type': 'method.request.header.Content-Type',
+    'integration.request.header.x-forward-for': 'method.request.header.x-forward-for',
+    'integration.request.header.x-trace-id': 'method.request.header.x-trace-id',
+    'integration.request.header.cookie': 'method.request.header.cookie',
+    'integration.request.header.Accept-Language': 'method.request.header.Accept-Language',
+    'integration.request.header.Authorization': 'method.request.header.Authorization',
+    'integration.request.header.User-Agent': 'method.request.header.User-Agent'
+})
+
+# Status codes of the standard error responses of every operation
+ERROR_STATUS_CODES = ("404", "400", "401", "500", "403")
+
+ERROR_RESPONSE_REGEX_TO_STATUS_CODE = _frozen({
+    "^500$": "500",
+    "^400$": "400",
+    "^401$|^302$": "401",
+    "^404$": "404",
+    "^403$": "403"
+})
+
+OPTIONS_METHOD_RESPONSES = _frozen({
+    utils.QuotedString("200"): {
+        'description': '200 response',
+        'headers': {
+            'Access-Control-Allow-Origin': {'schema': STRING_SCHEMA},
+            'Access-Control-Allow-Methods': {'schema': STRING_SCHEMA},
+            'Access-Control-Allow-Credentials': {'schema': STRING_SCHEMA},
+            'Access-Control-Allow-Headers': {'schema': STRING_SCHEMA}
+        },
+        'content': {}
+    }
+})
+
+OPTIONS_REQUEST_TEMPLATES = _frozen({
+    'application/json': '{"statusCode": 200}'
+})
+
+
+@lru_cache(maxsize=None)
+def error_response(status_code: str) -> MappingProxyType:
+    """The standard error response of a status code."""
+    return _frozen({
+        'description': f"{status_code} response",
+        'headers': RESPONSE_HEADERS,
+        'content': ERROR_RESPONSE_CONTENT
+    })
+
+
+def error_response_component_name(status_code: str) -> str:
+    return f"Error{status_code}"
+
+
+@lru_cache(maxsize=None)
+def cors_response_parameters(frontend_url: str) -> MappingProxyType:
+    """CORS headers of the integration responses."""
+    return _frozen({
+        'method.response.header.Access-Control-Allow-Credentials': '\'true\'',
+        'method.response.header.Access-Control-Allow-Origin': f"{frontend_url}"
+    })
+
+
+@lru_cache(maxsize=None)
+def error_integration_responses(frontend_url: str) -> MappingProxyType:
+    """Integration responses mapping the backend error status codes, by status code regex."""
+    return _frozen({
+        regex: {
+            'statusCode': code,
+            'responseParameters': cors_response_parameters(frontend_url)
+        }
+        for regex, code in ERROR_RESPONSE_REGEX_TO_STATUS_CODE.items()
+    })
+
+
+def shared_components() -> dict:
+    """
+    The `components` entries used when the standard headers and error responses are referenced instead of
+    being repeated in each operation (see `use_component_refs`).
+    """
+    return {
+        'parameters': {name: header for name, header in STANDARD_HEADER_PARAMETERS},
+        'responses': {error_response_component_name(code): error_response(code) for code in ERROR_STATUS_CODES}
+    }
+
+
+def use_component_refs(path_config: dict):
+    """
+    Replaces the standard headers and error responses of the operations of a generated path by references to
+    `components.parameters` and `components.responses`.
+    """
+    header_refs = {
+        header['name']: (header, {'$ref': f"#/components/parameters/{name}"})
+        for name, header in STANDARD_HEADER_PARAMETERS
+    }
+    for method_config in path_config.values():
+        parameters = method_config.get('parameters', [])
+        for index, parameter in enumerate(parameters):
+            header, ref = header_refs.get(parameter.get('name'), (None, None))
+            if header is not None and parameter == header:
+                parameters[index] = ref
+        responses = method_config.get('responses', {})
+        for status_code, response in responses.items():
+            if status_code in ERROR_STATUS_CODES and response == error_response(str(status_code)):
+                responses[status_code] = {'$ref': f"#/components/responses/{error_response_component_name(status_code)}"}
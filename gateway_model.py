@@ -0,0 +1,130 @@
+"""
+Compact model of the input operations the gateway is generated from, built once per path from the input spec and
+turned into the gateway mappings only when the path is emitted (see `source_generator.process_path`).
+
+The objects use `__slots__` instead of a dict per object, their names are interned and the identical parameters
+are a single shared object. The sub-objects taken as is from the input (request bodies, response contents) are
+referenced, not copied. The objects are shared: they must never be modified.
+"""
+import sys
+
+OPTIONS_METHOD = 'options'
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+class Parameter:
+    """
+    An operation parameter: its name, where it is (`location`: path, query, header...), the type of its schema (a
+    tuple for the OAS 3.1 lists of types, e.g. `[string, 'null']`) and the `$ref` of its schema when it's a query
+    object whose properties are the query parameters.
+    """
+    __slots__ = ('name', 'location', 'schema_type', 'schema_ref')
+
+    def __init__(self, name: str, location: str, schema_type: str = None, schema_ref: str = None):
+        self.name = name
+        self.location = location
+        self.schema_type = schema_type
+        self.schema_ref = schema_ref
+
+    def __repr__(self):
+        return f"Parameter({self.name!r}, {self.location!r}, {self.schema_type!r}, {self.schema_ref!r})"
+
+
+class Response:
+    """The success response of an operation: its content (from the input) and whether it's the EmptyResponse."""
+    __slots__ = ('status_code', 'content', 'is_empty')
+
+    def __init__(self, status_code: str, content: dict = None, is_empty: bool = False):
+        self.status_code = status_code
+        self.content = content
+        self.is_empty = is_empty
+
+
+class Operation:
+    """An operation of a path, with the parts of the input operation the gateway configuration is built from."""
+    __slots__ = ('method', 'operation_id', 'has_request_body', 'request_body', 'parameters', 'success_response')
+
+    def __init__(self, method: str, operation_id: str, has_request_body: bool, request_body,
+                 parameters: tuple, success_response: Response):
+        self.method = method
+        self.operation_id = operation_id
+        self.has_request_body = has_request_body
+        self.request_body = request_body
+        self.parameters = parameters
+        self.success_response = success_response
+
+    def parameters_in(self, location: str) -> list[Parameter]:
+        return [parameter for parameter in self.parameters if parameter.location == location]
+
+
+class PathItem:
+    """A path, its operations (without the OPTIONS one, which is generated) and their path parameters."""
+    __slots__ = ('path', 'operations', 'path_parameters')
+
+    def __init__(self, path: str, operations: tuple, path_parameters: tuple):
+        self.path = path
+        self.operations = operations
+        self.path_parameters = path_parameters
+
+    @property
+    def allowed_methods(self) -> list[str]:
+        return [operation.method.upper() for operation in self.operations]
+
+
+class ModelBuilder:
+    """
+    Builds the model objects from the input spec. The parameters are interned: all the identical parameters of the
+    operations built by the same builder are one object. `is_empty_response` tells whether the success response of
+    an input operation is the EmptyResponse.
+    """
+
+    def __init__(self, is_empty_response):
+        self.is_empty_response = is_empty_response
+        self._parameters = {}
+
+    def parameter(self, param: dict) -> Parameter:
+        schema = param.get('schema')
+        schema_type = schema_ref = None
+        if param['in'] == 'path':
+            schema_type = param['schema']['type']
+        elif isinstance(schema, dict):
+            schema_type = schema.get('type')
+            schema_ref = schema.get('$ref')
+        if isinstance(schema_type, list):
+            # Hashable, so the parameter can be interned
+            schema_type = tuple(schema_type)
+        key = (param['name'], param['in'], schema_type, schema_ref)
+        parameter = self._parameters.get(key)
+        if parameter is None:
+            parameter = self._parameters[key] = Parameter(*(_intern(value) for value in key))
+        return parameter
+
+    def operation(self, method: str, operation: dict) -> Operation:
+        is_empty_success_response = self.is_empty_response(operation)
+        content = None
+        responses = operation.get('responses', {})
+        if '200' in responses and 'content' in responses['200'] and not is_empty_success_response:
+            content = responses['200']['content']
+        return Operation(
+            _intern(method),
+            _intern(operation.get('operationId', '')),
+            'requestBody' in operation,
+            operation.get('requestBody'),
+            tuple(self.parameter(param) for param in operation.get('parameters', ())),
+            Response('200', content, is_empty_success_response)
+        )
+
+    def path_item(self, path: str, methods: dict) -> PathItem:
+        """The model of a path of the input spec."""
+        operations = []
+        path_parameters = {}
+        for method, operation in methods.items():
+            if method.lower() != OPTIONS_METHOD:  # The OPTIONS method is generated
+                model_operation = self.operation(method, operation)
+                operations.append(model_operation)
+                for parameter in model_operation.parameters_in('path'):
+                    path_parameters[parameter.name] = parameter
+        return PathItem(_intern(path), tuple(operations), tuple(path_parameters.values()))
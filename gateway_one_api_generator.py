@@ -1,32 +1,84 @@
-import yaml
+import csv
+import json
+import re
+
+import yaml_io as yaml_io
+
+PLACEHOLDER_PATTERN = re.compile(r"<([^<>]+)>")
+
+# Short names of the placeholders of `template.yaml`, usable as the columns of a batch of endpoints
+PLACEHOLDER_ALIASES = {
+    "path": "put the new endpoint path here as per the swagger, same as swagger, no changes",
+    "method": "here put the endpoint http method e.g. get, post or put - Make sure all lowercase letter",
+    "operation_id": "put the operation id for the endpoint same as swagger",
+    "request_schema": "Put the name of the resource defined in $root.components.schemas that maps the endpoint request body",
+    "response_schema": "Put the name of the resource defined in $root.components.schemas that maps the endpoint response body",
+    "vpc_connection_id": "Put the vpc connection ID here as per the stage used",
+    "http_method": "here put the endpoint http method e.g. GET, POST or PUT - Make sure all uppercase letters",
+    "backend_url": "put the backend API URL here",
+    "frontend_url": "put the front end-url here as per stage",
+    "query_param": "if any, add the query parameter name here and replicate this parameter entry for as many parameters the endpoint have",
+    "query_param_type": "query parameter type e.g. string or integer",
+    "path_param_field": "Path parameter field name",
+    "query_string_field": "Query string field name",
+    "options_methods": "put the http method here upper case"
+}
 
 
 def load_template(file_path):
     """Load a YAML template file into a Python dictionary."""
-    with open(file_path, 'r') as file:
-        return yaml.safe_load(file)
+    return yaml_io.load_file(file_path)
 
 
 def save_yaml(file_path, data):
     """Save a Python dictionary as a YAML file."""
     with open(file_path, 'w') as file:
-        yaml.dump(data, file, default_flow_style=False)
+        yaml_io.dump(data, file, default_flow_style=False)
+
+
+class CompiledTemplate:
+    """
+    A template compiled once into a renderer of the filled template. Each node of the template is turned into a
+    function building a copy of it, the strings with placeholders (`<placeholder>`, in keys or values) into
+    functions joining their literal parts and the placeholder values. Rendering is then a structural copy of the
+    template with the substitutions, the values are never parsed as YAML.
+    """
+
+    def __init__(self, template_data):
+        self.placeholders = set()
+        self._render = self._compile(template_data)
+
+    def render(self, placeholders):
+        """Returns a new filled template, placeholders without value are left as is."""
+        return self._render(placeholders)
+
+    def _compile(self, node):
+        if isinstance(node, dict):
+            items = [(self._compile(key), self._compile(value)) for key, value in node.items()]
+            return lambda values: {render_key(values): render_value(values) for render_key, render_value in items}
+        if isinstance(node, list):
+            items = [self._compile(item) for item in node]
+            return lambda values: [render_item(values) for render_item in items]
+        if isinstance(node, str) and PLACEHOLDER_PATTERN.search(node):
+            # The literal parts are at the even indexes and the placeholder names at the odd ones
+            parts = PLACEHOLDER_PATTERN.split(node)
+            self.placeholders.update(parts[1::2])
+            return lambda values: "".join(
+                part if index % 2 == 0 else values.get(part, f"<{part}>") for index, part in enumerate(parts)
+            )
+        return lambda values: node
 
 
 def replace_placeholders(template_data, placeholders, query_params, path_param):
     """
     Replace placeholders in the template data with provided values.
     Add query parameters and path parameters dynamically.
+    `template_data` is a template or a `CompiledTemplate`, compile it once to fill many endpoints.
     """
-    # Convert the template to a string for placeholder replacement
-    template_str = yaml.dump(template_data)
-
-    # Replace general placeholders
-    for placeholder, value in placeholders.items():
-        template_str = template_str.replace(f"<{placeholder}>", value)
-
-    # Convert back to a dictionary
-    filled_template = yaml.safe_load(template_str)
+    if not isinstance(template_data, CompiledTemplate):
+        template_data = CompiledTemplate(template_data)
+    filled_template = template_data.render(placeholders)
+    method_config = filled_template[placeholders[PLACEHOLDER_ALIASES["path"]]][placeholders[PLACEHOLDER_ALIASES["method"]]]
 
     # Add query parameters to the parameters section
     if query_params:
@@ -40,32 +92,88 @@ def replace_placeholders(template_data, placeholders, query_params, path_param):
             }
             if "required" in param_details:
                 param_entry["required"] = param_details["required"]
-            filled_template[
-                placeholders["put the new endpoint path here as per the swagger, same as swagger, no changes"]][
-                placeholders[
-                    "here put the endpoint http method e.g. get, post or put - Make sure all lowercase letter"]][
-                "parameters"].append(param_entry)
+            method_config["parameters"].append(param_entry)
 
     # Add query parameters to requestParameters
     if query_params:
         for param_name in query_params.keys():
-            filled_template[
-                placeholders["put the new endpoint path here as per the swagger, same as swagger, no changes"]][
-                placeholders[
-                    "here put the endpoint http method e.g. get, post or put - Make sure all lowercase letter"]][
-                "x-amazon-apigateway-integration"]["requestParameters"][
+            method_config["x-amazon-apigateway-integration"]["requestParameters"][
                 f"integration.request.querystring.{param_name}"] = f"method.request.querystring.{param_name}"
 
     # Add path parameter to requestParameters
     if path_param:
-        filled_template[placeholders["put the new endpoint path here as per the swagger, same as swagger, no changes"]][
-            placeholders["here put the endpoint http method e.g. get, post or put - Make sure all lowercase letter"]][
-            "x-amazon-apigateway-integration"]["requestParameters"][
+        method_config["x-amazon-apigateway-integration"]["requestParameters"][
             f"integration.request.path.{path_param}"] = f"method.request.path.{path_param}"
 
     return filled_template
 
 
+def parse_query_params(text):
+    """
+    Parse the query parameters of an endpoint written as `name:type[:required];...`,
+    e.g. "filter:string:required;sort:string".
+    """
+    query_params = {}
+    for param in filter(None, (param.strip() for param in text.split(";"))):
+        name, _, rest = param.partition(":")
+        param_type, _, required = rest.partition(":")
+        query_params[name.strip()] = {"type": param_type.strip() or "string"}
+        if required.strip():
+            query_params[name.strip()]["required"] = required.strip().lower() in ("required", "true", "yes", "1")
+    return query_params
+
+
+def endpoint_arguments(endpoint):
+    """
+    Returns the placeholders, query parameters and path parameter of an endpoint of a batch. The endpoint keys are
+    the placeholders texts or their `PLACEHOLDER_ALIASES`, plus `query_params` (a dictionary like the one of
+    `replace_placeholders` or a `parse_query_params` text) and `path_param`.
+    """
+    placeholders = {}
+    query_params = endpoint.get("query_params") or {}
+    if isinstance(query_params, str):
+        query_params = parse_query_params(query_params)
+    for key, value in endpoint.items():
+        if key in ("query_params", "path_param") or value in (None, ""):
+            continue
+        placeholders[PLACEHOLDER_ALIASES.get(key, key)] = str(value)
+    for alias in ("path", "method"):
+        if PLACEHOLDER_ALIASES[alias] not in placeholders:
+            raise ValueError(f"Missing {alias} of the endpoint {endpoint}")
+    return placeholders, query_params, endpoint.get("path_param") or None
+
+
+def load_endpoints(file_path):
+    """Load the endpoints of a batch from a CSV file (one endpoint per row) or a JSON list."""
+    with open(file_path, 'r', newline='') as file:
+        if file_path.lower().endswith(".csv"):
+            return list(csv.DictReader(file))
+        return json.load(file)
+
+
+def fill_endpoints(template_data, endpoints):
+    """
+    Fill the template once per endpoint (see `endpoint_arguments`) into one document, keyed by path. The methods of
+    endpoints sharing a path are gathered in the same path item, whose `options` method is the one of its first
+    endpoint.
+    """
+    template = template_data if isinstance(template_data, CompiledTemplate) else CompiledTemplate(template_data)
+    document = {}
+    for endpoint in endpoints:
+        placeholders, query_params, path_param = endpoint_arguments(endpoint)
+        for path, path_item in replace_placeholders(template, placeholders, query_params, path_param).items():
+            if path not in document:
+                document[path] = path_item
+                continue
+            for method, method_config in path_item.items():
+                if method == "options":
+                    continue
+                if method in document[path]:
+                    raise ValueError(f"The endpoint {method} {path} is defined twice")
+                document[path][method] = method_config
+    return document
+
+
 def generate_yaml_from_template(template_file, output_file, placeholders, query_params=None, path_param=None):
     """
     Generate a YAML file by replacing placeholders in a template.
@@ -87,6 +195,19 @@ def generate_yaml_from_template(template_file, output_file, placeholders, query_
     print(f"Template filled and saved to {output_file}")
 
 
+def generate_yaml_from_endpoints(template_file, endpoints_file, output_file):
+    """
+    Generate one YAML file with an endpoint per entry of a CSV or JSON endpoints file (see `fill_endpoints`).
+
+    :param template_file: Path to the input YAML template file.
+    :param endpoints_file: Path to the CSV or JSON file listing the endpoints.
+    :param output_file: Path to the output YAML file.
+    """
+    endpoints = load_endpoints(endpoints_file)
+    save_yaml(output_file, fill_endpoints(load_template(template_file), endpoints))
+    print(f"{len(endpoints)} endpoint(s) filled and saved to {output_file}")
+
+
 # Example usage
 if __name__ == "__main__":
     # Define the input template file and output file
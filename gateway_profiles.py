@@ -0,0 +1,61 @@
+import json
+
+# Version of the saved gateway fields file, to be changed if its structure changes to allow compatibility
+PROFILE_VERSION = 1.0
+
+# Label, attribute_normalized_name, is_mandatory flag
+GATEWAY_FIELDS = [
+    ("Frontend URL", "frontend_url", True),
+    ("VPC Connection ID", "vpc_connection_id", True),
+    ("Info Title", "info_title", True),
+    ("Info Description", "info_description", False),
+    ("Info Version", "info_version", True),
+    ("Servers URL", "servers_url", True),
+    ("Base Path Default", "base_path_default", True)
+]
+
+
+def _load_profile_data(file_path: str) -> dict:
+    with open(file_path, 'r') as f:
+        data = json.load(f)
+    saved_data_script_version = data.get("version", 1.0)
+    if saved_data_script_version != PROFILE_VERSION:
+        raise ValueError("Unsupported version of file saving/loading")
+    return data.get("data", {})
+
+
+def load_gateway_fields(file_path: str) -> dict:
+    """
+    Load the gateway fields saved by `save_gateway_fields` (or the "Save Gateway Fields" button of the GUI).
+    Missing fields are returned as empty strings.
+    """
+    gateway_fields_data = _load_profile_data(file_path).get("gatewayFields", {})
+    return {attr: gateway_fields_data.get(attr, "") for _, attr, _ in GATEWAY_FIELDS}
+
+
+def load_gateway_response_overrides(file_path: str) -> dict:
+    """
+    Load the optional per-project overrides of the gateway responses of a gateway fields file, its
+    `data.gatewayResponses` entry (see `amazon_gateway_statics.gateway_response_table`), e.g.
+        "gatewayResponses": {"THROTTLED": {"code": "E301018", "status_code": 429}}
+    """
+    return _load_profile_data(file_path).get("gatewayResponses") or {}
+
+
+def save_gateway_fields(gateway_fields: dict, file_path: str, gateway_response_overrides: dict = None):
+    """Save the gateway fields, and the gateway responses overrides if any, to a JSON file."""
+    data = {
+        "version": PROFILE_VERSION,
+        "data": {
+            "gatewayFields": gateway_fields
+        }
+    }
+    if gateway_response_overrides:
+        data["data"]["gatewayResponses"] = gateway_response_overrides
+    with open(file_path, 'w') as f:
+        json.dump(data, f, indent=4)
+
+
+def missing_mandatory_fields(gateway_fields: dict) -> list[str]:
+    """Returns the labels of the mandatory gateway fields that are empty."""
+    return [label for label, attr, is_mandatory in GATEWAY_FIELDS if is_mandatory and not gateway_fields.get(attr)]
@@ -0,0 +1,197 @@
+"""
+Split of a generated gateway into several self-contained definitions (shards), which can be imported and reviewed
+separately and each stay below the API Gateway import size limits.
+
+The paths are grouped by path prefix, by tag, or all together, and a group bigger than the byte budget is split
+again in the paths order. Each shard gets the schemas transitively referenced by its operations (from the `$ref`
+graph, see `ref_graph.RefGraph`), the other components and the static gateway sections. The shards are written by
+`source_generator.write_gateway`, next to the output with a manifest listing them with their sizes and hashes.
+"""
+import hashlib
+import json
+import os
+import re
+
+import yaml_io as yaml_io
+
+SHARD_BY = ('prefix', 'tag', 'size')
+
+# Number of leading path segments of the `prefix` groups, e.g. /v1/users for /v1/users/{userId}/roles
+DEFAULT_PREFIX_SEGMENTS = 2
+
+# Byte budget of the `size` shards, keeps them well below the size API Gateway imports
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+
+_SCHEMAS_HEADER = 'components:\n  schemas:\n'
+
+
+class ShardPlan:
+    """
+    How a gateway is split: `by` 'prefix' (the first `prefix_segments` segments of the paths), 'tag' (the first tag
+    of the path operations) or 'size' (in the paths order). A shard is split again above `max_bytes`, which has a
+    default only for 'size'.
+    """
+
+    def __init__(self, by: str = 'prefix', prefix_segments: int = DEFAULT_PREFIX_SEGMENTS, max_bytes: int = None):
+        if by not in SHARD_BY:
+            raise ValueError(f"Unknown shard mode {by}, expected one of {SHARD_BY}")
+        self.by = by
+        self.prefix_segments = prefix_segments
+        self.max_bytes = max_bytes if max_bytes is not None or by != 'size' else DEFAULT_MAX_BYTES
+
+    def group_name(self, path: str, path_item: dict) -> str:
+        """The group of a path of the input spec."""
+        if self.by == 'prefix':
+            segments = []
+            for segment in path.strip('/').split('/')[:self.prefix_segments]:
+                if segment.startswith('{'):
+                    break
+                segments.append(segment)
+            return '/' + '/'.join(segments)
+        if self.by == 'tag':
+            for operation in path_item.values():
+                if isinstance(operation, dict) and operation.get('tags'):
+                    return str(operation['tags'][0])
+            return 'untagged'
+        return 'part'
+
+    def plan(self, swagger_paths: dict, path_fragments: dict[str, str], refs_by_path: dict, graph,
+             schemas: dict, base_bytes: int) -> list[dict]:
+        """
+        Returns the shards of the generated paths, each one a dict with its `name`, `paths` (in the output order)
+        and `schemas` (the names of the schemas it needs).
+
+        Args:
+            swagger_paths (dict): The paths of the input spec, to group the paths.
+            path_fragments (dict[str, str]): The generated YAML of each path, in the output order.
+            refs_by_path (dict): The schemas referenced by each method of each generated path.
+            graph (RefGraph): The `$ref` graph of the output components.
+            schemas (dict): The output schemas, to measure their size.
+            base_bytes (int): The size of everything written in every shard whatever its paths.
+        """
+        component_roots = _component_roots(graph)
+        groups = {}
+        for path in path_fragments:
+            groups.setdefault(self.group_name(path, swagger_paths.get(path, {})), []).append(path)
+
+        schema_sizes = {}
+
+        def schema_size(schema_name):
+            if schema_name not in schema_sizes:
+                text = yaml_io.dump_gateway({'components': {'schemas': {schema_name: schemas[schema_name]}}})
+                schema_sizes[schema_name] = len(text) - len(_SCHEMAS_HEADER)
+            return schema_sizes[schema_name]
+
+        def added_bytes(path, new_schemas):
+            return len(path_fragments[path]) + sum(schema_size(name) for name in new_schemas if name in schemas)
+
+        shards = []
+        for group_name, group_paths in groups.items():
+            group_shards = []
+            shard = None
+            for path in group_paths:
+                path_roots = {schema_name for schema_names in refs_by_path.get(path, {}).values()
+                              for schema_name in schema_names}
+                if shard is not None:
+                    new_schemas = _new_reachable_schemas(graph, path_roots, shard['schemas'])
+                    path_bytes = added_bytes(path, new_schemas)
+                    if self.max_bytes is not None and shard['bytes'] + path_bytes > self.max_bytes:
+                        shard = None
+                if shard is None:
+                    shard_schemas = _new_reachable_schemas(graph, component_roots, set())
+                    shard = {'paths': [], 'schemas': shard_schemas,
+                             'bytes': base_bytes + sum(schema_size(name) for name in shard_schemas if name in schemas)}
+                    group_shards.append(shard)
+                    new_schemas = _new_reachable_schemas(graph, path_roots, shard['schemas'])
+                    path_bytes = added_bytes(path, new_schemas)
+                shard['schemas'] |= new_schemas
+                shard['paths'].append(path)
+                shard['bytes'] += path_bytes
+
+            slug = _slug(group_name) or 'root'
+            for index, group_shard in enumerate(group_shards, 1):
+                group_shard['name'] = f"{slug}-{index}" if len(group_shards) > 1 else slug
+                # The referenced schemas missing from the output can't be written
+                group_shard['schemas'] = {name for name in group_shard['schemas'] if name in schemas}
+                shard_bytes = group_shard.pop('bytes')
+                if self.max_bytes is not None and shard_bytes > self.max_bytes:
+                    print(f"Shard {group_shard['name']} is bigger than {self.max_bytes} bytes, its path "
+                          f"{group_shard['paths'][0]} doesn't fit alone in the budget")
+            shards.extend(group_shards)
+        return shards
+
+
+def _component_roots(graph) -> set[str]:
+    """The schemas referenced from the components other than the schemas, needed in every shard."""
+    return {
+        schema_name
+        for schema_name, referrers in graph.referrers.items()
+        if any(referrer[:1] != ('paths',) and referrer[:2] != ('components', 'schemas') for referrer in referrers)
+    }
+
+
+def _new_reachable_schemas(graph, roots, known: set[str]) -> set[str]:
+    """
+    The schemas transitively referenced from `roots` which aren't `known`. The `known` schemas are already closed
+    over their references, so the walk stops at them.
+    """
+    reachable = set()
+    stack = [schema_name for schema_name in roots if schema_name not in known]
+    while stack:
+        schema_name = stack.pop()
+        if schema_name in reachable:
+            continue
+        reachable.add(schema_name)
+        stack.extend(referenced for referenced in graph.schema_refs.get(schema_name, ())
+                     if referenced not in known and referenced not in reachable)
+    return reachable
+
+
+def _slug(name: str) -> str:
+    return re.sub(r'[^A-Za-z0-9]+', '-', name).strip('-').lower()
+
+
+def shard_output_data(output_data: dict, schema_names: set[str]) -> dict:
+    """
+    The output data of a shard: the components have only the `schema_names` schemas, in the output order, and all
+    the other sections.
+    """
+    components = {
+        section: ({name: schema for name, schema in entries.items() if name in schema_names}
+                  if section == 'schemas' else entries)
+        for section, entries in output_data['components'].items()
+    }
+    return {**output_data, 'components': components}
+
+
+def shard_file_paths(output_path: str, shards: list[dict]) -> list[str]:
+    """The file of each shard, next to `output_path`: gateway.yaml gives gateway.01-v1-users.yaml, ..."""
+    stem, extension = os.path.splitext(output_path)
+    width = len(str(len(shards)))
+    return [f"{stem}.{index:0{width}d}-{shard['name']}{extension}" for index, shard in enumerate(shards, 1)]
+
+
+def manifest_file_for(output_path: str) -> str:
+    return f"{os.path.splitext(output_path)[0]}.shards.json"
+
+
+def write_manifest(output_path: str, plan: ShardPlan, shards: list[dict], file_paths: list[str],
+                   swagger_paths: dict) -> dict:
+    """Writes the manifest of the shards written to `file_paths`, with their sizes and SHA-256, and returns it."""
+    manifest = {'shard_by': plan.by, 'max_bytes': plan.max_bytes, 'shards': []}
+    for shard, file_path in zip(shards, file_paths):
+        with open(file_path, 'rb') as file:
+            content = file.read()
+        manifest['shards'].append({
+            'name': shard['name'],
+            'file': os.path.basename(file_path),
+            'bytes': len(content),
+            'sha256': hashlib.sha256(content).hexdigest(),
+            'paths': len(shard['paths']),
+            'operations': sum(1 for path in shard['paths'] for method in swagger_paths.get(path, {})
+                              if method.lower() != 'options'),
+            'schemas': len(shard['schemas'])
+        })
+    with open(manifest_file_for(output_path), 'w') as file:
+        json.dump(manifest, file, indent=2)
+    return manifest
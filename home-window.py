@@ -1,19 +1,36 @@
 import json
+import os
+import queue
+import threading
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 
-import yaml
 from ttkbootstrap import Style
 
-import open_api_generator
-import source_generator
-from merging_apis import load_yaml, save_yaml, merge_yaml  # Import the yaml_merger module
+import gateway_profiles
+import instrumentation
+
+# The generators and YAML modules are imported where they are used, so the window opens without waiting for them
+
+# Interval (ms) at which the main thread reads the progress of the conversion running in the background
+PROGRESS_POLL_INTERVAL = 100
+
+# Part of the gateway generation progress reached at the end of each of its first stages, the rest is the paths
+GATEWAY_STAGES_PROGRESS = {'load': 0.05, 'process_components': 0.1}
+GATEWAY_PATHS_PROGRESS = 0.85
+
+# Number of stages of `open_api_generator.process_swagger_file`
+OPENAPI_STAGES_COUNT = 3
+
+
+class ConversionCancelled(Exception):
+    """Raised in the conversion thread by the progress reports once the Cancel button was clicked."""
 
 
 class SwaggerConverterApp:
     def __init__(self, root):
         self.root = root
-        self.script_version = 1.0
+        self.script_version = gateway_profiles.PROFILE_VERSION
 
         # Use ttkbootstrap for a modern look
         style = Style(theme='flatly')
@@ -84,17 +101,11 @@ class SwaggerConverterApp:
         self.gateway_frame.pack(fill=tk.X, pady=10)
 
         # Label, attribute_normalized_name, is_mandatory flag
-        self.gateway_fields = [
-            ("Frontend URL", "frontend_url", True),
-            ("VPC Connection ID", "vpc_connection_id", True),
-            ("Info Title", "info_title", True),
-            ("Info Description", "info_description", False),
-            ("Info Version", "info_version", True),
-            ("Servers URL", "servers_url", True),
-            ("Base Path Default", "base_path_default", True)
-        ]
+        self.gateway_fields = gateway_profiles.GATEWAY_FIELDS
 
         self.gateway_entries = {}
+        # Overrides of the gateway responses of the loaded gateway fields file, kept when saving the fields
+        self.gateway_response_overrides = {}
 
         for label, attr, is_mandatory in self.gateway_fields:
             field_frame = tk.Frame(self.gateway_frame, bg='#f4f6f9')
@@ -144,14 +155,31 @@ class SwaggerConverterApp:
         )
         self.progress_bar.pack(pady=10)
 
-        # Run Button
+        # Run and Cancel Buttons
+        self.run_buttons_frame = tk.Frame(self.main_frame, bg='#f4f6f9')
+        self.run_buttons_frame.pack(pady=10)
+
         self.run_button = ttk.Button(
-            self.main_frame,
+            self.run_buttons_frame,
             text="Convert",
             command=self.run_conversion,
             style='primary.TButton'
         )
-        self.run_button.pack(pady=10)
+        self.run_button.pack(side=tk.LEFT, padx=5)
+
+        self.cancel_button = ttk.Button(
+            self.run_buttons_frame,
+            text="Cancel",
+            command=self.cancel_conversion,
+            style='secondary.TButton',
+            state='disabled'
+        )
+        self.cancel_button.pack(side=tk.LEFT, padx=5)
+
+        # The conversion runs on a background thread, it sends its progress to the main thread through this queue
+        self.progress_queue = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.conversion_thread = None
 
         # Initially hide gateway fields
         self.toggle_gateway_fields()
@@ -180,13 +208,8 @@ class SwaggerConverterApp:
         )
         if file_path:
             try:
-                with open(file_path, 'r') as f:
-                    data = json.load(f)
-                saved_data_script_version = data.get("version", 1.0) # to be used in the future for compatibility
-                if saved_data_script_version != self.script_version:
-                    raise Exception("Unsupported version of file saving/loading")
-                fields_data = data.get("data", {})
-                gateway_fields_data = fields_data.get("gatewayFields", {})
+                gateway_fields_data = gateway_profiles.load_gateway_fields(file_path)
+                self.gateway_response_overrides = gateway_profiles.load_gateway_response_overrides(file_path)
                 # Update each gateway entry. Temporarily enable if necessary.
                 for key, entry in self.gateway_entries.items():
                     # If the entry is disabled, temporarily enable it to update the value.
@@ -202,13 +225,7 @@ class SwaggerConverterApp:
 
     def save_gateway_fields_data(self):
         """Save current gateway fields to a JSON file."""
-        script_version = 1.0 # To be changed if the structure of loading and saving change to allow compatibility
-        data = {
-            "version": script_version,
-            "data": {
-                "gatewayFields": {key: entry.get() for key, entry in self.gateway_entries.items()}
-            }
-        }
+        gateway_fields_data = {key: entry.get() for key, entry in self.gateway_entries.items()}
 
         file_path = filedialog.asksaveasfilename(
             defaultextension=".json",
@@ -217,8 +234,7 @@ class SwaggerConverterApp:
         )
         if file_path:
             try:
-                with open(file_path, 'w') as f:
-                    json.dump(data, f, indent=4)
+                gateway_profiles.save_gateway_fields(gateway_fields_data, file_path, self.gateway_response_overrides)
                 messagebox.showinfo("Success", "Gateway fields saved successfully!")
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to save gateway fields: {e}")
@@ -233,101 +249,212 @@ class SwaggerConverterApp:
             messagebox.showerror("Error", "Please select a conversion type")
             return
 
-        # Reset progress bar
-        self.progress_var.set(0)
-
         # Determine option index
         option_index = self.options.index(self.option_var.get()) + 1
         file_path = self.file_entry.get()
 
-        try:
-            # Determine output file path
-            if option_index in [1, 2]:  # JSON to YAML or YAML to JSON
-                output_file = filedialog.asksaveasfilename(
-                    defaultextension=".yml" if option_index == 1 else ".json",
-                    filetypes=[("YAML files", "*.yml")] if option_index == 1 else [("JSON files", "*.json")]
-                )
-                if not output_file:
+        # The dialogs are shown before the conversion starts, the conversion steps then run in the background.
+        # Each step is a (weight in the progress bar, output file, function called with a progress report function).
+        steps = []
+        if option_index in [1, 2]:  # JSON to YAML or YAML to JSON
+            output_file = filedialog.asksaveasfilename(
+                defaultextension=".yml" if option_index == 1 else ".json",
+                filetypes=[("YAML files", "*.yml")] if option_index == 1 else [("JSON files", "*.json")]
+            )
+            if not output_file:
+                return
+
+            if option_index == 1:  # JSON to YAML
+                steps.append((1, output_file, lambda report: self._convert_json_to_yaml(file_path, output_file)))
+            else:  # YAML to JSON
+                steps.append((1, output_file, lambda report: self._convert_yaml_to_json(file_path, output_file)))
+
+        elif option_index in [3, 4, 5]:  # OpenAPI or Gateway or Both
+            # For gateway generation (options 4 and 5), validate mandatory fields
+            # Removed "info_description" from the list as it is optional.
+            gateway_options = [4, 5]
+            if option_index in gateway_options:
+                # Check if gateway fields are filled
+                if not all(
+                        self.gateway_entries[field].get() for field in
+                        [attribute_name for _,attribute_name, is_mandatory in self.gateway_fields if is_mandatory]
+                        ):
+                    messagebox.showerror("Error", "Please fill in all mandatory gateway fields")
                     return
 
-                if option_index == 1:  # JSON to YAML
-                    self._convert_json_to_yaml(file_path, output_file)
-                else:  # YAML to JSON
-                    self._convert_yaml_to_json(file_path, output_file)
-
-            elif option_index in [3, 4, 5]:  # OpenAPI or Gateway or Both
-                # For gateway generation (options 4 and 5), validate mandatory fields
-                # Removed "info_description" from the list as it is optional.
-                gateway_options = [4, 5]
-                if option_index in gateway_options:
-                    # Check if gateway fields are filled
-                    if not all(
-                            self.gateway_entries[field].get() for field in
-                            [attribute_name for _,attribute_name, is_mandatory in self.gateway_fields if is_mandatory]
-                            ):
-                        messagebox.showerror("Error", "Please fill in all mandatory gateway fields")
-                        return
-
-                # OpenAPI generation
-                if option_index in [3, 5]:
-                    openapi_file = filedialog.asksaveasfilename(
-                        defaultextension=".yml",
-                        filetypes=[("YAML files", "*.yml")]
-                    )
-                    if openapi_file:
-                        open_api_generator.process_swagger_file(file_path, openapi_file)
-
-                # Gateway generation
-                if option_index in [4, 5]:
-                    gateway_file = filedialog.asksaveasfilename(
-                        defaultextension=".yml",
-                        filetypes=[("YAML files", "*.yml")]
-                    )
-                    if gateway_file:
-                        source_generator.format_swagger_to_template(
-                            file_path,
-                            gateway_file,
-                            self.gateway_entries['frontend_url'].get(),
-                            self.gateway_entries['vpc_connection_id'].get(),
-                            self.gateway_entries['info_title'].get(),
-                            self.gateway_entries['info_description'].get(),
-                            self.gateway_entries['info_version'].get(),
-                            self.gateway_entries['servers_url'].get(),
-                            self.gateway_entries['base_path_default'].get()
-                        )
-
-            elif option_index == 6:  # Merge YAML Files
-                # Prompt user to select the new_api YAML file
-                new_api_file = filedialog.askopenfilename(
-                    filetypes=[("YAML files", "*.yaml"), ("YML files", "*.yml")]
+            # OpenAPI generation
+            if option_index in [3, 5]:
+                openapi_file = filedialog.asksaveasfilename(
+                    defaultextension=".yml",
+                    filetypes=[("YAML files", "*.yml")]
                 )
-                if not new_api_file:
-                    return
-
-                # Load the remote_api and new_api files
-                remote_api = load_yaml(file_path)
-                new_api = load_yaml(new_api_file)
+                if openapi_file:
+                    steps.append((1, openapi_file,
+                                  lambda report: self._generate_openapi(file_path, openapi_file, report)))
 
-                # Merge the YAML files
-                merged_yaml = merge_yaml(remote_api, new_api)
-
-                # Prompt user to save the merged YAML file
-                output_file = filedialog.asksaveasfilename(
+            # Gateway generation
+            if option_index in [4, 5]:
+                gateway_file = filedialog.asksaveasfilename(
                     defaultextension=".yml",
                     filetypes=[("YAML files", "*.yml")]
                 )
-                if output_file:
-                    save_yaml(merged_yaml, output_file)
+                if gateway_file:
+                    gateway_fields = {attr: entry.get() for attr, entry in self.gateway_entries.items()}
+                    gateway_fields['gateway_response_overrides'] = self.gateway_response_overrides
+                    # The gateway generation is much longer than the OpenAPI one
+                    steps.append((4, gateway_file,
+                                  lambda report: self._generate_gateway(file_path, gateway_file, gateway_fields,
+                                                                        report)))
+
+        elif option_index == 6:  # Merge YAML Files
+            # Prompt user to select the new_api YAML files, several of them can be merged at once
+            new_api_files = filedialog.askopenfilenames(
+                filetypes=[("YAML files", "*.yaml"), ("YML files", "*.yml")]
+            )
+            if not new_api_files:
+                return
+
+            # Prompt user to save the merged YAML file
+            output_file = filedialog.asksaveasfilename(
+                defaultextension=".yml",
+                filetypes=[("YAML files", "*.yml")]
+            )
+            if output_file:
+                steps.append((1, output_file,
+                              lambda report: self._merge_yaml_files([file_path, *new_api_files], output_file,
+                                                                    report)))
+
+        self._start_conversion(steps)
+
+    def _start_conversion(self, steps):
+        # Reset progress bar
+        self.progress_var.set(0)
+        self.cancel_event.clear()
+        self.run_button.config(state='disabled')
+        self.cancel_button.config(state='normal')
+        self.conversion_thread = threading.Thread(target=self._run_steps, args=(steps,), daemon=True)
+        self.conversion_thread.start()
+        self.root.after(PROGRESS_POLL_INTERVAL, self._poll_progress)
+
+    def cancel_conversion(self):
+        """Asks the conversion to stop, it stops at its next progress report (e.g. between two gateway paths)."""
+        self.cancel_event.set()
+        self.cancel_button.config(state='disabled')
+
+    def _run_steps(self, steps):
+        """Runs in the conversion thread, everything it has to tell the main thread goes through the queue."""
+        total_weight = sum(weight for weight, _, _ in steps) or 1
+        done_weight = 0
+        running_step_output = None
+        try:
+            for weight, output_file, step in steps:
+                def report(fraction, start=done_weight, weight=weight):
+                    if self.cancel_event.is_set():
+                        raise ConversionCancelled()
+                    self.progress_queue.put(('progress', 100 * (start + weight * fraction) / total_weight))
+
+                report(0)
+                running_step_output = output_file
+                step(report)
+                running_step_output = None
+                done_weight += weight
+                self.progress_queue.put(('progress', 100 * done_weight / total_weight))
+            self.progress_queue.put(('done', None))
+        except ConversionCancelled:
+            # Don't leave a partially written file behind
+            if running_step_output and os.path.exists(running_step_output):
+                os.remove(running_step_output)
+            self.progress_queue.put(('cancelled', None))
+        except Exception as e:
+            self.progress_queue.put(('error', str(e)))
 
-            # Update progress and show success message
-            self.progress_var.set(100)
-            messagebox.showinfo("Success", "Conversion completed successfully!")
+    def _poll_progress(self):
+        """Applies the progress sent by the conversion thread, on the main thread, until the conversion ends."""
+        try:
+            while True:
+                event, value = self.progress_queue.get_nowait()
+                if event == 'progress':
+                    self.progress_var.set(value)
+                    continue
+                if event == 'warning':
+                    messagebox.showwarning("Warning", value)
+                    continue
+                self.run_button.config(state='normal')
+                self.cancel_button.config(state='disabled')
+                if event == 'done':
+                    # Update progress and show success message
+                    self.progress_var.set(100)
+                    messagebox.showinfo("Success", "Conversion completed successfully!")
+                elif event == 'cancelled':
+                    self.progress_var.set(0)
+                    messagebox.showinfo("Cancelled", "Conversion cancelled.")
+                else:
+                    messagebox.showerror("Error", value)
+                    self.progress_var.set(0)
+                return
+        except queue.Empty:
+            pass
+        self.root.after(PROGRESS_POLL_INTERVAL, self._poll_progress)
+
+    def _generate_openapi(self, file_path, openapi_file, report):
+        import open_api_generator
+
+        stages_done = []
+
+        def on_stage(measures):
+            stages_done.append(measures['stage'])
+            report(min(len(stages_done) / OPENAPI_STAGES_COUNT, 1))
+
+        open_api_generator.process_swagger_file(file_path, openapi_file,
+                                                instrumentation.Instrumentation(on_stage=on_stage))
+
+    def _generate_gateway(self, file_path, gateway_file, gateway_fields, report):
+        import source_generator
+
+        def on_stage(measures):
+            if measures['stage'] in GATEWAY_STAGES_PROGRESS:
+                report(GATEWAY_STAGES_PROGRESS[measures['stage']])
+
+        def on_path(done, total):
+            report(GATEWAY_STAGES_PROGRESS['process_components'] + GATEWAY_PATHS_PROGRESS * done / total)
+
+        source_generator.format_swagger_to_template(
+            file_path,
+            gateway_file,
+            gateway_fields['frontend_url'],
+            gateway_fields['vpc_connection_id'],
+            gateway_fields['info_title'],
+            gateway_fields['info_description'],
+            gateway_fields['info_version'],
+            gateway_fields['servers_url'],
+            gateway_fields['base_path_default'],
+            instrumentation=instrumentation.Instrumentation(on_stage=on_stage),
+            progress=on_path,
+            gateway_response_overrides=gateway_fields['gateway_response_overrides']
+        )
 
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
-            self.progress_var.set(0)
+    def _merge_yaml_files(self, file_paths, output_file, report):
+        from merging_apis import format_conflicts, load_many, merge_many, save_yaml
+
+        # Load the remote_api and new_api files
+        apis = load_many(file_paths)
+        report(0.6)
+
+        # Merge the YAML files
+        merged_yaml, conflicts = merge_many(apis, file_paths)
+        report(0.8)
+
+        save_yaml(merged_yaml, output_file)
+        if conflicts:
+            lines = format_conflicts(conflicts)
+            for line in lines:
+                print(line)
+            self.progress_queue.put(('warning', f"{len(conflicts)} conflict(s) found while merging:\n" +
+                                     "\n".join(lines[:10]) + ("\n..." if len(lines) > 10 else "")))
 
     def _convert_json_to_yaml(self, json_file, yaml_file):
+        import yaml_io
+
         with open(json_file, 'r') as f:
             try:
                 data = json.load(f)
@@ -335,12 +462,16 @@ class SwaggerConverterApp:
                 raise ValueError("Invalid JSON file")
 
         with open(yaml_file, 'w') as f:
-            yaml.dump(data, f, sort_keys=False)
+            yaml_io.dump(data, f, sort_keys=False)
 
     def _convert_yaml_to_json(self, yaml_file, json_file):
+        import yaml
+
+        import yaml_io
+
         with open(yaml_file, 'r') as f:
             try:
-                data = yaml.safe_load(f)
+                data = yaml_io.safe_load(f)
             except yaml.YAMLError:
                 raise ValueError("Invalid YAML file")
 
@@ -0,0 +1,102 @@
+"""
+Stage timing, memory and counters instrumentation of the generation pipelines.
+
+Usage:
+    with Instrumentation() as instrumentation:
+        source_generator.format_swagger_to_template(..., instrumentation=instrumentation)
+    print(instrumentation.to_json())
+"""
+import contextlib
+import json
+import time
+
+
+class Instrumentation:
+    """
+    Records the wall time, CPU time and (with `trace_memory`) the peak memory of each stage of a pipeline, and
+    counters such as the number of operations processed.
+
+    Stages must not be nested: the memory peak is reset when a stage starts. Memory tracing is done with
+    `tracemalloc`, which slows the pipeline down, and is stopped by `close()` (or when leaving a `with` block).
+    Subclass it and override `record_stage`, or pass `on_stage`, to send the measures somewhere else.
+    """
+
+    def __init__(self, trace_memory: bool = False, on_stage=None):
+        self.trace_memory = trace_memory
+        self.on_stage = on_stage
+        self.stages = []
+        self.counters = {}
+        self._started_tracing = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Stops the memory tracing if it was started by this instrumentation."""
+        if self._started_tracing:
+            import tracemalloc
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        """Context manager measuring the code run inside it as the stage `name`."""
+        if self.trace_memory:
+            # Imported only when needed, it's slow to import
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            tracemalloc.reset_peak()
+            start_memory = tracemalloc.get_traced_memory()[0]
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            measures = {
+                'stage': name,
+                'wall_seconds': time.perf_counter() - start_wall,
+                'cpu_seconds': time.process_time() - start_cpu
+            }
+            if self.trace_memory:
+                current_memory, peak_memory = tracemalloc.get_traced_memory()
+                measures['peak_memory_bytes'] = peak_memory
+                measures['memory_delta_bytes'] = current_memory - start_memory
+            self.record_stage(measures)
+
+    def record_stage(self, measures: dict):
+        self.stages.append(measures)
+        if self.on_stage is not None:
+            self.on_stage(measures)
+
+    def count(self, counter: str, increment: int = 1):
+        self.counters[counter] = self.counters.get(counter, 0) + increment
+
+    def report(self) -> dict:
+        """The measures of all the stages, their totals and the counters, as JSON serializable data."""
+        total = {
+            'wall_seconds': sum(stage['wall_seconds'] for stage in self.stages),
+            'cpu_seconds': sum(stage['cpu_seconds'] for stage in self.stages)
+        }
+        if self.trace_memory:
+            total['peak_memory_bytes'] = max((stage['peak_memory_bytes'] for stage in self.stages), default=0)
+        return {'stages': self.stages, 'total': total, 'counters': self.counters}
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.report(), **kwargs)
+
+
+class NullInstrumentation(Instrumentation):
+    """Instrumentation recording nothing, used when none is given."""
+
+    def stage(self, name: str):
+        return contextlib.nullcontext()
+
+    def count(self, counter: str, increment: int = 1):
+        pass
+
+
+NULL_INSTRUMENTATION = NullInstrumentation()
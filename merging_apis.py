@@ -1,10 +1,16 @@
-import yaml
-from collections.abc import MutableMapping
+from collections.abc import Mapping, MutableMapping
+
+import spec_cache as spec_cache
+import yaml_io as yaml_io
+
+# Sections merged from all the inputs, the other sections come from the first one
+MERGED_SECTIONS = ('components', 'paths')
 
 
 def deep_merge(d1, d2):
     """
-    Recursively merge two dictionaries.
+    Recursively merge two dictionaries. The nested dictionaries are merged with an explicit stack, so deeply nested
+    documents don't hit the recursion limit.
 
     Args:
         d1 (dict): The first dictionary.
@@ -13,17 +19,43 @@ def deep_merge(d1, d2):
     Returns:
         dict: The merged dictionary.
     """
-    for key, value in d2.items():
-        if key in d1:
-            if isinstance(d1[key], MutableMapping) and isinstance(value, MutableMapping):
-                deep_merge(d1[key], value)
+    stack = [(d1, d2)]
+    while stack:
+        target, source = stack.pop()
+        for key, value in source.items():
+            if key in target and isinstance(target[key], MutableMapping) and isinstance(value, MutableMapping):
+                stack.append((target[key], value))
             else:
-                d1[key] = value
-        else:
-            d1[key] = value
+                target[key] = value
     return d1
 
 
+def deep_equal(value1, value2):
+    """
+    Same as `value1 == value2` for the parsed YAML documents, but the nested mappings and lists are compared with an
+    explicit stack, so deeply nested documents don't hit the recursion limit.
+    """
+    stack = [(value1, value2)]
+    while stack:
+        value1, value2 = stack.pop()
+        if value1 is value2:
+            continue
+        if isinstance(value1, Mapping) and isinstance(value2, Mapping):
+            if len(value1) != len(value2):
+                return False
+            for key, item in value1.items():
+                if key not in value2:
+                    return False
+                stack.append((item, value2[key]))
+        elif isinstance(value1, list) and isinstance(value2, list):
+            if len(value1) != len(value2):
+                return False
+            stack.extend(zip(value1, value2))
+        elif isinstance(value1, (Mapping, list)) or isinstance(value2, (Mapping, list)) or value1 != value2:
+            return False
+    return True
+
+
 def merge_yaml(remote_api, new_api):
     """
     Merge two YAML files (remote_api and new_api) while ensuring the resulting YAML
@@ -37,33 +69,115 @@ def merge_yaml(remote_api, new_api):
         dict: The merged YAML content as a dictionary.
     """
     # Merge components and paths from new_api into remote_api
-    if 'components' in new_api:
-        if 'components' in remote_api:
-            deep_merge(remote_api['components'], new_api['components'])
-        else:
-            remote_api['components'] = new_api['components']
+    merged_api, _ = merge_many([remote_api, new_api])
+    return merged_api
+
+
+def merge_many(apis, names=None):
+    """
+    Merge any number of API YAML contents in a single pass, as if each one was merged in turn into the first one
+    with `merge_yaml`.
+
+    The paths and components of all the inputs are first indexed by their key (path and method, or components
+    section and name), each entry is then merged once from all the inputs defining it. An entry defined
+    differently in several inputs is reported as a conflict, the later definitions are merged over the earlier ones.
+
+    Args:
+        apis (list[dict]): The API YAML contents, the first one receives the merge.
+        names (list[str], optional): Names of the inputs used in the conflicts report, e.g. their file paths.
 
-    if 'paths' in new_api:
-        if 'paths' in remote_api:
-            deep_merge(remote_api['paths'], new_api['paths'])
-        else:
-            remote_api['paths'] = new_api['paths']
+    Returns:
+        tuple[dict, list[dict]]: The merged YAML content and the conflicts, each one being a dictionary with the
+        `section` ('paths' or 'components'), the `group` (path or components section), the `key` (method or
+        component name) and the `inputs` defining the entry, in the merge order.
+    """
+    names = names or [f"input {index + 1}" for index in range(len(apis))]
+    merged_api = apis[0]
+
+    # (section, group) -> entry key -> [(input name, definition), ...], in the order of first appearance
+    index = {}
+    for name, api in zip(names, apis):
+        for section in MERGED_SECTIONS:
+            for group, entries in (api.get(section) or {}).items():
+                group_index = index.setdefault((section, group), {})
+                for key, definition in (entries or {}).items():
+                    group_index.setdefault(key, []).append((name, definition))
+
+    conflicts = []
+    merged_sections = {}
+    for (section, group), group_index in index.items():
+        merged_group = merged_sections.setdefault(section, {}).setdefault(group, {})
+        for key, definitions in group_index.items():
+            _, merged_definition = definitions[0]
+            if any(not deep_equal(definition, merged_definition) for _, definition in definitions[1:]):
+                conflicts.append({
+                    'section': section,
+                    'group': group,
+                    'key': key,
+                    'inputs': [name for name, _ in definitions]
+                })
+            for _, definition in definitions[1:]:
+                if isinstance(merged_definition, MutableMapping) and isinstance(definition, MutableMapping):
+                    deep_merge(merged_definition, definition)
+                else:
+                    merged_definition = definition
+            merged_group[key] = merged_definition
+
+    for section in MERGED_SECTIONS:
+        if section in merged_sections:
+            merged_api[section] = merged_sections[section]
+    return merged_api, conflicts
+
+
+def format_conflicts(conflicts):
+    """Human readable lines of the conflicts returned by `merge_many`."""
+    return [
+        f"Conflict: {conflict['section']} {conflict['group']} {conflict['key']} is defined differently in "
+        f"{', '.join(conflict['inputs'])}, merged in this order."
+        for conflict in conflicts
+    ]
+
+
+def load_many(file_paths, workers=None, use_spec_cache=None):
+    """
+    Load several YAML files, in parallel on a pool of `workers` processes (CPU count by default).
+
+    Returns:
+        list[dict]: The YAML contents, in the order of `file_paths`.
+    """
+    if workers == 1 or len(file_paths) <= 1:
+        return [load_yaml(file_path, use_spec_cache) for file_path in file_paths]
+    from concurrent.futures import ProcessPoolExecutor
 
-    return remote_api
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(load_yaml, file_paths, [use_spec_cache] * len(file_paths)))
+
+
+def merge_files(file_paths, output_path, workers=None, use_spec_cache=None):
+    """
+    Merge YAML files into one written once to `output_path`, the first file receives the merge (see `merge_many`).
+
+    Returns:
+        list[dict]: The conflicts found while merging.
+    """
+    merged_api, conflicts = merge_many(load_many(file_paths, workers, use_spec_cache), list(file_paths))
+    save_yaml(merged_api, output_path)
+    return conflicts
 
 
-def load_yaml(file_path):
+def load_yaml(file_path, use_spec_cache=None):
     """
     Load a YAML file into a Python dictionary.
 
     Args:
         file_path (str): Path to the YAML file.
+        use_spec_cache (bool, optional): Whether the parsed file comes from the parsed specs cache (see
+            `spec_cache.load_spec`).
 
     Returns:
         dict: The YAML content as a dictionary.
     """
-    with open(file_path, 'r') as file:
-        return yaml.safe_load(file)
+    return spec_cache.load_spec(file_path, use_spec_cache)
 
 
 def save_yaml(data, file_path):
@@ -75,4 +189,4 @@ def save_yaml(data, file_path):
         file_path (str): Path to save the YAML file.
     """
     with open(file_path, 'w') as file:
-        yaml.dump(data, file, sort_keys=False)
+        yaml_io.dump(data, file, sort_keys=False)
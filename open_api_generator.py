@@ -1,26 +1,49 @@
 import json
-import yaml
-
-
-def add_headers_and_security_to_swagger(swagger_data):
-    # Define the headers to be added
-    headers = [
-        {"name": "x-trace-id", "in": "header", "required": True, "schema": {"type": "string"}},
-        {"name": "User-Agent", "in": "header", "schema": {"type": "string"}},
-        {"name": "Content-Type", "in": "header", "schema": {"type": "string"}},
-        {"name": "Accept-Language", "in": "header", "schema": {"type": "string"}},
-        {"name": "x-forward-for", "in": "header", "schema": {"type": "string"}}
-    ]
-    # Add headers and security to each endpoint
-    for path, path_item in swagger_data["paths"].items():
-        for operation, operation_item in path_item.items():
-            if operation in ["get", "post", "put", "delete", "patch"]:
-                if "parameters" not in operation_item:
-                    operation_item["parameters"] = []
-                operation_item["parameters"].extend(headers)
-                operation_item["security"] = [{"bearerAuth": []}, {"apiKeyHeader": []}]
-    # Add security schemes to components
-    swagger_data["components"]["securitySchemes"] = {
+import os
+
+import instrumentation as instrumentation_module
+import spec_cache as spec_cache
+import yaml_io as yaml_io
+
+
+OPERATION_METHODS = ("get", "post", "put", "delete", "patch")
+
+# Header parameters and security requirements added to every operation. They're shared by all the operations, the
+# output is dumped without anchors so they're written in full in each one. They must never be modified.
+SECURITY_HEADERS = (
+    {"name": "x-trace-id", "in": "header", "required": True, "schema": {"type": "string"}},
+    {"name": "User-Agent", "in": "header", "schema": {"type": "string"}},
+    {"name": "Content-Type", "in": "header", "schema": {"type": "string"}},
+    {"name": "Accept-Language", "in": "header", "schema": {"type": "string"}},
+    {"name": "x-forward-for", "in": "header", "schema": {"type": "string"}}
+)
+SECURITY_REQUIREMENTS = [{"bearerAuth": []}, {"apiKeyHeader": []}]
+
+EMPTY_RESPONSE_REF = '#/components/schemas/EmptyResponse'
+
+
+def transform_path_item(path_item):
+    """
+    Transforms a path item in place: adds the headers and security to its operations, removes their 200 OK
+    responses with EmptyResponse and renames its alias keys (see `rename_aliases`).
+    """
+    for operation, operation_item in path_item.items():
+        if operation in OPERATION_METHODS:
+            if "parameters" not in operation_item:
+                operation_item["parameters"] = []
+            operation_item["parameters"].extend(SECURITY_HEADERS)
+            operation_item["security"] = SECURITY_REQUIREMENTS
+            response_200 = operation_item.get('responses', {}).get('200')
+            if response_200 is not None and 'application/json' in response_200.get('content', {}):
+                schema_ref = response_200['content']['application/json'].get('schema', {}).get('$ref', '')
+                if schema_ref == EMPTY_RESPONSE_REF:
+                    del response_200['content']
+    return rename_aliases(path_item)
+
+
+def transform_components(components):
+    """Adds the security schemes and removes the EmptyResponse and ResponseMessage schemas, in place."""
+    components["securitySchemes"] = {
         "bearerAuth": {
             "type": "http",
             "scheme": "bearer",
@@ -32,53 +55,123 @@ def add_headers_and_security_to_swagger(swagger_data):
             "name": "x-api-key"
         }
     }
-
-
-def remove_empty_responses(swagger_data):
-    # Remove 200 OK responses with EmptyResponse
-    for path, path_item in swagger_data["paths"].items():
-        for operation, operation_item in path_item.items():
-            if operation in ["get", "post", "put", "delete", "patch"]:
-                if 'responses' in operation_item and '200' in operation_item['responses']:
-                    response_200 = operation_item['responses']['200']
-                    if 'content' in response_200:
-                        if 'application/json' in response_200['content']:
-                            schema_ref = response_200['content']['application/json'].get('schema', {}).get('$ref', '')
-                            if schema_ref == '#/components/schemas/EmptyResponse':
-                                del response_200['content']
-
     # Remove EmptyResponse from components
-    if 'EmptyResponse' in swagger_data['components']['schemas']:
-        del swagger_data['components']['schemas']['EmptyResponse']
+    if 'EmptyResponse' in components['schemas']:
+        del components['schemas']['EmptyResponse']
     # Remove components prefixed with ResponseMessage
-    response_message_keys = [key for key in swagger_data['components']['schemas'] if key.startswith('ResponseMessage')]
+    response_message_keys = [key for key in components['schemas'] if key.startswith('ResponseMessage')]
     for key in response_message_keys:
-        del swagger_data['components']['schemas'][key]
+        del components['schemas'][key]
+
+
+def transform_swagger(swagger_data):
+    """Transforms the whole spec in place, each path item once (see `transform_path_item`), and returns it."""
+    for path_item in swagger_data["paths"].values():
+        transform_path_item(path_item)
+    transform_components(swagger_data["components"])
+    for section, value in swagger_data.items():
+        if section != "paths":
+            rename_aliases(value)
+    _rename_alias_keys(swagger_data["paths"])
+    _rename_alias_keys(swagger_data)
+    return swagger_data
 
 
-def replace_aliases_with_names(swagger_data):
-    # Replace aliases with names
-    def replace_alias(item):
-        if isinstance(item, list):
-            return [replace_alias(i) for i in item]
-        elif isinstance(item, dict):
-            return {k.replace('&id', 'name'): replace_alias(v) for k, v in item.items()}
+def rename_aliases(data):
+    """
+    Replaces `&id` with `name` in the keys of the mappings of `data`, in place, and returns it. Only the mappings
+    having such keys are rebuilt, keeping the keys order.
+    """
+    stack = [data]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            for key in item:
+                if '&id' in key:
+                    _rename_alias_keys(item)
+                    break
+            children = item.values()
+        elif isinstance(item, list):
+            children = item
         else:
-            return item
+            continue
+        for child in children:
+            if isinstance(child, (dict, list)):
+                stack.append(child)
+    return data
 
-    return replace_alias(swagger_data)
 
+def _rename_alias_keys(mapping: dict):
+    if any('&id' in key for key in mapping):
+        entries = list(mapping.items())
+        mapping.clear()
+        for key, value in entries:
+            mapping[key.replace('&id', 'name')] = value
 
-def process_swagger_file(input_file, output_file):
+
+def process_swagger_file(input_file, output_file, instrumentation=None, use_spec_cache=None, stream_paths=False):
+    """
+    `instrumentation` (see `instrumentation.Instrumentation`) records the time and memory of each step.
+    `use_spec_cache` tells whether the parsed input comes from the parsed specs cache, or is the cache to load it
+    through (see `spec_cache.load_spec`).
+    With `stream_paths`, the paths are read, transformed and written one at a time (see `process_swagger_file_streamed`).
+    """
+    instrumentation = instrumentation or instrumentation_module.NULL_INSTRUMENTATION
+    if stream_paths:
+        process_swagger_file_streamed(input_file, output_file, instrumentation)
+        return
     # Read the input JSON file
-    with open(input_file, 'r') as f:
-        swagger_data = yaml.safe_load(f)
-    # Add headers and security to the swagger data
-    add_headers_and_security_to_swagger(swagger_data)
-    # Remove empty responses from the swagger data
-    remove_empty_responses(swagger_data)
-    # Replace aliases with names
-    swagger_data = replace_aliases_with_names(swagger_data)
-    # Write the modified swagger data to the output YAML file
-    with open(output_file, 'w') as f:
-        yaml.dump(swagger_data, f, sort_keys=False)
\ No newline at end of file
+    with instrumentation.stage('load'):
+        swagger_data = spec_cache.load_spec(input_file, use_spec_cache)
+    # Add headers and security, remove empty responses and replace aliases with names in a single pass
+    with instrumentation.stage('transform'):
+        schemas_count = len(swagger_data['components']['schemas'])
+        transform_swagger(swagger_data)
+    # Write the modified swagger data to the output YAML file, the shared headers without anchors
+    with instrumentation.stage('dump'), open(output_file, 'w') as f:
+        yaml_io.dump(swagger_data, f, sort_keys=False, anchors=False)
+
+    instrumentation.count('paths', len(swagger_data['paths']))
+    instrumentation.count('operations', sum(
+        1 for path_item in swagger_data['paths'].values() for operation in path_item
+        if operation in OPERATION_METHODS
+    ))
+    instrumentation.count('schemas_deleted', schemas_count - len(swagger_data['components']['schemas']))
+    instrumentation.count('bytes_written', os.path.getsize(output_file))
+
+
+def process_swagger_file_streamed(input_file, output_file, instrumentation=None):
+    """
+    Same as `process_swagger_file`, but the input paths are read from the file one at a time (see `spec_stream`),
+    transformed and written before the next one is read. The memory used is bounded by the other sections of the
+    input and its biggest path. The parsed specs cache isn't used.
+    """
+    import spec_stream
+    instrumentation = instrumentation or instrumentation_module.NULL_INSTRUMENTATION
+    with instrumentation.stage('load'):
+        swagger_data = spec_stream.load_streamed(input_file)
+    with instrumentation.stage('process_components'):
+        schemas_count = len(swagger_data['components']['schemas'])
+        transform_components(swagger_data['components'])
+    operations_count = 0
+
+    def path_fragments():
+        nonlocal operations_count
+        for path, path_item in swagger_data['paths'].items():
+            transform_path_item(path_item)
+            operations_count += sum(1 for operation in path_item if operation in OPERATION_METHODS)
+            yield yaml_io.dump_path(path.replace('&id', 'name'), path_item, anchors=False)
+
+    # The paths are transformed while they're written, the 'dump' stage measures both
+    with instrumentation.stage('dump'), open(output_file, 'w') as f:
+        for section, value in swagger_data.items():
+            if section == spec_stream.PATHS_SECTION:
+                yaml_io.write_gateway_paths(path_fragments(), f)
+            else:
+                yaml_io.dump({section.replace('&id', 'name'): rename_aliases(value)}, f, sort_keys=False,
+                             anchors=False)
+
+    instrumentation.count('paths', len(swagger_data['paths']))
+    instrumentation.count('operations', operations_count)
+    instrumentation.count('schemas_deleted', schemas_count - len(swagger_data['components']['schemas']))
+    instrumentation.count('bytes_written', os.path.getsize(output_file))
@@ -0,0 +1,188 @@
+"""
+Persisted cache of the generated gateway YAML of each path, used to only regenerate the paths that changed.
+
+An entry is reused when the digest of its inputs didn't change: the input path item, every schema it references
+(transitively), the generation settings and the source of the generator itself.
+"""
+import copy
+import hashlib
+import json
+import marshal
+import os
+
+import ref_graph as ref_graph
+
+CACHE_FORMAT_VERSION = 2
+
+# Source files whose changes invalidate the whole cache
+_GENERATOR_SOURCES = ["source_generator.py", "gateway_model.py", "gateway_fragments.py", "amazon_gateway_statics.py",
+                      "utils.py", "yaml_io.py"]
+
+
+def cache_file_for(output_path: str) -> str:
+    """The cache of a gateway output is stored next to it."""
+    return f"{output_path}.cache.json"
+
+
+def _digest(data) -> str:
+    """Stable digest of JSON-like data, the keys order is kept as it matters in the output."""
+    text = json.dumps(data, sort_keys=False, ensure_ascii=False, separators=(',', ':'), default=str)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def generator_digest() -> str:
+    sources_digest = hashlib.sha256()
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    for file_name in _GENERATOR_SOURCES:
+        with open(os.path.join(base_dir, file_name), 'rb') as file:
+            sources_digest.update(file.read())
+    return sources_digest.hexdigest()
+
+
+def path_digests(swagger_data: dict, settings: dict) -> dict[str, str]:
+    """
+    Returns the digest of the generation inputs of each path of `swagger_data`: the path item, the schemas it
+    references directly or through other schemas, and `settings` (anything else the generated path depends on).
+    """
+    return PathDigests().update(swagger_data, settings)
+
+
+def _snapshot(value):
+    """A copy of a parsed value, which the generators can't modify."""
+    try:
+        return marshal.loads(marshal.dumps(value))
+    except ValueError:
+        # Types marshal doesn't support, like the dates YAML can give
+        return copy.deepcopy(value)
+
+
+class PathDigests:
+    """
+    Computes the `path_digests` of the successive versions of a spec, for the processes converting it again and
+    again (see `WarmPathCache`). The path items and schemas are compared to a copy of their previous version, only
+    the changed ones are hashed and searched for `$ref`s again.
+    """
+
+    def __init__(self):
+        # Path or schema name -> (copy of the previous version, digest, names of the schemas it references)
+        self._path_items = {}
+        self._schemas = {}
+
+    @staticmethod
+    def _entry(previous, value, refs_of):
+        if previous is not None and previous[0] == value:
+            return previous
+        return _snapshot(value), _digest(value), refs_of(value)
+
+    def update(self, swagger_data: dict, settings: dict) -> dict[str, str]:
+        """Returns the digests of the paths of `swagger_data`, the new version of the spec."""
+        schemas = swagger_data.get('components', {}).get('schemas', {})
+        self._schemas = {
+            schema_name: self._entry(
+                self._schemas.get(schema_name), schema,
+                lambda value: ref_graph.RefGraph.build({'components': {'schemas': {schema_name: value}}})
+                .schema_refs.get(schema_name, set()))
+            for schema_name, schema in schemas.items()
+        }
+        self._path_items = {
+            path: self._entry(
+                self._path_items.get(path), path_item,
+                lambda value: ref_graph.RefGraph.build({'paths': {path: value}}).path_refs(path))
+            for path, path_item in swagger_data['paths'].items()
+        }
+
+        graph = ref_graph.RefGraph()
+        graph.schema_refs.update((schema_name, entry[2]) for schema_name, entry in self._schemas.items())
+        settings_digest = _digest(settings)
+        missing_schema_digest = _digest(None)
+        digests = {}
+        for path, (_, path_item_digest, path_refs) in self._path_items.items():
+            referenced_schemas = sorted(graph.reachable_schemas(path_refs))
+            digests[path] = _digest([
+                settings_digest,
+                path,
+                path_item_digest,
+                [[schema_name, self._schemas[schema_name][1] if schema_name in self._schemas else missing_schema_digest]
+                 for schema_name in referenced_schemas]
+            ])
+        return digests
+
+
+class PathFragmentCache:
+    """
+    Generated YAML of each path, keyed by path and invalidated by the digest of its inputs (see `path_digests`).
+    Each entry also keeps what the schemas cleanup needs to know about the path without generating it again:
+    the schemas its output references per method and its schema deletion marks.
+    """
+
+    def __init__(self, cache_file: str):
+        self.cache_file = cache_file
+        self.hits = 0
+        self.misses = 0
+        self._generator_digest = generator_digest()
+        self._entries = {}
+        self._new_entries = {}
+
+    def load(self) -> "PathFragmentCache":
+        """Loads the entries saved by a previous run, a missing, corrupted or outdated cache is just ignored."""
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return self
+        if data.get('version') == CACHE_FORMAT_VERSION and data.get('generator') == self._generator_digest:
+            self._entries = data.get('paths', {})
+        return self
+
+    def get(self, path: str, digest: str):
+        """Returns the cached entry of a path if its digest didn't change, None otherwise."""
+        entry = self._entries.get(path)
+        if entry is None or entry['digest'] != digest:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._new_entries[path] = entry
+        return entry
+
+    def put(self, path: str, digest: str, yaml_text: str, operation_refs: dict[str, set[str]], marks: set[str]):
+        self._new_entries[path] = {
+            'digest': digest,
+            'yaml': yaml_text,
+            'refs': {method: sorted(schema_names) for method, schema_names in operation_refs.items()},
+            'marks': sorted(marks)
+        }
+
+    def restart(self):
+        """Starts another run with the entries in memory, including the ones of a previous run that wasn't saved."""
+        self._entries.update(self._new_entries)
+        self._new_entries = {}
+
+    def save(self):
+        """
+        Saves the entries used or added by this run, the entries of removed paths are dropped. They're the cached
+        entries of the next run with this object.
+        """
+        data = {'version': CACHE_FORMAT_VERSION, 'generator': self._generator_digest, 'paths': self._new_entries}
+        with open(self.cache_file, 'w', encoding='utf-8') as file:
+            json.dump(data, file, ensure_ascii=False)
+        self._entries, self._new_entries = self._new_entries, {}
+
+
+class WarmPathCache:
+    """
+    State of the incremental generation of one gateway kept in memory between its runs, for the processes
+    converting the same specs again and again (see `cli.py watch`): the `PathDigests` of the previous version of the
+    spec and the `PathFragmentCache`, only read from its file by the first run.
+    """
+
+    def __init__(self):
+        self.digests = PathDigests()
+        self.fragment_cache = None
+
+    def fragment_cache_for(self, output_path: str) -> PathFragmentCache:
+        cache_file = cache_file_for(output_path)
+        if self.fragment_cache is None or self.fragment_cache.cache_file != cache_file:
+            self.fragment_cache = PathFragmentCache(cache_file).load()
+        else:
+            self.fragment_cache.restart()
+        return self.fragment_cache
@@ -0,0 +1,131 @@
+from collections import defaultdict, deque
+from types import MappingProxyType
+
+SCHEMA_REF_PREFIX = "#/components/schemas/"
+
+# The mappings of the documents, including the read-only fragments shared by the generated operations
+_MAPPINGS = (dict, MappingProxyType)
+_CONTAINERS = (dict, MappingProxyType, list)
+
+
+def schema_name_from_ref(ref: str):
+    """Returns the schema name of a `#/components/schemas/<name>` reference, None for any other value."""
+    if not ref.startswith(SCHEMA_REF_PREFIX):
+        return None
+    return ref[len(SCHEMA_REF_PREFIX):].split("/", 1)[0]
+
+
+def referrer_of(location: tuple) -> tuple:
+    """
+    Reduces the location of a reference to the object owning it:
+        - ('components', 'schemas', <schema name>) for a schema
+        - ('paths', <path>, <method>) for an operation
+        - the two first keys for anything else, e.g. ('components', 'parameters')
+    """
+    if location[:2] == ("components", "schemas") or location[:1] == ("paths",):
+        return location[:3]
+    return location[:2]
+
+
+class RefGraph:
+    """
+    Reverse index of the `#/components/schemas/...` references of an OpenAPI document, built in one pass.
+
+    Attributes:
+        schema_refs (dict[str, set[str]]): schema name -> names of the schemas it references.
+        referrers (dict[str, set[tuple]]): schema name -> objects referencing it (see `referrer_of`).
+        operation_refs (dict[tuple, set[str]]): (path, method) -> names of the schemas the operation references.
+        root_refs (set[str]): schemas referenced from outside `components.schemas` (paths, other components...).
+    """
+
+    def __init__(self):
+        self.schema_refs = defaultdict(set)
+        self.referrers = defaultdict(set)
+        self.operation_refs = defaultdict(set)
+        self.root_refs = set()
+
+    @classmethod
+    def build(cls, data: dict) -> "RefGraph":
+        """Walks the whole document once (iteratively, so deep documents can't hit the recursion limit)."""
+        graph = cls()
+        stack = [((), data)]
+        while stack:
+            location, node = stack.pop()
+            if isinstance(node, _MAPPINGS):
+                for key, value in node.items():
+                    if isinstance(value, str):
+                        schema_name = schema_name_from_ref(value)
+                        if schema_name is not None:
+                            graph.add_ref(referrer_of(location + (key,)), schema_name)
+                    elif isinstance(value, _CONTAINERS):
+                        stack.append((location + (key,), value))
+            elif isinstance(node, list):
+                for index, item in enumerate(node):
+                    if isinstance(item, _CONTAINERS):
+                        stack.append((location + (index,), item))
+        return graph
+
+    def add_ref(self, referrer: tuple, schema_name: str):
+        self.referrers[schema_name].add(referrer)
+        if referrer[:2] == ("components", "schemas") and len(referrer) == 3:
+            self.schema_refs[referrer[2]].add(schema_name)
+        else:
+            if referrer[:1] == ("paths",) and len(referrer) == 3:
+                self.operation_refs[referrer[1:]].add(schema_name)
+            self.root_refs.add(schema_name)
+
+    def path_refs(self, path: str) -> set[str]:
+        """Returns the schemas directly referenced by all the operations of a path."""
+        return {
+            schema_name
+            for (ref_path, _), schema_names in self.operation_refs.items() if ref_path == path
+            for schema_name in schema_names
+        }
+
+    def refs_by_path(self) -> dict[str, set[str]]:
+        """Returns the schemas directly referenced by the operations of each path, for all the paths at once."""
+        refs = defaultdict(set)
+        for (path, _), schema_names in self.operation_refs.items():
+            refs[path].update(schema_names)
+        return refs
+
+    def reachable_schemas(self, roots=None) -> set[str]:
+        """
+        Returns the schemas transitively referenced from `roots`.
+        By default the roots are the schemas referenced from outside `components.schemas` (mainly the paths).
+        """
+        roots = self.root_refs if roots is None else roots
+        reachable = set(roots)
+        queue = deque(reachable)
+        while queue:
+            for schema_name in self.schema_refs.get(queue.popleft(), ()):
+                if schema_name not in reachable:
+                    reachable.add(schema_name)
+                    queue.append(schema_name)
+        return reachable
+
+    def describe_referrers(self, schema_name: str) -> list[str]:
+        """Human-readable list of what references a schema, e.g. ['schema Page', 'GET /v1/items']."""
+        descriptions = []
+        for referrer in sorted(self.referrers.get(schema_name, ()), key=str):
+            if referrer[:2] == ("components", "schemas"):
+                descriptions.append(f"schema {referrer[2]}")
+            elif referrer[:1] == ("paths",) and len(referrer) == 3:
+                descriptions.append(f"{str(referrer[2]).upper()} {referrer[1]}")
+            else:
+                descriptions.append(".".join(str(part) for part in referrer))
+        return descriptions
+
+
+def tree_shake_schemas(data: dict, graph: RefGraph = None) -> set[str]:
+    """
+    Removes from `components.schemas` every schema that isn't reachable from the paths (or any other
+    non schema section) of the document. Returns the names of the removed schemas.
+    """
+    schemas = data.get("components", {}).get("schemas", {})
+    graph = graph or RefGraph.build(data)
+    reachable = graph.reachable_schemas()
+    removed = {schema_name for schema_name in schemas if schema_name not in reachable}
+    for schema_name in removed:
+        del schemas[schema_name]
+    return removed
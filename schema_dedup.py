@@ -0,0 +1,150 @@
+"""
+Structural deduplication of the schemas of a spec: the schemas identical once their `$ref`s to other schemas are
+compared by the structure of their targets (e.g. the `ResponseMessage...` wrappers or the generic paging DTOs of
+springdoc exports) are collapsed into one canonical schema, the first one in the components order, and every `$ref`
+to the others is rewritten.
+
+Each schema is serialized once into a canonical text with its schema `$ref`s as placeholders, the groups of schemas
+with the same text are then split until the targets of their `$ref`s are in the same groups too (the coarsest
+partition, which also handles the cycles). Each split round is linear in the number of `$ref`s and the number of
+rounds is bounded by the depth of the `$ref` chains.
+
+Usage:
+    mapping = deduplicate_schemas(swagger_data)
+    write_report(output_path, mapping, schemas_count)
+"""
+import json
+import os
+
+SCHEMA_REF_PREFIX = '#/components/schemas/'
+
+
+def _canonical_text(schema, schema_names, refs: list) -> str:
+    """
+    The canonical JSON text of `schema`: sorted keys, and each `$ref` to one of `schema_names` (and each schema of
+    a discriminator mapping) replaced by a placeholder, the referenced names are appended to `refs` in the text order.
+    """
+
+    def canonical(value, in_mapping=False):
+        if isinstance(value, dict):
+            items = []
+            for key, item in sorted(value.items(), key=lambda entry: str(entry[0])):
+                if (key == '$ref' or in_mapping) and isinstance(item, str) and item.startswith(SCHEMA_REF_PREFIX) \
+                        and item[len(SCHEMA_REF_PREFIX):] in schema_names:
+                    refs.append(item[len(SCHEMA_REF_PREFIX):])
+                    items.append((key, {}))
+                else:
+                    items.append((key, canonical(item, key == 'mapping' and 'propertyName' in value)))
+            return dict(items)
+        if isinstance(value, list):
+            return [canonical(item) for item in value]
+        return value
+
+    return json.dumps(canonical(schema), separators=(',', ':'), ensure_ascii=False, default=str)
+
+
+def find_duplicates(schemas: dict, preserved=()) -> dict[str, str]:
+    """
+    Returns the name of the canonical schema of each duplicated schema of `schemas` (a `components.schemas` mapping).
+    The `preserved` schemas, e.g. the ones the generators look for by name, are never collapsed.
+    """
+    preserved = set(preserved)
+    names = [name for name in schemas if name not in preserved]
+    schema_names = set(schemas)
+    templates = {}
+    refs_by_name = {}
+    group_of = {}
+    for name in names:
+        refs = []
+        text = _canonical_text(schemas[name], schema_names, refs)
+        group_of[name] = templates.setdefault(text, len(templates))
+        refs_by_name[name] = refs
+    del templates
+
+    # Splits the groups until the schemas of a group reference the same groups. A preserved schema is only
+    # equivalent to itself, it's its own group
+    groups_count = len(set(group_of.values()))
+    while True:
+        signatures = {}
+        new_group_of = {
+            name: signatures.setdefault(
+                (group_of[name], tuple(group_of.get(ref, ref) for ref in refs_by_name[name])), len(signatures))
+            for name in names
+        }
+        group_of = new_group_of
+        if len(signatures) == groups_count:
+            break
+        groups_count = len(signatures)
+
+    canonical_names = {}
+    duplicates = {}
+    for name in names:
+        canonical_name = canonical_names.setdefault(group_of[name], name)
+        if canonical_name != name:
+            duplicates[name] = canonical_name
+    return duplicates
+
+
+def rewrite_refs(data, mapping: dict[str, str]):
+    """
+    Rewrites in place the schema `$ref`s (and discriminator mappings) of `data` to the duplicated schemas of
+    `mapping` into `$ref`s to their canonical schema, and returns `data`.
+    """
+    if not mapping:
+        return data
+    refs = {SCHEMA_REF_PREFIX + name: SCHEMA_REF_PREFIX + canonical for name, canonical in mapping.items()}
+    stack = [data]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            ref = item.get('$ref')
+            if isinstance(ref, str) and ref in refs:
+                item['$ref'] = refs[ref]
+            discriminator_mapping = item.get('mapping') if 'propertyName' in item else None
+            if isinstance(discriminator_mapping, dict):
+                for key, value in discriminator_mapping.items():
+                    if isinstance(value, str) and value in refs:
+                        discriminator_mapping[key] = refs[value]
+            children = item.values()
+        elif isinstance(item, list):
+            children = item
+        else:
+            continue
+        for child in children:
+            if isinstance(child, (dict, list)):
+                stack.append(child)
+    return data
+
+
+def deduplicate_schemas(swagger_data: dict, preserved=()) -> dict[str, str]:
+    """
+    Collapses the duplicated schemas of `swagger_data` in place (see `find_duplicates`): the `$ref`s of the whole
+    document are rewritten and the duplicates are removed. Returns the canonical schema of each removed schema.
+    The paths which aren't a dict (see `spec_stream.StreamedPaths`) must be rewritten by the caller.
+    """
+    schemas = swagger_data.get('components', {}).get('schemas', {})
+    mapping = find_duplicates(schemas, preserved)
+    if mapping:
+        rewrite_refs(swagger_data, mapping)
+        for name in mapping:
+            del schemas[name]
+    return mapping
+
+
+def report_file_for(output_path: str) -> str:
+    return f"{os.path.splitext(output_path)[0]}.schema-dedup.json"
+
+
+def write_report(output_path: str, mapping: dict[str, str], schemas_count: int) -> dict:
+    """Writes the report of a deduplication next to `output_path`, the duplicates of each canonical schema."""
+    duplicates = {}
+    for name, canonical_name in mapping.items():
+        duplicates.setdefault(canonical_name, []).append(name)
+    report = {
+        'schemas': schemas_count,
+        'removed': len(mapping),
+        'duplicates': duplicates
+    }
+    with open(report_file_for(output_path), 'w') as file:
+        json.dump(report, file, indent=2)
+    return report
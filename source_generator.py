@@ -1,11 +1,28 @@
 
-import yaml
-
+import io
+import os
+
+import amazon_gateway_statics as amazon_gateway_statics
+import gateway_fragments as gateway_fragments
+import gateway_model as gateway_model
+import instrumentation as instrumentation_module
+import ref_graph as ref_graph
+import spec_cache as spec_cache
 import utils as utils
+import yaml_io as yaml_io
+
+# How many levels of nested schemas are flattened into dotted query parameter names
+DEFAULT_QUERY_REF_MAX_DEPTH = 10
+
+SHARED_FRAGMENTS_MODES = (None, 'anchors', 'components')
 
 
 def format_swagger_to_template(input_yaml_path, output_path, frontend_url, vpc_connection_id, info_title,
-                               info_description, info_version, servers_url, base_path_default):
+                               info_description, info_version, servers_url, base_path_default, selected_paths=None,
+                               query_ref_max_depth=DEFAULT_QUERY_REF_MAX_DEPTH, workers=None,
+                               incremental=False, shared_fragments=None, instrumentation=None, progress=None,
+                               gateway_response_overrides=None, use_spec_cache=None, shard_plan=None,
+                               stream_paths=False, dedupe_schemas=False):
     """
     Transforms a Swagger YAML file into AWS API Gateway format using a template.
     Args:
@@ -18,25 +35,109 @@ def format_swagger_to_template(input_yaml_path, output_path, frontend_url, vpc_c
         info_version (str): Version of the API (used in the `info` section)
         servers_url (str): Base URL for the API (used in the `servers` section)
         base_path_default (str): Default base path for the API (used in the `servers` section)
+        selected_paths (Iterable[str], optional): Only generate these paths. The schemas not referenced by the
+            generated paths are then removed from the output components.
+        query_ref_max_depth (int, optional): How many levels of nested schemas of query parameter objects are
+            flattened into dotted query parameter names.
+        workers (int, optional): Number of processes generating the paths in parallel, serial if not set.
+        incremental (bool or WarmPathCache, optional): Only generate the paths whose inputs changed since the
+            previous run, the other ones are taken from a cache stored next to the output file (see `path_cache`).
+            A `path_cache.WarmPathCache` also keeps the digests of the spec and the cache in memory between the runs.
+        shared_fragments (str, optional): How the blocks repeated in every operation (see `gateway_fragments`) are
+            written. By default they are repeated as is, 'anchors' writes them once with YAML anchors and aliases
+            and 'components' moves the standard headers and error responses to `components.parameters` and
+            `components.responses` and references them. 'anchors' can't be combined with several `workers`, the
+            fragments generated by each process wouldn't be the same objects anymore.
+        instrumentation (Instrumentation, optional): Records the time and memory of each stage of the generation
+            and its counters (see `instrumentation`).
+        progress (callable, optional): Called with the number of paths done and the number of paths to generate
+            after each path. It may raise an exception to stop the generation between two paths.
+        gateway_response_overrides (dict, optional): Per-project changes of the error codes, status codes or templates
+            of the gateway responses, by gateway response type (see `amazon_gateway_statics.gateway_response_table`).
+        use_spec_cache (bool or SpecCache, optional): Whether the parsed input is loaded from (and saved to) the
+            parsed specs cache, or the cache to load it through, see `spec_cache.load_spec`.
+        shard_plan (ShardPlan, optional): Split the gateway in several self-contained files written next to
+            `output_path`, listed in a manifest, instead of writing `output_path` (see `gateway_shards`).
+        stream_paths (bool, optional): Read the input paths one at a time from the file instead of loading it whole,
+            the memory used is then bounded by its components and its biggest path (see `spec_stream`). It can't be
+            combined with `incremental`, `shard_plan`, the 'anchors' shared fragments or several `workers`, and
+            doesn't use the parsed specs cache.
+        dedupe_schemas (bool, optional): Collapse the structurally identical schemas of the input into one canonical
+            schema and rewrite their `$ref`s before the generation (see `schema_dedup`). The canonical schema of each
+            removed schema is reported in a `.schema-dedup.json` file next to `output_path`.
     """
-    # Read the input Swagger YAML
-    with open(input_yaml_path, 'r') as file:
-        swagger_data = yaml.safe_load(file)
-
-    # Add custom representers (converters)
-    yaml.add_representer(utils.QuotedString, utils.QuotedString.quoted_string_representer)
-    yaml.add_representer(utils.FlowStyleList, utils.FlowStyleList.flow_style_representer)
+    instrumentation = instrumentation or instrumentation_module.NULL_INSTRUMENTATION
+    if shared_fragments not in SHARED_FRAGMENTS_MODES:
+        raise ValueError(f"Unknown shared fragments mode {shared_fragments}, expected one of {SHARED_FRAGMENTS_MODES}")
+    if shared_fragments == 'anchors' and incremental:
+        raise ValueError("The incremental generation can't write shared fragments as YAML anchors")
+    if shared_fragments == 'anchors' and shard_plan is not None:
+        raise ValueError("The sharded generation can't write shared fragments as YAML anchors")
+    if shared_fragments == 'anchors' and workers is not None and workers > 1:
+        raise ValueError("The parallel generation can't write shared fragments as YAML anchors")
+    if stream_paths and (incremental or shard_plan is not None or shared_fragments == 'anchors'
+                         or (workers is not None and workers > 1)):
+        raise ValueError("The paths streaming can't be combined with the incremental, sharded, anchors or parallel "
+                         "generation")
 
+    # Read the input Swagger YAML
+    with instrumentation.stage('load'):
+        if stream_paths:
+            import spec_stream
+            # The streamed path items are transformed when they're read, `modify_schemas_fields` keeps the streamed
+            # paths as they are
+            swagger_data = spec_stream.load_streamed(input_yaml_path, modify_schemas_fields)
+        else:
+            swagger_data = spec_cache.load_spec(input_yaml_path, use_spec_cache)
+
+    if dedupe_schemas:
+        with instrumentation.stage('dedupe_schemas'):
+            dedupe_input_schemas(swagger_data, output_path, instrumentation)
+
+    with instrumentation.stage('process_components'):
+        swagger_data = process_components(swagger_data)
+        output_data = generate_output_data_template(swagger_data, info_title, info_description, info_version, servers_url,
+                                                    base_path_default, gateway_response_overrides)
+    if shared_fragments == 'anchors':
+        # The anchors can't span several dumps, the whole document is dumped at once
+        output_data = process_paths(swagger_data, output_data, frontend_url, vpc_connection_id, selected_paths,
+                                    query_ref_max_depth, workers, instrumentation, progress)
+        with instrumentation.stage('dump'), open(output_path, 'w') as file:
+            yaml_io.dump_gateway(output_data, file, anchors=True)
+        instrumentation.count('bytes_written', os.path.getsize(output_path))
+    else:
+        write_gateway(swagger_data, output_data, output_path, frontend_url, vpc_connection_id, selected_paths,
+                      query_ref_max_depth, workers, incremental, shared_fragments == 'components', instrumentation,
+                      progress, gateway_response_overrides, shard_plan)
 
-    swagger_data = process_components(swagger_data)
-    output_data = generate_output_data_template(swagger_data, info_title, info_description, info_version, servers_url, base_path_default)
-    output_data = process_paths(swagger_data, output_data, frontend_url, vpc_connection_id)
+    if shard_plan is None:
+        print(f"Output YAML file saved to: {output_path}")
 
-    output_data = utils.convert_str_values_to_quoted_strings(output_data)
-    with open(output_path, 'w') as file:
-        yaml.dump(output_data, file, sort_keys=False, Dumper=utils.ListIndentDumper)
+def dedupe_input_schemas(swagger_data: dict, output_path: str, instrumentation=None) -> dict[str, str]:
+    """
+    Collapses the duplicated schemas of the input in place (see `schema_dedup.deduplicate_schemas`) and writes the
+    report next to `output_path`. The schemas the generation refers to by name (the EmptyResponse ones and the error
+    responses schema) are kept as they are.
+    """
+    import schema_dedup
+
+    schemas = swagger_data['components']['schemas']
+    schemas_count = len(schemas)
+    preserved = [name for name in schemas
+                 if 'EmptyResponse' in name or name == gateway_fragments.ERROR_RESPONSE_SCHEMA]
+    mapping = schema_dedup.deduplicate_schemas(swagger_data, preserved)
+    if not isinstance(swagger_data['paths'], dict):
+        # The streamed path items are rewritten when they're read
+        paths_transform = swagger_data['paths'].transform
+        swagger_data['paths'].transform = \
+            lambda path_item: paths_transform(schema_dedup.rewrite_refs(path_item, mapping))
+    schema_dedup.write_report(output_path, mapping, schemas_count)
+    if instrumentation is not None:
+        instrumentation.count('schemas_deduplicated', len(mapping))
+    print(f"Deduplicated {len(mapping)} of {schemas_count} schema(s), report saved to: "
+          f"{schema_dedup.report_file_for(output_path)}")
+    return mapping
 
-    print(f"Output YAML file saved to: {output_path}")
 
 def process_components(swagger_data: dict) -> dict:
     add_security_schemes(swagger_data['components'])
@@ -97,8 +198,10 @@ def generate_output_data_template(
         info_description: str,
         info_version: str,
         servers_url: str,
-        base_path_default: str
+        base_path_default: str,
+        gateway_response_overrides: dict = None
 ) -> dict:
+    """`gateway_response_overrides` changes the standard gateway responses (see `amazon_gateway_statics`)."""
     output_data = {
         'openapi': swagger_data.get('openapi', '3.0.1'),
         'info': {
@@ -120,228 +223,408 @@ def generate_output_data_template(
         ],
         'paths': {},
         'components': swagger_data.get('components', {}),
-        'x-amazon-apigateway-gateway-responses': {
-            "AUTHORIZER_CONFIGURATION_ERROR": {
-                "responseTemplates": {
-                    "application/json": "{\n  \"status\":  $context.status,\n  \"title\": $context.error.messageString,\n  \"code\": \"E201003\",\n  \"detail\": $context.error.messageString\n}"
-                }
-            },
-            "EXPIRED_TOKEN": {
-                "responseTemplates": {
-                    "application/json": "{\n  \"status\":  $context.status,\n  \"title\": $context.error.messageString,\n  \"code\": \"E201009\",\n  \"detail\": $context.error.messageString\n}"
-                }
-            },
-            "MISSING_AUTHENTICATION_TOKEN": {
-                "responseTemplates": {
-                    "application/json": "{\n  \"status\":  $context.status,\n  \"title\": $context.error.messageString,\n  \"code\": \"E201014\",\n  \"detail\": $context.error.messageString\n}"
-                }
-            },
-            "BAD_REQUEST_PARAMETERS": {
-                "statusCode": 400,
-                "responseTemplates": {
-                    "application/json": "{\n  \"status\": $context.status,\n  \"title\": $context.error.messageString,\n  \"code\": \"E201006\",\n  \"detail\": $context.error.messageString\n}"
-                }
-            },
-            "DEFAULT_4XX": {
-                "responseTemplates": {
-                    "application/json": "{\n  \"status\": $context.status,\n  \"title\": $context.error.messageString,\n  \"code\": \"E201007\",\n  \"detail\": $context.error.messageString\n}"
-                }
-            },
-            "WAF_FILTERED": {
-                "responseTemplates": {
-                    "application/json": "{\n  \"status\":  $context.status,\n  \"title\": $context.error.messageString,\n  \"code\": \"E201021\",\n  \"detail\": $context.error.messageString\n}"
-                }
-            },
-            "AUTHORIZER_FAILURE": {
-                "responseTemplates": {
-                    "application/json": "{\n  \"status\":  $context.status,\n  \"title\": $context.error.messageString,\n  \"code\": \"E201004\",\n  \"detail\": $context.error.messageString\n}"
-                }
-            },
-            "RESOURCE_NOT_FOUND": {
-                "responseTemplates": {
-                    "application/json": "{\n  \"status\":  $context.status,\n  \"title\": $context.error.messageString,\n  \"code\": \"E201017\",\n  \"detail\": $context.error.messageString\n}"
-                }
-            },
-            "THROTTLED": {
-                "responseTemplates": {
-                    "application/json": "{\n  \"status\":  $context.status,\n  \"title\": $context.error.messageString,\n  \"code\": \"E201018\",\n  \"detail\": $context.error.messageString\n}"
-                }
-            },
-            "UNAUTHORIZED": {
-                "responseTemplates": {
-                    "application/json": "{\n  \"status\":  $context.status,\n  \"title\": $context.error.messageString,\n  \"code\": \"E201019\",\n  \"detail\": $context.error.messageString\n}"
-                }
-            },
-            "REQUEST_TOO_LARGE": {
-                "responseTemplates": {
-                    "application/json": "{\n  \"status\":  $context.status,\n  \"title\": $context.error.messageString,\n  \"code\": \"E201016\",\n  \"detail\": $context.error.messageString\n}"
-                }
-            },
-            "INVALID_SIGNATURE": {
-                "responseTemplates": {
-                    "application/json": "{\n  \"status\":  $context.status,\n  \"title\": $context.error.messageString,\n  \"code\": \"E201013\",\n  \"detail\": $context.error.messageString\n}"
-                }
-            },
-            "API_CONFIGURATION_ERROR": {
-                "responseTemplates": {
-                    "application/json": "{\n  \"status\":  $context.status,\n  \"title\": $context.error.messageString,\n  \"code\": \"E201002\",\n  \"detail\": $context.error.messageString\n}"
-                }
-            },
-            "UNSUPPORTED_MEDIA_TYPE": {
-                "responseTemplates": {
-                    "application/json": "{\n  \"status\":  $context.status,\n  \"title\": $context.error.messageString,\n  \"code\": \"E201020\",\n  \"detail\": $context.error.messageString\n}"
-                }
-            },
-            "INTEGRATION_FAILURE": {
-                "responseTemplates": {
-                    "application/json": "{\n  \"status\":  $context.status,\n  \"title\": $context.error.messageString,\n  \"code\": \"E201010\",\n  \"detail\": $context.error.messageString\n}"
-                }
-            },
-            "QUOTA_EXCEEDED": {
-                "responseTemplates": {
-                    "application/json": "{\n  \"status\":  $context.status,\n  \"title\": $context.error.messageString,\n  \"code\": \"E201015\",\n  \"detail\": $context.error.messageString\n}"
-                }
-            },
-            "ACCESS_DENIED": {
-                "responseTemplates": {
-                    "application/json": "{\n  \"status\":  $context.status,\n  \"title\": $context.error.messageString,\n  \"code\": \"E201001\",\n  \"detail\": $context.error.messageString\n}"
-                }
-            },
-            "INVALID_API_KEY": {
-                "responseTemplates": {
-                    "application/json": "{\n  \"status\":  $context.status,\n  \"title\": $context.error.messageString,\n  \"code\": \"E201012\",\n  \"detail\": $context.error.messageString\n}"
-                }
-            },
-            "BAD_REQUEST_BODY": {
-                "responseTemplates": {
-                    "application/json": "{\n  \"status\":  $context.status,\n  \"title\": $context.error.messageString,\n  \"code\": \"E201005\",\n  \"detail\": $context.error.messageString\n}"
-                }
-            },
-            "DEFAULT_5XX": {
-                "responseTemplates": {
-                    "application/json": "{\n  \"status\":  $context.status,\n  \"title\": $context.error.messageString,\n  \"code\": \"E201008\",\n  \"detail\": $context.error.messageString\n}"
-                }
-            },
-            "INTEGRATION_TIMEOUT": {
-                "responseTemplates": {
-                    "application/json": "{\n  \"status\":  $context.status,\n  \"title\": $context.error.messageString,\n  \"code\": \"E201011\",\n  \"detail\": $context.error.messageString\n}"
-                }
-            }
-        },
-        'x-amazon-apigateway-request-validators': {
-            'Validate body, query string parameters, and headers': {
-                'validateRequestParameters': True,
-                'validateRequestBody': True
-            }
-        }
+        **amazon_gateway_statics.add_gateway_responses_and_validators(gateway_response_overrides)
     }
 
     return output_data
 
-def process_paths(swagger_data: dict, output_data: dict, frontend_url: str, vpc_connection_id: str):
+def process_paths(swagger_data: dict, output_data: dict, frontend_url: str, vpc_connection_id: str,
+                  selected_paths=None, query_ref_max_depth: int = DEFAULT_QUERY_REF_MAX_DEPTH, workers: int = None,
+                  instrumentation=None, progress=None):
+    """
+    Generates the gateway configuration of every path of `swagger_data` into `output_data['paths']`.
+    With `workers` > 1 the paths are split into contiguous shards processed by a pool of processes, the
+    results are merged back in the input order so the output is the same as the serial one.
+    `progress` is called with the number of paths done and the number of paths after each path.
+    """
+    paths = swagger_data['paths']
+    if selected_paths is not None:
+        selected_paths = set(selected_paths)
+        paths = {path: methods for path, methods in paths.items() if path in selected_paths}
+
+    instrumentation = instrumentation or instrumentation_module.NULL_INSTRUMENTATION
     to_be_deleted_schemas = set()
-    for path, methods in swagger_data['paths'].items():
-        output_data['paths'][path] = {}
-
-        path_parameters = {}
-        # Process each HTTP method
-        for method, operation in methods.items():
-            if method.lower() != 'options':  # Skip options method as it will be added later
-                # Create the method configuration using the template
-                method_config = create_method_config(
-                    path,
-                    operation,
-                    method,
-                    frontend_url,
-                    vpc_connection_id,
-                    swagger_data,
-                    to_be_deleted_schemas
-                )
-                output_data['paths'][path][method] = method_config
-
-                for param in operation.get('parameters', []):
-                    if param['in'] == 'path':
-                        path_param = {
-                            'name': param['name'],
-                            'in': 'path',
-                            'required': True,
-                            'schema': {
-                                'type': param['schema']['type']  # Add the corresponding type if present
-                            }
-                        }
-                        path_parameters[param['name']] = path_param
+    with instrumentation.stage('paths'):
+        generated_paths = generate_paths(swagger_data, list(paths), frontend_url, vpc_connection_id,
+                                         query_ref_max_depth, workers, instrumentation)
+        try:
+            for done, (path, path_config, path_marks) in enumerate(generated_paths, 1):
+                output_data['paths'][path] = path_config
+                to_be_deleted_schemas.update(path_marks)
+                _count_path(instrumentation, paths[path])
+                if progress is not None:
+                    progress(done, len(paths))
+        finally:
+            generated_paths.close()
+
+    with instrumentation.stage('delete_unused_schemas'):
+        schemas_count = _schemas_count(output_data)
+        output_data = delete_unused_schemas(to_be_deleted_schemas, output_data)
+        if selected_paths is not None:
+            removed_schemas = ref_graph.tree_shake_schemas(output_data)
+            print(f"Removed {len(removed_schemas)} schema(s) not referenced by the selected paths.")
+        instrumentation.count('schemas_deleted', schemas_count - _schemas_count(output_data))
 
-        path_methods = [key.upper() for key in methods.keys() if key.lower() != "options"]
-        # Add OPTIONS method with path variables dynamically fetched from path parameters
-        options_config = create_options_method(path_methods, frontend_url)
+    return output_data
 
-        if len(path_parameters) != 0:
-            options_config = {"parameters": list(path_parameters.values()),
-                              **{k: v for k, v in options_config.items() if k != 'parameters'}}
 
-        output_data['paths'][path]['options'] = options_config
+def _count_path(instrumentation, methods: dict):
+    instrumentation.count('paths')
+    instrumentation.count('operations', sum(1 for method in methods if method.lower() != 'options'))
 
-    output_data = delete_unused_schemas(to_be_deleted_schemas, output_data)
 
-    return output_data
+def _schemas_count(output_data: dict) -> int:
+    return len(output_data.get('components', {}).get('schemas', {}))
+
+
+def write_gateway(swagger_data: dict, output_data: dict, output_path: str, frontend_url: str,
+                  vpc_connection_id: str, selected_paths=None, query_ref_max_depth: int = DEFAULT_QUERY_REF_MAX_DEPTH,
+                  workers: int = None, incremental: bool = False, component_refs: bool = False, instrumentation=None,
+                  progress=None, gateway_response_overrides: dict = None, shard_plan=None):
+    """
+    Same as `process_paths` followed by the dump of the output, but each path is written to the file as soon as it's
+    generated and then dropped, so the memory used doesn't grow with the number of paths. Only the schemas referenced
+    by each path are kept for the schemas cleanup, `components` and the sections after it are written once all the
+    paths are.
+    With `incremental`, only the paths whose inputs changed since the previous run are generated. The YAML of the
+    other paths is spliced from the cache stored next to the output (see `path_cache`). `incremental` can also be
+    the `path_cache.WarmPathCache` of the output, kept in memory between the runs.
+    With `component_refs`, the standard headers and error responses are written once in `components` and
+    referenced by the operations (see `gateway_fragments.use_component_refs`).
+    The paths are generated while they are written, `instrumentation` records both in the 'write_paths' stage.
+    `progress` is called with the number of paths written and the number of paths after each path.
+    The static gateway sections are written from their cached YAML text, serialized once per overrides (see
+    `amazon_gateway_statics.serialized_static_section`).
+    With `shard_plan`, the generated paths are kept until they're all generated and then written in shards (see
+    `write_gateway_shards`) instead of `output_path`.
+    """
+    instrumentation = instrumentation or instrumentation_module.NULL_INSTRUMENTATION
+    paths = list(swagger_data['paths'])
+    if selected_paths is not None:
+        selected_paths = set(selected_paths)
+        paths = [path for path in paths if path in selected_paths]
+
+    fragment_cache = None
+    digests = {}
+    cached_entries = {}
+    if incremental:
+        import path_cache
+        settings = {
+            'frontend_url': frontend_url,
+            'vpc_connection_id': vpc_connection_id,
+            'query_ref_max_depth': query_ref_max_depth,
+            'component_refs': component_refs
+        }
+        with instrumentation.stage('digests'):
+            if isinstance(incremental, path_cache.WarmPathCache):
+                digests = incremental.digests.update(swagger_data, settings)
+                fragment_cache = incremental.fragment_cache_for(output_path)
+            else:
+                digests = path_cache.path_digests(swagger_data, settings)
+                fragment_cache = path_cache.PathFragmentCache(path_cache.cache_file_for(output_path)).load()
+            for path in paths:
+                entry = fragment_cache.get(path, digests[path])
+                if entry is not None:
+                    cached_entries[path] = entry
+        instrumentation.count('paths_from_cache', len(cached_entries))
+    changed_paths = [path for path in paths if path not in cached_entries]
+    if incremental:
+        print(f"Incremental generation: {len(changed_paths)} path(s) to generate, {len(cached_entries)} from cache.")
+
+    to_be_deleted_schemas = set()
+    refs_by_path = {}
+
+    def path_fragments():
+        generated_paths = generate_paths(swagger_data, changed_paths, frontend_url, vpc_connection_id,
+                                         query_ref_max_depth, workers, instrumentation, fragments=True,
+                                         component_refs=component_refs)
+        try:
+            for done, path in enumerate(paths, 1):
+                entry = cached_entries.get(path)
+                if entry is None:
+                    _, fragment, path_refs, path_marks = next(generated_paths)
+                    if fragment_cache is not None:
+                        fragment_cache.put(path, digests[path], fragment, path_refs, path_marks)
+                else:
+                    fragment, path_refs, path_marks = entry['yaml'], entry['refs'], entry['marks']
+                to_be_deleted_schemas.update(path_marks)
+                refs_by_path[path] = path_refs
+                _count_path(instrumentation, swagger_data['paths'][path])
+                yield path, fragment
+                if progress is not None:
+                    progress(done, len(paths))
+            next(generated_paths, None)  # Let the generation finish, it reports the query parameter cache statistics
+        finally:
+            # Stops the worker processes of a parallel generation when the writing is interrupted
+            generated_paths.close()
+
+    def delete_unused_schemas_of_paths():
+        if component_refs:
+            for section, entries in gateway_fragments.shared_components().items():
+                output_data['components'].setdefault(section, {}).update(entries)
+
+        # The paths aren't in the output data anymore, their references are added to the graph
+        graph = ref_graph.RefGraph.build(output_data)
+        for path, path_refs in refs_by_path.items():
+            for method, schema_names in path_refs.items():
+                for schema_name in schema_names:
+                    graph.add_ref(('paths', path, method), schema_name)
+        schemas_count = _schemas_count(output_data)
+        delete_unused_schemas(to_be_deleted_schemas, output_data, graph)
+        if selected_paths is not None:
+            removed_schemas = ref_graph.tree_shake_schemas(output_data, graph)
+            print(f"Removed {len(removed_schemas)} schema(s) not referenced by the selected paths.")
+        instrumentation.count('schemas_deleted', schemas_count - _schemas_count(output_data))
+        return graph
+
+    sections = list(output_data)
+    paths_index = sections.index('paths')
+    if shard_plan is not None:
+        with instrumentation.stage('write_paths'):
+            fragments = dict(path_fragments())
+        with instrumentation.stage('delete_unused_schemas'):
+            graph = delete_unused_schemas_of_paths()
+        with instrumentation.stage('write_shards'):
+            write_gateway_shards(shard_plan, swagger_data, output_data, output_path, fragments, refs_by_path, graph,
+                                 gateway_response_overrides, instrumentation)
+    else:
+        with open(output_path, 'w') as file:
+            with instrumentation.stage('write_paths'):
+                _write_gateway_sections(output_data, sections[:paths_index], file)
+                yaml_io.write_gateway_paths((fragment for _, fragment in path_fragments()), file)
+
+            with instrumentation.stage('delete_unused_schemas'):
+                delete_unused_schemas_of_paths()
+
+            with instrumentation.stage('write_components'):
+                _write_gateway_sections(output_data, sections[paths_index + 1:], file, gateway_response_overrides)
 
+        instrumentation.count('bytes_written', os.path.getsize(output_path))
+    if fragment_cache is not None:
+        fragment_cache.save()
 
 
-def create_method_config(path, operation, method, frontend_url, vpc_connection_id, swagger_data,
-                         to_be_deleted_schemas: set[str]):
-    """Creates the method configuration based on the template."""
-    is_empty_success_response = is_empty_response(operation)
+def _write_gateway_sections(output_data: dict, keys: list[str], file, gateway_response_overrides: dict = None):
+    """Writes the top level sections `keys` of the gateway, the static ones from their cached YAML text."""
+    for key in keys:
+        if key in amazon_gateway_statics.STATIC_SECTIONS:
+            file.write(amazon_gateway_statics.serialized_static_section(key, gateway_response_overrides))
+        else:
+            yaml_io.dump_gateway({key: output_data[key]}, file)
+
+
+def write_gateway_shards(shard_plan, swagger_data: dict, output_data: dict, output_path: str,
+                         path_fragments: dict[str, str], refs_by_path: dict, graph: ref_graph.RefGraph,
+                         gateway_response_overrides: dict = None, instrumentation=None) -> dict:
+    """
+    Writes the generated paths split by `shard_plan` (see `gateway_shards.ShardPlan`) in self-contained gateway
+    files next to `output_path`, each with the schemas its operations reference, the other components and the static
+    sections. The shards are listed in a manifest with their size and hash, which is returned.
+    """
+    import gateway_shards
+
+    instrumentation = instrumentation or instrumentation_module.NULL_INSTRUMENTATION
+    sections = list(output_data)
+    paths_index = sections.index('paths')
+    header = io.StringIO()
+    _write_gateway_sections(output_data, sections[:paths_index], header)
+    _write_gateway_sections(gateway_shards.shard_output_data(output_data, set()), sections[paths_index + 1:], header,
+                            gateway_response_overrides)
+    shards = shard_plan.plan(swagger_data['paths'], path_fragments, refs_by_path, graph,
+                             output_data['components'].get('schemas', {}), len(header.getvalue()))
+
+    file_paths = gateway_shards.shard_file_paths(output_path, shards)
+    for shard, file_path in zip(shards, file_paths):
+        shard_data = gateway_shards.shard_output_data(output_data, shard['schemas'])
+        with open(file_path, 'w') as file:
+            _write_gateway_sections(shard_data, sections[:paths_index], file)
+            yaml_io.write_gateway_paths((path_fragments[path] for path in shard['paths']), file)
+            _write_gateway_sections(shard_data, sections[paths_index + 1:], file, gateway_response_overrides)
+        instrumentation.count('bytes_written', os.path.getsize(file_path))
+    manifest = gateway_shards.write_manifest(output_path, shard_plan, shards, file_paths, swagger_data['paths'])
+    print(f"Gateway split in {len(shards)} shard(s), listed in {gateway_shards.manifest_file_for(output_path)}")
+    return manifest
+
+
+def generate_paths(swagger_data: dict, paths: list[str], frontend_url: str, vpc_connection_id: str,
+                   query_ref_max_depth: int = DEFAULT_QUERY_REF_MAX_DEPTH, workers: int = None, instrumentation=None,
+                   fragments: bool = False, component_refs: bool = False):
+    """
+    Runs `process_path` for each of `paths`, serially or on a pool of `workers` processes.
+    Yields a (path, path configuration, schema deletion marks of the path) tuple per path, in the order of `paths`.
+    With `fragments`, yields the (path, YAML fragment, schemas referenced by each method, marks) tuples of
+    `path_fragment` instead, dumped by the worker processes for a parallel generation.
+    """
+    if workers is not None and workers > 1 and len(paths) > 1:
+        cache_hits = cache_misses = 0
+        for shard_results, shard_hits, shard_misses in process_paths_in_parallel(
+                swagger_data, paths, frontend_url, vpc_connection_id, query_ref_max_depth, workers, fragments,
+                component_refs):
+            yield from shard_results
+            cache_hits += shard_hits
+            cache_misses += shard_misses
+    else:
+        query_ref_cache = QueryRefCache(swagger_data, query_ref_max_depth)
+        model_builder = gateway_model.ModelBuilder(is_empty_response)
+        for path in paths:
+            result = _process_path_with_marks(path, swagger_data, frontend_url, vpc_connection_id, query_ref_cache,
+                                              model_builder)
+            yield path_fragment(*result, component_refs) if fragments else result
+        cache_hits, cache_misses = query_ref_cache.hits, query_ref_cache.misses
+
+    print(f"Query parameter objects: {cache_misses} flattened, {cache_hits} reused from cache.")
+    if instrumentation is not None:
+        instrumentation.count('refs_resolved', cache_hits + cache_misses)
+        instrumentation.count('refs_reused_from_cache', cache_hits)
+
+
+def _process_path_with_marks(path: str, swagger_data: dict, frontend_url: str, vpc_connection_id: str,
+                             query_ref_cache: "QueryRefCache", model_builder: gateway_model.ModelBuilder):
+    path_marks = set()
+    path_config = process_path(path, swagger_data['paths'][path], swagger_data, frontend_url, vpc_connection_id,
+                               path_marks, query_ref_cache, model_builder)
+    return path, path_config, path_marks
+
+
+def path_fragment(path: str, path_config: dict, path_marks: set[str], component_refs: bool = False) -> tuple:
+    """
+    Dumps a generated path (see `yaml_io.dump_gateway_path`), with the standard blocks referenced from `components`
+    when `component_refs` is set. Returns the (path, YAML fragment, schemas referenced by each method, marks) tuple.
+    """
+    if component_refs:
+        gateway_fragments.use_component_refs(path_config)
+    fragment = yaml_io.dump_gateway_path(path, path_config)
+    path_graph = ref_graph.RefGraph.build({'paths': {path: path_config}})
+    path_refs = {method: schema_names for (_, method), schema_names in path_graph.operation_refs.items()}
+    return path, fragment, path_refs, path_marks
+
+
+def process_path(path: str, methods: dict, swagger_data: dict, frontend_url: str, vpc_connection_id: str,
+                 to_be_deleted_schemas: set[str], query_ref_cache: "QueryRefCache" = None,
+                 model_builder: gateway_model.ModelBuilder = None) -> dict:
+    """
+    Creates the gateway configuration of all the methods of a path, including its OPTIONS method.
+    The path is first read into the compact model (see `gateway_model`), the configuration is built from it. Pass
+    the same `model_builder` for all the paths to share their identical parameters.
+    """
+    model_builder = model_builder or gateway_model.ModelBuilder(is_empty_response)
+    path_item = model_builder.path_item(path, methods)
+
+    path_config = {}
+    for operation in path_item.operations:
+        # Create the method configuration using the template
+        path_config[operation.method] = create_method_config(
+            path,
+            operation,
+            frontend_url,
+            vpc_connection_id,
+            swagger_data,
+            to_be_deleted_schemas,
+            query_ref_cache
+        )
+
+    # Add OPTIONS method with path variables dynamically fetched from path parameters
+    path_config['options'] = create_options_method(path_item, frontend_url)
+
+    return path_config
+
+
+# State of a `process_paths_in_parallel` worker process, set once by `_init_path_worker`
+_path_worker_context = {}
+
+
+def _init_path_worker(swagger_data, frontend_url, vpc_connection_id, query_ref_max_depth, fragments, component_refs):
+    _path_worker_context.update(
+        swagger_data=swagger_data,
+        frontend_url=frontend_url,
+        vpc_connection_id=vpc_connection_id,
+        fragments=fragments,
+        component_refs=component_refs,
+        query_ref_cache=QueryRefCache(swagger_data, query_ref_max_depth),
+        model_builder=gateway_model.ModelBuilder(is_empty_response)
+    )
+
+
+def _process_paths_shard(shard_paths: list[str]):
+    swagger_data = _path_worker_context['swagger_data']
+    query_ref_cache = _path_worker_context['query_ref_cache']
+    hits, misses = query_ref_cache.hits, query_ref_cache.misses
+    path_results = [
+        _process_path_with_marks(path, swagger_data, _path_worker_context['frontend_url'],
+                                 _path_worker_context['vpc_connection_id'], query_ref_cache,
+                                 _path_worker_context['model_builder'])
+        for path in shard_paths
+    ]
+    if _path_worker_context['fragments']:
+        # Dumped here, the dump is most of the time of a path and the parent only has to write the fragments
+        path_results = [path_fragment(*result, _path_worker_context['component_refs']) for result in path_results]
+    return path_results, query_ref_cache.hits - hits, query_ref_cache.misses - misses
+
+
+def process_paths_in_parallel(swagger_data: dict, paths: list[str], frontend_url: str, vpc_connection_id: str,
+                              query_ref_max_depth: int, workers: int, fragments: bool = False,
+                              component_refs: bool = False):
+    """
+    Runs `process_path` for `paths` on a pool of `workers` processes.
+    Yields the results of each shard of paths, in the order of `paths`: the (path, path configuration, schema
+    deletion marks) tuples of the shard, or with `fragments` their `path_fragment` tuples, and the query parameter
+    cache hits and misses of the shard.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    # A few shards per worker to balance uneven paths while keeping the pickling overhead low
+    shard_size = max(1, -(-len(paths) // (workers * 4)))
+    shards = [paths[i:i + shard_size] for i in range(0, len(paths), shard_size)]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_path_worker,
+                             initargs=(swagger_data, frontend_url, vpc_connection_id, query_ref_max_depth, fragments,
+                                       component_refs)) as executor:
+        yield from executor.map(_process_paths_shard, shards)
+
+
+def create_method_config(path, operation: gateway_model.Operation, frontend_url, vpc_connection_id, swagger_data,
+                         to_be_deleted_schemas: set[str], query_ref_cache: "QueryRefCache" = None):
+    """Creates the method configuration of an operation of the model based on the template."""
+    is_empty_success_response = operation.success_response.is_empty
     method_config = {
-        'operationId': operation.get('operationId', ''),
+        'operationId': operation.operation_id,
         'parameters': [],
-        'requestBody': operation.get('requestBody', {}),
-        'responses': {
-            utils.QuotedString("404"): create_error_response("404"),
-            utils.QuotedString("200"): create_success_response(operation, is_empty_success_response),
-            utils.QuotedString("400"): create_error_response("400"),
-            utils.QuotedString("401"): create_error_response("401"),
-            utils.QuotedString("500"): create_error_response("500"),
-            utils.QuotedString("403"): create_error_response("403")
-        },
-        'security': [{'api_key': []}],
-        'x-amazon-apigateway-request-validator': 'Validate body, query string parameters, and headers'
     }
+    if operation.has_request_body:
+        method_config['requestBody'] = operation.request_body
+    method_config['responses'] = {
+        utils.QuotedString("404"): create_error_response("404"),
+        utils.QuotedString("200"): create_success_response(operation.success_response),
+        utils.QuotedString("400"): create_error_response("400"),
+        utils.QuotedString("401"): create_error_response("401"),
+        utils.QuotedString("500"): create_error_response("500"),
+        utils.QuotedString("403"): create_error_response("403")
+    }
+    method_config['security'] = [{'api_key': []}]
+    method_config['x-amazon-apigateway-request-validator'] = amazon_gateway_statics.REQUEST_VALIDATOR_NAME
 
     # Add standard headers
-    standard_headers = [
-        {'name': 'x-trace-id', 'in': 'header', 'required': True, 'schema': {'type': 'string'}},
-        {'name': 'Content-Type', 'in': 'header', 'schema': {'type': 'string'}},
-        {'name': 'Accept-Language', 'in': 'header', 'schema': {'type': 'string'}},
-        {'name': 'User-Agent', 'in': 'header', 'schema': {'type': 'string'}},
-        {'name': 'Authorization', 'in': 'header', 'required': True, 'schema': {'type': 'string'}},
-        {'name': 'cookie', 'in': 'header', 'schema': {'type': 'string'}},
-        {'name': 'x-forward-for', 'in': 'header', 'schema': {'type': 'string'}}
-    ]
-    method_config['parameters'].extend(standard_headers)
+    method_config['parameters'].extend(gateway_fragments.STANDARD_HEADERS)
 
     path_parameters = []
     query_parameters = []
-    # Add any additional parameters from the operation
-    if 'parameters' in operation:
-        for param in operation['parameters']:
-            if param['in'] == 'query':
-                if 'schema' in param and '$ref' in param['schema']:
-                    ref = param['schema']['$ref']
-                    resolved_params = resolve_ref(ref, swagger_data, to_be_deleted_schemas)
-                    method_config['parameters'].extend(resolved_params)
-                    query_parameters.extend(resolved_params)
-                else:
-                    query_parameters.append(param)
-            if param['in'] == 'path':
-                path_parameters.append(param)
-
-    if 'requestBody' not in operation:
-        method_config.pop('requestBody', None)
+    # Add the query parameters resolved from query objects, the other parameters are only mapped in the integration
+    for parameter in operation.parameters:
+        if parameter.location == 'query':
+            if parameter.schema_ref is not None:
+                resolved_params = resolve_ref(parameter.schema_ref, swagger_data, to_be_deleted_schemas,
+                                              query_ref_cache)
+                method_config['parameters'].extend(resolved_params)
+                query_parameters.extend(param['name'] for param in resolved_params)
+            else:
+                query_parameters.append(parameter.name)
+        if parameter.location == 'path':
+            path_parameters.append(parameter.name)
 
     # Add integration configuration
     method_config['x-amazon-apigateway-integration'] = create_integration_config(
         path,
-        method,
+        operation.method,
         frontend_url,
         vpc_connection_id,
         path_parameters,
@@ -352,8 +635,9 @@ def create_method_config(path, operation, method, frontend_url, vpc_connection_i
 
 
 def create_integration_config(path, method, frontend_url, vpc_connection_id,
-                              path_parameters, query_parameters, is_empty_success_response: bool):
-    """Creates the API Gateway integration configuration."""
+                              path_parameters: list[str], query_parameters: list[str],
+                              is_empty_success_response: bool):
+    """Creates the API Gateway integration configuration, mapping the path and query parameters of these names."""
     integration = {
         'connectionId': vpc_connection_id,
         'httpMethod': method.upper(),
@@ -361,24 +645,13 @@ def create_integration_config(path, method, frontend_url, vpc_connection_id,
         'responses': {
             '^200$': {
                 'statusCode': '200',
-                'responseParameters': {
-                    'method.response.header.Access-Control-Allow-Credentials': '\'true\'',
-                    'method.response.header.Access-Control-Allow-Origin': f"{frontend_url}"
-                },
+                'responseParameters': gateway_fragments.cors_response_parameters(frontend_url),
                 'responseTemplates': {
                     'application/json': "#set($inputRoot = $input.path('$'))"
                 }
             }
         },
-        'requestParameters': {
-            'integration.request.header.Content-Type': 'method.request.header.Content-Type',
-            'integration.request.header.x-forward-for': 'method.request.header.x-forward-for',
-            'integration.request.header.x-trace-id': 'method.request.header.x-trace-id',
-            'integration.request.header.cookie': 'method.request.header.cookie',
-            'integration.request.header.Accept-Language': 'method.request.header.Accept-Language',
-            'integration.request.header.Authorization': 'method.request.header.Authorization',
-            'integration.request.header.User-Agent': 'method.request.header.User-Agent'
-        },
+        'requestParameters': dict(gateway_fragments.INTEGRATION_REQUEST_PARAMETERS),
         'connectionType': 'VPC_LINK',
         'passthroughBehavior': 'when_no_templates',
         'type': 'http'
@@ -387,104 +660,72 @@ def create_integration_config(path, method, frontend_url, vpc_connection_id,
     if not is_empty_success_response:
         integration['responses']['^200$'].pop("responseTemplates", None)
 
-    error_response_regex_to_status_code_dict = {
-        "^500$": "500",
-        "^400$": "400",
-        "^401$|^302$": "401",
-        "^404$": "404",
-        "^403$": "403"
-    }
-    for regex, code in error_response_regex_to_status_code_dict.items():
-        integration['responses'][regex] = {
-            'statusCode': code,
-            'responseParameters': {
-                'method.response.header.Access-Control-Allow-Credentials': '\'true\'',
-                'method.response.header.Access-Control-Allow-Origin': f"{frontend_url}"
-            }
-
-        }
+    integration['responses'].update(gateway_fragments.error_integration_responses(frontend_url))
 
     # Add query string and path parameter mappings
-    for param in path_parameters:
-        integration['requestParameters'][f"integration.request.path.{param['name']}"]\
-            = f"method.request.path.{param['name']}"
-    for param in query_parameters:
-        integration['requestParameters'][f"integration.request.querystring.{param['name']}"]\
-            = f"method.request.querystring.{param['name']}"
+    for name in path_parameters:
+        integration['requestParameters'][f"integration.request.path.{name}"] = f"method.request.path.{name}"
+    for name in query_parameters:
+        integration['requestParameters'][f"integration.request.querystring.{name}"]\
+            = f"method.request.querystring.{name}"
 
     return integration
 
 
-def create_options_method(allowed_methods: list[str], frontend_url: str):
-    """Creates the OPTIONS method configuration for CORS."""
-    return {
-        'responses': {
-            utils.QuotedString("200"): {
-                'description': '200 response',
-                'headers': {
-                    'Access-Control-Allow-Origin': {'schema': {'type': 'string'}},
-                    'Access-Control-Allow-Methods': {'schema': {'type': 'string'}},
-                    'Access-Control-Allow-Credentials': {'schema': {'type': 'string'}},
-                    'Access-Control-Allow-Headers': {'schema': {'type': 'string'}}
-                },
-                'content': {}
-            }
-        },
+def _schema_type(parameter: gateway_model.Parameter):
+    """The `type` of the schema of a parameter as in the input, a list of types is written again as a list."""
+    return list(parameter.schema_type) if isinstance(parameter.schema_type, tuple) else parameter.schema_type
+
+
+def create_options_method(path_item: gateway_model.PathItem, frontend_url: str):
+    """Creates the OPTIONS method configuration for CORS of a path of the model, with its path parameters."""
+    options_config = {
+        'responses': gateway_fragments.OPTIONS_METHOD_RESPONSES,
         'x-amazon-apigateway-integration': {
             'responses': {
                 'default': {
                     'statusCode': '200',
                     'responseParameters': {
                         'method.response.header.Access-Control-Allow-Credentials': '\'true\'',
-                        'method.response.header.Access-Control-Allow-Methods': f"\'{",".join(allowed_methods)},OPTIONS\'",
+                        'method.response.header.Access-Control-Allow-Methods':
+                            f"\'{",".join(path_item.allowed_methods)},OPTIONS\'",
                         'method.response.header.Access-Control-Allow-Headers': "\'x-trace-id,x-api-key,Authorization,"
                                                                                "Cache-Control,Content-Type\'",
                         'method.response.header.Access-Control-Allow-Origin': f"{frontend_url}"
                     }
                 }
             },
-            'requestTemplates': {
-                'application/json': '{"statusCode": 200}'
-            },
+            'requestTemplates': gateway_fragments.OPTIONS_REQUEST_TEMPLATES,
             'passthroughBehavior': 'when_no_match',
             'type': 'mock'
         }
     }
+    if path_item.path_parameters:
+        options_config = {
+            'parameters': [
+                {'name': parameter.name, 'in': 'path', 'required': True, 'schema': {'type': _schema_type(parameter)}}
+                for parameter in path_item.path_parameters
+            ],
+            **options_config
+        }
+    return options_config
 
 
 def create_error_response(status_code: str):
-    """Creates a standard error response configuration."""
-    return {
-        'description': f"{status_code} response",
-        'headers': {
-            'x-trace-id': {'schema': {'type': 'string'}},
-            'Access-Control-Allow-Origin': {'schema': {'type': 'string'}},
-            'Access-Control-Allow-Credentials': {'schema': {'type': 'string'}}
-        },
-        'content': {
-            'application/json': {
-                'schema': {'$ref': '#/components/schemas/ResponseHeader'}
-            }
-        }
-    }
+    """Returns the standard error response configuration, shared by all the operations (read-only)."""
+    return gateway_fragments.error_response(status_code)
 
 
-def create_success_response(operation, is_empty_success_response: bool):
+def create_success_response(success_response: gateway_model.Response):
     """Creates a success response configuration."""
     response = {
         'description': '200 response',
-        'headers': {
-            'x-trace-id': {'schema': {'type': 'string'}},
-            'Access-Control-Allow-Origin': {'schema': {'type': 'string'}},
-            'Access-Control-Allow-Credentials': {'schema': {'type': 'string'}}
-        }
+        'headers': gateway_fragments.RESPONSE_HEADERS
     }
 
     # Add response content if defined in the operation
-    if 'responses' in operation and '200' in operation['responses']:
-        response_200 = operation['responses']['200']
-        if 'content' in response_200 and not is_empty_success_response:
-            response['content'] = response_200['content']
+    if success_response.content is not None:
+        response['content'] = success_response.content
 
     return response
 
@@ -525,75 +766,110 @@ def is_empty_response(operation: dict) -> bool:
 
 
 
-def resolve_ref(ref, swagger_data, to_be_deleted_schemas: set[str]):
-    """Resolves a $ref in the Swagger data and convert query resource objects to query params."""
-    ref_path = ref.split('/')[1:]  # Split and remove the initial '#'
-    ref_data = swagger_data
-    for part in ref_path:
-        ref_data = ref_data[part]
+class QueryRefCache:
+    """
+    Memoizes the flattening of the query resource objects referenced by query parameters (see `resolve_ref`).
+    The flattened parameters of a schema are computed once and reused by every operation referencing it.
 
-    # Transform the resolved reference to only include parts in quotes
-    transformed_ref = []
-    required_fields = ref_data.get('required', [])
+    Nested schemas are expanded at most `max_depth` levels deep and a schema referencing itself (directly or
+    through another schema) isn't expanded again, the truncated branches are reported in `truncated_refs`.
+    """
 
-    def resolve_nested_schema(prefix: str, schema: dict):
-        """ Recursively resolve nested schemas."""
-        if "$ref" in schema:
-            nested_schema_name = schema["$ref"].split("/")[-1]
-            nested_schema = swagger_data["components"]["schemas"].get(nested_schema_name, {})
-            for nested_key, nested_value in nested_schema.get("properties", {}).items():
-                resolve_nested_schema(f"{prefix}.{nested_key}", nested_value)
-            to_be_deleted_schemas.add(nested_schema_name)
+    def __init__(self, swagger_data: dict, max_depth: int = DEFAULT_QUERY_REF_MAX_DEPTH):
+        self.swagger_data = swagger_data
+        self.max_depth = max_depth
+        self.hits = 0
+        self.misses = 0
+        self.truncated_refs = set()
+        self._entries = {}
+
+    def resolve(self, ref: str, to_be_deleted_schemas: set[str]) -> list[dict]:
+        entry = self._entries.get(ref)
+        if entry is None:
+            self.misses += 1
+            entry = self._entries[ref] = self._flatten(ref)
         else:
-            param = {
-                'name': prefix,
-                'in': 'query',
-                'schema': {
-                    'type': schema.get('type', 'string')  # Default type is string if missing
+            self.hits += 1
+        params, flattened_schemas = entry
+        to_be_deleted_schemas.update(flattened_schemas)
+        # Each operation gets its own copy, shared objects would be dumped as YAML anchors/aliases
+        return [{**param, 'schema': dict(param['schema'])} for param in params]
+
+    def _flatten(self, ref: str):
+        ref_path = ref.split('/')[1:]  # Split and remove the initial '#'
+        ref_data = self.swagger_data
+        for part in ref_path:
+            ref_data = ref_data[part]
+
+        # Transform the resolved reference to only include parts in quotes
+        transformed_ref = []
+        flattened_schemas = []
+        required_fields = ref_data.get('required', [])
+
+        def resolve_nested_schema(prefix: str, schema: dict, expanded_schemas: tuple):
+            """ Recursively resolve nested schemas."""
+            if "$ref" in schema:
+                nested_schema_name = schema["$ref"].split("/")[-1]
+                if nested_schema_name in expanded_schemas or len(expanded_schemas) > self.max_depth:
+                    print(f"Not expanding {prefix} of {ref}: cyclic or deeper than {self.max_depth} level(s)")
+                    self.truncated_refs.add((ref, prefix))
+                    return
+                nested_schema = self.swagger_data["components"]["schemas"].get(nested_schema_name, {})
+                for nested_key, nested_value in nested_schema.get("properties", {}).items():
+                    resolve_nested_schema(f"{prefix}.{nested_key}", nested_value,
+                                          expanded_schemas + (nested_schema_name,))
+                flattened_schemas.append(nested_schema_name)
+            else:
+                param = {
+                    'name': prefix,
+                    'in': 'query',
+                    'schema': {
+                        'type': schema.get('type', 'string')  # Default type is string if missing
+                    }
                 }
-            }
-            if prefix.split(".")[-1] in required_fields:
-                param['required'] = True
-            transformed_ref.append(param)
+                if prefix.split(".")[-1] in required_fields:
+                    param['required'] = True
+                transformed_ref.append(param)
 
-    for key, value in ref_data.get('properties', {}).items():
-        resolve_nested_schema(key, value)
+        for key, value in ref_data.get('properties', {}).items():
+            resolve_nested_schema(key, value, (ref_path[-1],))
 
-    to_be_deleted_schemas.add(ref_path[-1])
+        flattened_schemas.append(ref_path[-1])
 
-    return transformed_ref
+        return transformed_ref, flattened_schemas
 
 
-def delete_unused_schemas(to_be_deleted_schemas: set[str], swagger_data: dict):
-    def is_schema_used(schema_name: str, data: dict) -> bool:
-        """
-        Recursively search the dictionary for references to the given schema.
-        """
-        ref_string = f"#/components/schemas/{schema_name}"
-
-        if isinstance(data, dict):
-            for key, value in data.items():
-                if isinstance(value, str) and ref_string in value:
-                    return True
-                if isinstance(value, (dict, list)) and is_schema_used(schema_name, value):
-                    return True
-        elif isinstance(data, list):
-            for item in data:
-                if is_schema_used(schema_name, item):
-                    return True
+def resolve_ref(ref, swagger_data, to_be_deleted_schemas: set[str], query_ref_cache: QueryRefCache = None):
+    """
+    Resolves a $ref in the Swagger data and convert query resource objects to query params.
+    Pass the same `query_ref_cache` for all the operations to only flatten each query resource object once.
+    """
+    query_ref_cache = query_ref_cache or QueryRefCache(swagger_data)
+    return query_ref_cache.resolve(ref, to_be_deleted_schemas)
 
-        return False
 
+def delete_unused_schemas(to_be_deleted_schemas: set[str], swagger_data: dict, graph: ref_graph.RefGraph = None):
+    """
+    Deletes the schemas marked as unused which aren't reachable from the paths of the document or from the schemas
+    that aren't marked (they're kept, their `$ref`s must stay valid).
+    Reachability is computed once on the `$ref` graph of the document (see `ref_graph.RefGraph`), built from
+    `swagger_data` unless given.
+    The marked schemas that are still used are kept in `to_be_deleted_schemas` and reported.
+    """
     print(f"Deleting {len(to_be_deleted_schemas)} marked as unused schemas(s) but will be checked first.")
     print(to_be_deleted_schemas)
+    graph = graph or ref_graph.RefGraph.build(swagger_data)
+    kept_schemas = swagger_data.get("components", {}).get("schemas", {}).keys() - to_be_deleted_schemas
+    reachable_schemas = graph.reachable_schemas(graph.root_refs | kept_schemas)
     for schema_component in to_be_deleted_schemas.copy():
-        if not is_schema_used(schema_component, swagger_data):
+        if schema_component not in reachable_schemas:
             swagger_data["components"]["schemas"].pop(schema_component, None)
             to_be_deleted_schemas.remove(schema_component)
 
     if len(to_be_deleted_schemas) > 0:
         print(f"There is {len(to_be_deleted_schemas)} detected as unused schema(s) that haven't been deleted")
-        print(to_be_deleted_schemas)
+        for schema_component in sorted(to_be_deleted_schemas):
+            print(f"  {schema_component} is still referenced by: {', '.join(graph.describe_referrers(schema_component))}")
     return swagger_data
 
 
@@ -0,0 +1,221 @@
+"""
+On-disk cache of the parsed input specs, so the same spec isn't parsed again on each run.
+
+The parsed document is stored with `marshal` (or `pickle` for the types it doesn't support, like the dates YAML
+can give), much faster to load than YAML and faster than JSON, in a file named after the digest of the spec content
+and of the parser and Python versions. The cache size is bounded, the least recently used entries
+are evicted first.
+
+The cache is off unless `SWAGGER_CONVERTER_SPEC_CACHE=1` is set or a cache is explicitly requested (see `load_spec`):
+the entries may be unpickled, so the cache folder must only be writable by the user running the conversions. The
+cache folder is `$SWAGGER_CONVERTER_CACHE_DIR` or `~/.cache/swagger-converter/specs`.
+"""
+import collections
+import gc
+import hashlib
+import marshal
+import os
+import pickle
+import sys
+
+import yaml
+
+import yaml_io as yaml_io
+
+# To be changed when the parsing changes the loaded documents, it invalidates all the entries
+PARSER_VERSION = 2
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Number of entries kept in memory by a `WarmSpecCache`
+DEFAULT_WARM_ENTRIES = 16
+
+_ENTRY_SUFFIX = ".spec"
+
+# First byte of an entry, telling how the document was serialized
+_MARSHAL_FORMAT = b'M'
+_PICKLE_FORMAT = b'P'
+
+
+def default_cache_dir() -> str:
+    if os.environ.get("SWAGGER_CONVERTER_CACHE_DIR"):
+        return os.environ["SWAGGER_CONVERTER_CACHE_DIR"]
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "swagger-converter", "specs")
+
+
+def cache_enabled_by_default() -> bool:
+    return os.environ.get("SWAGGER_CONVERTER_SPEC_CACHE", "0").lower() in ("1", "true", "yes", "on")
+
+
+class SpecCache:
+    """Parsed specs stored in `cache_dir`, evicted in least recently used order above `max_bytes`."""
+
+    def __init__(self, cache_dir: str = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, content: bytes) -> str:
+        digest = hashlib.sha256(content)
+        # The marshal format changes between Python versions
+        digest.update(f"\0{PARSER_VERSION}\0{yaml.__version__}\0{sys.version_info[:2]}".encode())
+        return digest.hexdigest()
+
+    def load(self, file_path: str):
+        """Returns the parsed spec of `file_path`, from the cache when it's there, parsing and caching it otherwise."""
+        with open(file_path, 'rb') as file:
+            content = file.read()
+        entry_path = os.path.join(self.cache_dir, self.key(content) + _ENTRY_SUFFIX)
+        try:
+            data = self._decode(self._read_entry(entry_path))
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError, TypeError):
+            pass
+        else:
+            self.hits += 1
+            return data
+
+        self.misses += 1
+        data = yaml_io.loads(content.decode('utf-8'), file_path)
+        self._store(entry_path, data)
+        return data
+
+    def _read_entry(self, entry_path: str) -> bytes:
+        with open(entry_path, 'rb') as file:
+            content = file.read()
+        # The modification time orders the entries for the eviction
+        os.utime(entry_path)
+        return content
+
+    @staticmethod
+    def _decode(content: bytes):
+        # The garbage collector would run many times while the many objects of a big spec are created
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            if content[:1] == _MARSHAL_FORMAT:
+                return marshal.loads(content[1:])
+            if content[:1] == _PICKLE_FORMAT:
+                return pickle.loads(content[1:])
+            raise ValueError(f"Unknown spec cache entry format {content[:1]}")
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    def _store(self, entry_path: str, data):
+        try:
+            content = _MARSHAL_FORMAT + marshal.dumps(data)
+        except ValueError:
+            try:
+                content = _PICKLE_FORMAT + pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+            except pickle.PicklingError as e:
+                print(f"Could not cache the parsed spec in {self.cache_dir}: {e}")
+                return
+        self._write_entry(entry_path, content)
+
+    def _write_entry(self, entry_path: str, content: bytes):
+        import tempfile
+
+        try:
+            # Only readable and writable by the user, the entries may be unpickled
+            os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+            # Written to a temporary file first, so concurrent runs never read a partial entry
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, 'wb') as file:
+                file.write(content)
+            os.replace(temp_path, entry_path)
+            self.evict()
+        except OSError as e:
+            print(f"Could not cache the parsed spec in {self.cache_dir}: {e}")
+
+    def entries(self) -> list[tuple[str, os.stat_result]]:
+        """The cache entries paths and stats, the least recently used first."""
+        try:
+            names = [name for name in os.listdir(self.cache_dir) if name.endswith(_ENTRY_SUFFIX)]
+        except FileNotFoundError:
+            return []
+        entries = []
+        for name in names:
+            entry_path = os.path.join(self.cache_dir, name)
+            try:
+                entries.append((entry_path, os.stat(entry_path)))
+            except FileNotFoundError:
+                pass
+        return sorted(entries, key=lambda entry: entry[1].st_mtime)
+
+    def evict(self):
+        """Removes the least recently used entries until the cache size is below `max_bytes`."""
+        entries = self.entries()
+        total_bytes = sum(stat.st_size for _, stat in entries)
+        for entry_path, stat in entries:
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(entry_path)
+            except FileNotFoundError:
+                pass
+            total_bytes -= stat.st_size
+
+    def clear(self) -> int:
+        """Removes all the entries, returns how many were removed."""
+        entries = self.entries()
+        for entry_path, _ in entries:
+            try:
+                os.remove(entry_path)
+            except FileNotFoundError:
+                pass
+        return len(entries)
+
+
+class WarmSpecCache(SpecCache):
+    """
+    `SpecCache` also keeping the entries of the last `max_entries` specs loaded in memory, for the long running
+    processes loading the same specs again and again (see `cli.py watch`). The entries are kept serialized, as the
+    generators modify the loaded document, so each load still returns a new copy. With `persist` set to False the
+    entries are only kept in memory.
+    """
+
+    def __init__(self, cache_dir: str = None, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_entries: int = DEFAULT_WARM_ENTRIES, persist: bool = True):
+        super().__init__(cache_dir, max_bytes)
+        self.max_entries = max_entries
+        self.persist = persist
+        self._memory = collections.OrderedDict()
+
+    def _read_entry(self, entry_path: str) -> bytes:
+        content = self._memory.get(entry_path)
+        if content is not None:
+            self._memory.move_to_end(entry_path)
+            return content
+        if not self.persist:
+            raise FileNotFoundError(entry_path)
+        content = super()._read_entry(entry_path)
+        self._remember(entry_path, content)
+        return content
+
+    def _write_entry(self, entry_path: str, content: bytes):
+        self._remember(entry_path, content)
+        if self.persist:
+            super()._write_entry(entry_path, content)
+
+    def _remember(self, entry_path: str, content: bytes):
+        self._memory[entry_path] = content
+        self._memory.move_to_end(entry_path)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+
+def load_spec(file_path: str, use_cache=None):
+    """
+    Loads an input spec, through the default `SpecCache` if `use_cache` is True (or, when it's not given, if the
+    cache is enabled by `SWAGGER_CONVERTER_SPEC_CACHE`). `use_cache` can also be the `SpecCache` to load the spec
+    through.
+    """
+    if isinstance(use_cache, SpecCache):
+        return use_cache.load(file_path)
+    if use_cache is None:
+        use_cache = cache_enabled_by_default()
+    if not use_cache:
+        return yaml_io.load_file(file_path)
+    return SpecCache().load(file_path)
@@ -0,0 +1,245 @@
+"""
+Path at a time reading of the input specs too big to be loaded whole (see the `stream_paths` option of
+`source_generator.format_swagger_to_template` and `open_api_generator.process_swagger_file`).
+
+A first pass over the file loads every top level section but `paths` and lists the paths. The path items are then
+read from a second pass, one at a time, when they're requested (see `StreamedPaths`). The memory used is bounded by
+the other sections (mainly `components`) plus the biggest path item, at the cost of parsing the paths twice.
+JSON specs are read with the JSON decoder, the other ones with the YAML parser.
+"""
+import contextlib
+import json
+import re
+from collections.abc import Mapping
+
+import yaml
+from yaml.composer import Composer
+from yaml.constructor import SafeConstructor
+from yaml.events import MappingEndEvent, MappingStartEvent
+from yaml.resolver import Resolver
+
+import yaml_io as yaml_io
+
+PATHS_SECTION = 'paths'
+
+# Size of the reads of the JSON reader, the reads are bigger for the values that don't fit in it
+CHUNK_SIZE = 1024 * 1024
+
+# Length of the start of a file used to tell whether it's JSON (see `yaml_io.looks_like_json`)
+_FORMAT_SNIFF_SIZE = 1024
+
+
+class _JsonReader:
+    """Reads the JSON values of a file one at a time, only the text not read yet is kept in memory."""
+    _WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+    def __init__(self, file):
+        self.file = file
+        self.buffer = ''
+        self.position = 0
+        self.eof = False
+        self.decoder = yaml_io.JSON_DECODER
+
+    def _read(self, size: int):
+        data = self.file.read(size)
+        self.eof = not data
+        self.buffer = self.buffer[self.position:] + data
+        self.position = 0
+
+    def _peek(self) -> str:
+        """Skips the whitespace and returns the next character, '' at the end of the file."""
+        while True:
+            self.position = self._WHITESPACE.match(self.buffer, self.position).end()
+            if self.position < len(self.buffer) or self.eof:
+                return self.buffer[self.position:self.position + 1]
+            self._read(CHUNK_SIZE)
+
+    def _expect(self, char: str):
+        found = self._peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} in the JSON spec, found {found!r}")
+        self.position += 1
+
+    def start(self):
+        pass
+
+    def value(self):
+        self._peek()
+        read_size = CHUNK_SIZE
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            else:
+                # A number ending the buffer may go on in the rest of the file
+                if end < len(self.buffer) or self.eof:
+                    self.position = end
+                    return value
+            # Doubling the reads keeps the retries linear in the size of the value
+            self._read(read_size)
+            read_size *= 2
+
+    skip = value
+
+    def mapping_keys(self):
+        """Yields the keys of the object starting here, each value must be read or skipped before the next key."""
+        self._expect('{')
+        if self._peek() == '}':
+            self.position += 1
+            return
+        while True:
+            key = self.value()
+            self._expect(':')
+            yield key
+            separator = self._peek()
+            self.position += 1
+            if separator == '}':
+                return
+            if separator != ',':
+                raise ValueError(f"Expected ',' or '}}' in the JSON spec, found {separator!r}")
+
+
+try:
+    from yaml._yaml import CParser as _Parser
+
+    class _YamlLoader(_Parser, Composer, SafeConstructor, Resolver):
+        """Safe loader composing the nodes from libyaml's events, so the document can be loaded a node at a time."""
+
+        def __init__(self, stream):
+            _Parser.__init__(self, stream)
+            Composer.__init__(self)
+            SafeConstructor.__init__(self)
+            Resolver.__init__(self)
+except ImportError:
+    _YamlLoader = yaml.SafeLoader
+
+
+class _YamlReader(_YamlLoader):
+    """Reads the nodes of a YAML document one at a time, with the same results as `yaml_io.safe_load`."""
+
+    def start(self):
+        self.get_event()  # Stream start
+        self.get_event()  # Document start
+
+    def value(self):
+        return self.construct_document(self.compose_node(None, None))
+
+    def skip(self):
+        # Composed anyway, the aliases of the next nodes may refer to its anchors
+        self.compose_node(None, None)
+
+    def mapping_keys(self):
+        if not self.check_event(MappingStartEvent):
+            raise ValueError("Expected a mapping in the YAML spec")
+        self.get_event()
+        while not self.check_event(MappingEndEvent):
+            yield self.value()
+        self.get_event()
+
+
+@contextlib.contextmanager
+def _open_reader(file_path: str, as_json: bool):
+    with open(file_path, 'r', encoding='utf-8') as file:
+        reader = _JsonReader(file) if as_json else _YamlReader(file)
+        try:
+            reader.start()
+            yield reader
+        finally:
+            if not as_json:
+                reader.dispose()
+
+
+def _read_sections(file_path: str, as_json: bool):
+    """Returns the top level sections with None for `paths`, and the paths."""
+    sections = {}
+    path_keys = []
+    with _open_reader(file_path, as_json) as reader:
+        for key in reader.mapping_keys():
+            if key == PATHS_SECTION:
+                sections[key] = None
+                for path in reader.mapping_keys():
+                    path_keys.append(path)
+                    reader.skip()
+            else:
+                sections[key] = reader.value()
+    return sections, path_keys
+
+
+def load_streamed(file_path: str, path_transform=None) -> dict:
+    """
+    Loads a spec without its path items: the other top level sections are loaded, `paths` is a `StreamedPaths`
+    reading each path item from the file when it's requested, transformed by `path_transform` if given.
+    As with `yaml_io.loads`, a JSON looking file which isn't valid JSON is read as YAML.
+    """
+    with open(file_path, 'r', encoding='utf-8') as file:
+        as_json = yaml_io.looks_like_json(file.read(_FORMAT_SNIFF_SIZE), file_path)
+    if as_json:
+        try:
+            sections, path_keys = _read_sections(file_path, True)
+        except ValueError:
+            as_json = False
+    if not as_json:
+        sections, path_keys = _read_sections(file_path, False)
+    if PATHS_SECTION in sections:
+        sections[PATHS_SECTION] = StreamedPaths(file_path, path_keys, as_json, path_transform)
+    return sections
+
+
+class StreamedPaths(Mapping):
+    """
+    The `paths` of a spec, read from its file one path item at a time. Getting the path items in the file order
+    (e.g. iterating over `items()`) reads the file once and only keeps the last path item read, getting an earlier
+    path item reads the file again from its start. `transform` is applied to each path item read.
+    The path items are new objects each time they're read again: modifying them doesn't change the spec.
+    """
+
+    def __init__(self, file_path: str, path_keys: list[str], as_json: bool, transform=None):
+        self.file_path = file_path
+        self.as_json = as_json
+        self.transform = transform
+        self._indexes = {path: index for index, path in enumerate(path_keys)}
+        self._path_items = None
+        self._current_index = -1
+        self._current_item = None
+
+    def __iter__(self):
+        return iter(self._indexes)
+
+    def __len__(self):
+        return len(self._indexes)
+
+    def __contains__(self, path):
+        return path in self._indexes
+
+    def __getitem__(self, path):
+        index = self._indexes[path]
+        if index == self._current_index:
+            return self._current_item
+        if self._path_items is None or index < self._current_index:
+            self.close()
+            self._path_items = self._read_path_items()
+        for item_index, path_item in self._path_items:
+            if item_index == index:
+                self._current_index = index
+                self._current_item = self.transform(path_item) if self.transform else path_item
+                return self._current_item
+        raise KeyError(path)
+
+    def _read_path_items(self):
+        with _open_reader(self.file_path, self.as_json) as reader:
+            for key in reader.mapping_keys():
+                if key == PATHS_SECTION:
+                    for index, _ in enumerate(reader.mapping_keys()):
+                        yield index, reader.value()
+                    return
+                reader.skip()
+
+    def close(self):
+        """Closes the file, it's opened again by the next path item requested."""
+        if self._path_items is not None:
+            self._path_items.close()
+            self._path_items = None
+        self._current_index = -1
+        self._current_item = None
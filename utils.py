@@ -39,22 +39,33 @@ class ListIndentDumper(yaml.Dumper):
 
 
 
-def convert_str_values_to_quoted_strings(in_yaml_data):
+def convert_str_values_to_quoted_strings(in_yaml_data, memo: dict = None):
     """
     Modify the input YAML data to ensure all string values are double-quoted.
     It does that by adding a custom string subclass for values that should be quoted.
     Note that a custom representer should be added to the yaml object dumping the file
     like `yaml.add_representer(QuotedString, QuotedString.quoted_string_representer)`
-    """
 
+    The converted data is a copy, so objects found several times in the input are different objects in the output.
+    Pass a `memo` dict to convert them once and share the converted object the same way instead (the dumper then
+    writes them with YAML anchors and aliases).
+    The gateway output doesn't need it: `yaml_io.GatewayDumper` applies the same quoting while dumping.
+    """
+    if memo is not None and id(in_yaml_data) in memo:
+        return memo[id(in_yaml_data)]
 
     if isinstance(in_yaml_data, dict):
-        return {k: convert_str_values_to_quoted_strings(v) for k, v in in_yaml_data.items()}
+        converted = {k: convert_str_values_to_quoted_strings(v, memo) for k, v in in_yaml_data.items()}
     elif isinstance(in_yaml_data, list):
-        return [convert_str_values_to_quoted_strings(v) for v in in_yaml_data]
+        converted = [convert_str_values_to_quoted_strings(v, memo) for v in in_yaml_data]
     elif isinstance(in_yaml_data, str):
         return QuotedString(in_yaml_data)
-    return in_yaml_data
+    else:
+        return in_yaml_data
+
+    if memo is not None:
+        memo[id(in_yaml_data)] = converted
+    return converted
 
 
 def test_dumping_yaml_data():
@@ -0,0 +1,70 @@
+"""
+Polling watcher of a set of files, used by `cli.py watch` to regenerate the outputs of the specs that changed.
+
+The bursts of writes of a file (an export writing a spec in several steps, an editor saving twice) are reported as
+a single change once the files stopped changing for the debounce delay.
+"""
+import os
+import time
+
+DEFAULT_POLL_INTERVAL = 0.25
+DEFAULT_DEBOUNCE = 0.5
+
+
+def file_state(file_path: str):
+    """What tells that a file changed: its modification time and size, None when it doesn't exist."""
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class FileWatcher:
+    """
+    Watches `file_paths` by polling their state (see `file_state`) every `poll_interval` seconds.
+    `wait_for_changes` returns the changed files once none of them changed for `debounce` seconds.
+    """
+
+    def __init__(self, file_paths, poll_interval: float = DEFAULT_POLL_INTERVAL, debounce: float = DEFAULT_DEBOUNCE):
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self._states = {}
+        self.watch(file_paths)
+
+    def watch(self, file_paths):
+        """Replaces the watched files, the next changes are relative to their current state."""
+        self._states = {file_path: file_state(file_path) for file_path in file_paths}
+
+    @property
+    def file_paths(self) -> list[str]:
+        return list(self._states)
+
+    def poll(self) -> set[str]:
+        """Returns the watched files changed since the previous poll."""
+        changed = set()
+        for file_path, state in self._states.items():
+            new_state = file_state(file_path)
+            if new_state != state:
+                self._states[file_path] = new_state
+                changed.add(file_path)
+        return changed
+
+    def wait_for_changes(self, timeout: float = None) -> set[str]:
+        """
+        Blocks until watched files changed and then stayed unchanged for `debounce` seconds, and returns all the files
+        changed meanwhile. Returns an empty set if nothing changed within `timeout` seconds.
+        """
+        changed = set()
+        start = last_change = time.monotonic()
+        while True:
+            time.sleep(self.poll_interval)
+            now = time.monotonic()
+            new_changes = self.poll()
+            if new_changes:
+                changed |= new_changes
+                last_change = now
+            elif changed and now - last_change >= self.debounce:
+                return changed
+            elif not changed and timeout is not None and now - start >= timeout:
+                return changed
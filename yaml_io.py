@@ -0,0 +1,209 @@
+"""
+Shared YAML load/dump layer used by every generator.
+
+It uses libyaml's C loader/dumper when PyYAML was built with it and falls back to the
+pure-Python classes otherwise. The output of both paths is byte-identical.
+JSON input files (like Spring's `/v3/api-docs`) are parsed with the JSON decoder, which is much faster.
+"""
+import json
+import re
+from types import MappingProxyType
+
+import yaml
+
+import utils as utils
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+    from yaml import CDumper as Dumper
+    HAS_LIBYAML = True
+except ImportError:
+    from yaml import SafeLoader
+    from yaml import Dumper
+    HAS_LIBYAML = False
+
+
+# A JSON document starts with an object or an array
+_JSON_START = re.compile(r'\s*[{\[]')
+
+# The JSON numbers the YAML 1.1 resolver reads as floats: with a fraction, and a signed exponent if any. The other
+# ones (e.g. `1e5` or `1.0E10`) are strings for the YAML loader
+_YAML_FLOAT = re.compile(r'-?[0-9]+\.[0-9]*(?:[eE][-+][0-9]+)?')
+
+
+def _parse_json_float(literal: str):
+    return float(literal) if _YAML_FLOAT.fullmatch(literal) else literal
+
+
+# Decodes JSON into the same structures as the YAML loader: the numbers and constants (`NaN`, `Infinity`) YAML
+# doesn't resolve as floats are kept as strings
+JSON_DECODER = json.JSONDecoder(parse_float=_parse_json_float, parse_constant=str)
+
+
+class NoAnchorsDumper(Dumper):
+    """`Dumper` writing the objects found several times again each time, without YAML anchors and aliases."""
+
+    def ignore_aliases(self, data):
+        return True
+
+
+_STR_TAG = 'tag:yaml.org,2002:str'
+
+
+class GatewayDumper(utils.ListIndentDumper):
+    """
+    Dumper used for the gateway output: indented block lists and double-quoted strings, the quoting rules being
+    applied while the data is represented instead of on a quoted copy of it. The string values (of mappings and
+    lists) are double-quoted, the keys only when they're a `QuotedString`. The dict and list subclasses, like the
+    `FlowStyleList` enums, and the read-only mappings (`types.MappingProxyType`) are written as plain block mappings
+    and lists.
+
+    The objects found several times in the data are written again each time, see `GatewayAnchorsDumper` to write
+    them once with YAML anchors and aliases.
+
+    libyaml's emitter always writes block lists inside a mapping without indentation and has no option to
+    change that, so this dumper stays on the pure-Python emitter to keep the output unchanged. The gateway repeats
+    the same few scalars (headers, descriptions, statuses) in every operation, so the emitter's analysis of each
+    scalar is kept for the rest of the dump.
+    """
+    write_anchors = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._scalar_analyses = {}
+
+    def analyze_scalar(self, scalar):
+        # The analysis only depends on the scalar and the dump options, the emitter only reads it
+        analysis = self._scalar_analyses.get(scalar)
+        if analysis is None:
+            analysis = self._scalar_analyses[scalar] = super().analyze_scalar(scalar)
+        return analysis
+
+    def ignore_aliases(self, data):
+        return not self.write_anchors or super().ignore_aliases(data)
+
+    def represent_quoted_str(self, data):
+        return self.represent_scalar(_STR_TAG, data, style='"')
+
+    def represent_key(self, key):
+        if type(key) is str:
+            # Reset the object the last node was represented for, a key is never an alias
+            self.alias_key = None
+            return self.represent_scalar(_STR_TAG, key)
+        return self.represent_data(key)
+
+    def represent_mapping(self, tag, mapping, flow_style=None):
+        # Same as the base representer, except the keys are represented by `represent_key`
+        value = []
+        node = yaml.MappingNode(tag, value, flow_style=flow_style)
+        if self.alias_key is not None:
+            self.represented_objects[self.alias_key] = node
+        items = list(mapping.items())
+        if self.sort_keys:
+            try:
+                items = sorted(items)
+            except TypeError:
+                pass
+        best_style = True
+        for item_key, item_value in items:
+            node_key = self.represent_key(item_key)
+            node_value = self.represent_data(item_value)
+            if not (isinstance(node_key, yaml.ScalarNode) and not node_key.style):
+                best_style = False
+            if not (isinstance(node_value, yaml.ScalarNode) and not node_value.style):
+                best_style = False
+            value.append((node_key, node_value))
+        if flow_style is None:
+            node.flow_style = self.default_flow_style if self.default_flow_style is not None else best_style
+        return node
+
+
+GatewayDumper.add_representer(str, GatewayDumper.represent_quoted_str)
+GatewayDumper.add_multi_representer(str, GatewayDumper.represent_quoted_str)
+GatewayDumper.add_multi_representer(dict, GatewayDumper.represent_dict)
+GatewayDumper.add_multi_representer(list, GatewayDumper.represent_list)
+# The read-only shared fragments (see `gateway_fragments`)
+GatewayDumper.add_representer(MappingProxyType, GatewayDumper.represent_dict)
+
+
+class GatewayAnchorsDumper(GatewayDumper):
+    """`GatewayDumper` writing the objects found several times once, with YAML anchors and aliases."""
+    write_anchors = True
+
+
+def safe_load(stream):
+    """Parse a YAML (or JSON) stream or string into Python objects using the fastest available loader."""
+    return yaml.load(stream, Loader=SafeLoader)
+
+
+def looks_like_json(text: str, file_path: str = None) -> bool:
+    """Whether a file should be parsed as JSON, from its extension or else from its first character."""
+    if file_path is not None and file_path.lower().endswith('.json'):
+        return True
+    return _JSON_START.match(text) is not None
+
+
+def loads(text: str, file_path: str = None):
+    """
+    Parse a YAML or JSON text. JSON (see `looks_like_json`) is parsed with `JSON_DECODER`, which gives the same
+    structures as the YAML loader but much faster. A text that isn't valid JSON, e.g. a YAML flow mapping, is
+    parsed as YAML.
+    """
+    if looks_like_json(text, file_path):
+        try:
+            return JSON_DECODER.decode(text)
+        except ValueError:
+            pass
+    return safe_load(text)
+
+
+def load_file(file_path):
+    """Load a YAML (or JSON) file into Python objects."""
+    with open(file_path, 'r') as file:
+        return loads(file.read(), file_path)
+
+
+def dump(data, stream=None, anchors=True, **kwargs):
+    """
+    Same as `yaml.dump` but using the fastest available dumper. Without `anchors`, the objects found several times
+    are written again each time instead of once with YAML anchors and aliases.
+    """
+    return yaml.dump(data, stream, Dumper=Dumper if anchors else NoAnchorsDumper, **kwargs)
+
+
+def dump_gateway(data, stream=None, anchors=False):
+    """
+    Dump the gateway output data with the gateway formatting rules (see `GatewayDumper`), with `anchors` the objects
+    found several times are written once with YAML anchors and aliases.
+    """
+    return yaml.dump(data, stream, sort_keys=False, Dumper=GatewayAnchorsDumper if anchors else GatewayDumper)
+
+
+def dump_gateway_path(path, path_config) -> str:
+    """
+    Dumps one entry of the `paths` section of the gateway output, exactly as it's written inside the whole document.
+    The entry is dumped inside a `paths` mapping so long values are folded at the same columns.
+    """
+    return dump_gateway({'paths': {path: path_config}})[len('paths:\n'):]
+
+
+def dump_path(path, path_item, anchors=True) -> str:
+    """Same as `dump_gateway_path` for the output of `dump` with `sort_keys=False`."""
+    return dump({'paths': {path: path_item}}, sort_keys=False, anchors=anchors)[len('paths:\n'):]
+
+
+def write_gateway_paths(path_fragments, stream):
+    """
+    Writes the `paths` section of the gateway output from `path_fragments`, an iterable of texts returned by
+    `dump_gateway_path` (or `dump_path`, for the output of `dump`) which is consumed while writing. Together with
+    `dump_gateway` of each of the other top level sections, the result is the same as `dump_gateway` of the whole
+    document.
+    """
+    has_paths = False
+    for fragment in path_fragments:
+        if not has_paths:
+            stream.write('paths:\n')
+            has_paths = True
+        stream.write(fragment)
+    if not has_paths:
+        dump_gateway({'paths': {}}, stream)